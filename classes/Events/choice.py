@@ -1,122 +1,106 @@
 from __future__ import annotations
-from enum import Enum
+import random
+from types import MappingProxyType
 from typing import TypedDict, TYPE_CHECKING
 from classes.Player.player import Player
-
-class EffectAction(Enum):
-    MODIFY_HP = "modify_hp"  # Increase the player's HP
-    MODIFY_MP = "modify_mp"  # Increase the player's MP
-    MODIFY_XP = "modify_xp" # Increase the player's XP
-    MODIFY_DAY = "modify_day" # Increases the day
-    MARK_FLAG = "mark_flag"  # Mark a flag
-    UNMARK_FLAG = "unmark_flag"  # Unmark a flag
-    GAIN_ITEM = "gain_item"  # Add an item to the player's inventory
-    CONSUME_ITEM = "consume_item"  # Remove an item from the player's inventory
-    MODIFY_STAT = "modify_stat"  # Modify a specific stat
-    SET_NEXT_EVENT = "set_next_event"  # Transition to a specific event
-    LEARN_SPELL = "learn_spell"  # Teach the player a spell
-    PLAY_ANIMATION = "play_animation"  # Play a specific animation or effect
-    PLAY_SOUND = "play_sound"  # Play a specific sound
-
-class Requirement(Enum):
-    STRENGTH = "strength"
-    AGILITY = "agility"
-    STAMINA = "stamina"
-    WILLPOWER = "willpower"
-    CHARISMA = "charisma"
-    LEVEL = "level"
-    ITEM = "item"
-    FLAG = "flag"
-    SPELL = "spell"
-
-    @staticmethod
-    def from_string(key: str):
-        """Convert a string key to a Requirement enum."""
-        try:
-            return Requirement(key)
-        except ValueError:
-            raise ValueError(f"Invalid requirement key: {key}")
+from classes.Events.effects import BoundEffect, EffectAction, apply_effects, bind_effects
+from classes.Events.outcomes import OutcomeResolver
+from classes.Events.requirements import Requirement, compile_requirements
 
 class Outcome(TypedDict):
     threshold: list[dict[str, str|int]]
     text: str
     effects: list[dict["action": EffectAction, "value": str|int]]
 
+def freeze(value):
+    """Recursively convert JSON containers into read-only equivalents (dict -> mappingproxy, list -> tuple)."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
 class Choice:
     def __init__(self, text: str, screen_fx: str, min_requirement: dict, outcomes: list):
         self.text: str = text
         self.screen_fx: str = screen_fx
-        self.min_requirement: list[dict[Requirement,str|int]] = min_requirement
-        self.outcomes: list[Outcome] = outcomes
+        # Empty conditions (e.g. [{}]) mean "no requirement" and are dropped up front
+        self.min_requirement: tuple[dict[Requirement,str|int], ...] = tuple(freeze(condition) for condition in min_requirement if condition)
+        self.outcomes: tuple[Outcome, ...] = freeze(outcomes)
+        self.transitions: tuple[int, ...] = self.collect_transitions(self.outcomes)
+        # Compiled once here so availability checks never re-parse requirement keys
+        self.requirement_check = compile_requirements(self.min_requirement)
+        # Effects are bound to their handlers once, parallel to self.outcomes
+        self.bound_effects: tuple[tuple[BoundEffect, ...], ...] = tuple(
+            bind_effects(outcome.get("effects", ())) for outcome in self.outcomes
+        )
+        self.outcome_resolver = OutcomeResolver(self.outcomes)
+
+    @staticmethod
+    def create_choice(data: dict) -> Choice:
+        """
+        Factory method to create a choice based on the data dictionary.
+        :param data: A dictionary containing choice properties.
+        :return: An instance of Choice.
+        """
+        return Choice(
+            text=data["text"],
+            screen_fx=data.get("screen_fx", ""),
+            min_requirement=data.get("min_requirement", []),
+            outcomes=data.get("outcomes", []),
+        )
+
+    @staticmethod
+    def collect_transitions(outcomes: tuple[Outcome, ...]) -> tuple[int, ...]:
+        """Collect every event reference targeted by a set_next_event effect, in order and without duplicates."""
+        targets: dict[int, None] = {}
+        for outcome in outcomes:
+            for effect in outcome.get("effects", ()):
+                if effect.get("action") == EffectAction.SET_NEXT_EVENT.value:
+                    targets[int(effect["value"])] = None
+        return tuple(targets)
 
     def is_available(self, player:Player) -> bool:
         """Check if the choice meets the minimum requirements."""
-        for condition in self.min_requirement:
-            if not self.evaluate_condition(condition, player):
-                return False
-        return True
-    
+        return self.requirement_check(player)
+
     def evaluate_condition(self, condition: dict[str, str | int], player: Player) -> bool:
         """Evaluate a single condition."""
-        key, value = next(iter(condition.items()))
         try:
-            requirement = Requirement.from_string(key)
+            return compile_requirements([condition])(player)
         except ValueError:
-            print(f"Unknown requirement key '{key}' in condition: {condition}")
+            print(f"Unknown requirement key in condition: {condition}")
             return False
 
-        if requirement in [
-            Requirement.STRENGTH, Requirement.AGILITY, Requirement.STAMINA,
-            Requirement.WILLPOWER, Requirement.CHARISMA, Requirement.LEVEL
-        ]:
-            return player.stats.explicit_stats.get(requirement.value, 0) >= value
-
-        if requirement == Requirement.ITEM:
-            return player.inventory.check_item(value)
-
-        if requirement == Requirement.FLAG:
-            return player.flags.check_flag(value)
-
-        if requirement == Requirement.SPELL:
-            return player.spell_manager.has_spell(value)
-
-        print(f"Unhandled requirement: {key} in {condition}")
-        return False
+    def resolve_outcome(self, player: Player, rng: random.Random = None) -> Outcome | None:
+        """
+        Pick the outcome the player earns for this choice.
+        :param player: The player making the choice.
+        :param rng: Optional random number generator for weighted outcomes.
+        :return: The winning outcome, or None if no outcome threshold is met.
+        """
+        return self.outcome_resolver.resolve(player, rng)
 
+    def choose(self, player: Player, rng: random.Random = None) -> Outcome | None:
+        """
+        Resolve and apply this choice's outcome.
+        :param player: The player making the choice.
+        :param rng: Optional random number generator for weighted outcomes.
+        :return: The outcome that was applied, or None if no outcome threshold is met.
+        """
+        index = self.outcome_resolver.resolve_index(player, rng)
+        if index is None:
+            return None
+        apply_effects(self.bound_effects[index], player)
+        return self.outcomes[index]
 
     def apply_outcome(self, outcome: Outcome, player: Player) -> None:
-        """Apply the effects of a choice outcome."""
-        for effect in outcome["effects"]:
-            action = EffectAction(effect["action"])  # Validate against the enum
-            value = effect["value"]
-
-            if action == EffectAction.MODIFY_HP:
-                player.stats.modify_hp(value)
-            elif action == EffectAction.MODIFY_XP:
-                player.stats.gain_exp(value)
-            elif action == EffectAction.MODIFY_DAY:
-                player.stats.modify_day(value)
-            elif action == EffectAction.MARK_FLAG:
-                player.flags.set_flag(value)
-            elif action == EffectAction.UNMARK_FLAG:
-                player.flags.clear_flag(value)
-            elif action == EffectAction.GAIN_ITEM:
-                player.inventory.add_item(value)
-            elif action == EffectAction.CONSUME_ITEM:
-                player.inventory.remove_item(value)
-            elif action == EffectAction.MODIFY_STAT:
-                player.stats.modify_stat(value)
-            elif action == EffectAction.SET_NEXT_EVENT:
-                player.stats.advance_event(value)
-            elif action == EffectAction.MODIFY_MP:
-                player.stats.modify_mp(value)
-            elif action == EffectAction.LEARN_SPELL:
-                player.spell_manager.add_spell(value)
-            elif action == EffectAction.PLAY_ANIMATION:
-                # Future hook for animations
-                pass
-            elif action == EffectAction.PLAY_SOUND:
-                # Future hook for sound effects
-                pass
-            else:
-                print(f"Invalid effect action: {action} -- {value} -- {self.text}")
\ No newline at end of file
+        """
+        Apply the effects of a choice outcome.
+        :param outcome: One of this choice's outcomes; any other outcome has its effects bound first.
+        """
+        for index, candidate in enumerate(self.outcomes):
+            if candidate is outcome:
+                apply_effects(self.bound_effects[index], player)
+                return
+        apply_effects(bind_effects(outcome.get("effects", ())), player)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+from collections.abc import Mapping
+from enum import Enum
+from typing import Any, Callable, TYPE_CHECKING
+from classes.Player.definition_cache import get_definition_cache
+from classes.Player.flag_manager import intern_flag
+if TYPE_CHECKING:
+    from classes.Player.item_registry import ItemRegistry
+    from classes.Player.player import Player
+
+EffectHandler = Callable[["Player", Any], None]
+BoundEffect = tuple[EffectHandler, Any]
+
+class EffectAction(Enum):
+    MODIFY_HP = "modify_hp"  # Increase the player's HP
+    MODIFY_MP = "modify_mp"  # Increase the player's MP
+    MODIFY_XP = "modify_xp" # Increase the player's XP
+    MODIFY_DAY = "modify_day" # Increases the day
+    MARK_FLAG = "mark_flag"  # Mark a flag
+    UNMARK_FLAG = "unmark_flag"  # Unmark a flag
+    GAIN_ITEM = "gain_item"  # Add an item to the player's inventory
+    CONSUME_ITEM = "consume_item"  # Remove an item from the player's inventory
+    MODIFY_STAT = "modify_stat"  # Modify a specific stat
+    SET_NEXT_EVENT = "set_next_event"  # Transition to a specific event
+    LEARN_SPELL = "learn_spell"  # Teach the player a spell
+    PLAY_ANIMATION = "play_animation"  # Play a specific animation or effect
+    PLAY_SOUND = "play_sound"  # Play a specific sound
+
+# action name -> (handler, value converter run once at bind time)
+EFFECT_HANDLERS: dict[str, tuple[EffectHandler, Callable[[Any], Any]]] = {}
+
+def no_conversion(value):
+    return value
+
+def register_effect(action: str | EffectAction, handler: EffectHandler = None, convert: Callable[[Any], Any] = no_conversion):
+    """
+    Register the handler for an effect action. Can also be used as a decorator.
+    Effects are bound when events are loaded, so register custom actions before loading events.
+    :param action: The action name used in the events file (e.g., "grant_gold").
+    :param handler: A function taking (player, value).
+    :param convert: Optional function converting the raw JSON value once, when the effect is bound.
+    """
+    name = action.value if isinstance(action, EffectAction) else action
+
+    def register(handler: EffectHandler) -> EffectHandler:
+        EFFECT_HANDLERS[name] = (handler, convert)
+        return handler
+
+    if handler is None:
+        return register
+    return register(handler)
+
+def bind_effect(effect: dict) -> BoundEffect:
+    """
+    Resolve an effect's handler and convert its value.
+    :param effect: A dictionary with "action" and "value" keys.
+    :return: A (handler, value) pair ready to apply.
+    :raises ValueError: If no handler is registered for the action.
+    """
+    try:
+        handler, convert = EFFECT_HANDLERS[effect["action"]]
+    except KeyError:
+        raise ValueError(f"Invalid effect action: {effect.get('action')}") from None
+    return handler, convert(effect.get("value"))
+
+def bind_effects(effects) -> tuple[BoundEffect, ...]:
+    """Bind a list of effects, in order."""
+    return tuple(bind_effect(effect) for effect in effects)
+
+def apply_effects(bound_effects: tuple[BoundEffect, ...], player: Player) -> None:
+    """
+    Apply bound effects in order. Derived stats are recalculated once at the end
+    rather than after every individual stat change.
+    """
+    with player.stats.deferred_recalculation():
+        for handler, value in bound_effects:
+            handler(player, value)
+
+######################################################################################
+# Built-in effects
+
+def modify_stat(player: Player, value) -> None:
+    player.stats.modify_stats(value if isinstance(value, (list, tuple)) else [value])
+
+def no_effect(player: Player, value) -> None:
+    # Future hook for animations and sound effects
+    pass
+
+# The catalogs item effects refer to: SaveManager's defaults, until set_item_files points elsewhere
+item_files: tuple[str, ...] = ("data/consumables.json", "data/equipment.json", "data/plotitems.json")
+
+def set_item_files(paths: tuple[str, ...]) -> None:
+    """
+    Use different item catalogs for gain_item and consume_item effects (e.g., a SaveManager's item_files).
+    Effects look items up when they run, so this may be called after events are compiled.
+    """
+    global item_files
+    item_files = tuple(paths)
+
+def item_registry() -> ItemRegistry:
+    """The shared registry for item_files (see DefinitionCache)."""
+    return get_definition_cache().get_registry(item_files)
+
+def item_grant(value) -> tuple[int, int]:
+    """
+    Convert an item effect's value, either a ref or {"ref": ref, "count": count}, into (ref, count).
+    The ref is checked against the item catalogs when the effect runs, not here.
+    :raises ValueError: If the ref or count is not a number.
+    """
+    if isinstance(value, Mapping):
+        ref, count = value.get("ref"), value.get("count", 1)
+    else:
+        ref, count = value, 1
+    try:
+        return int(ref), int(count)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid item reference: {ref!r} (count {count!r})") from None
+
+def gain_item(player: Player, value: tuple[int, int]) -> None:
+    ref, count = value
+    # A new instance per grant; the registry shares the item's definition
+    item = item_registry().create_item(ref)
+    if item is not None:
+        player.inventory.add_item(item, count)
+
+def consume_item(player: Player, value: tuple[int, int]) -> None:
+    ref, count = value
+    definition = item_registry().get_definition(ref)
+    if definition is None:
+        print(f"Unknown item reference: {ref}")
+        return
+    player.inventory.remove_item(definition.name, count)
+
+register_effect(EffectAction.MODIFY_HP, lambda player, value: player.stats.modify_hp(value), int)
+register_effect(EffectAction.MODIFY_MP, lambda player, value: player.stats.modify_mp(value), int)
+register_effect(EffectAction.MODIFY_XP, lambda player, value: player.stats.gain_exp(value), int)
+register_effect(EffectAction.MODIFY_DAY, lambda player, value: player.stats.modify_day(value), float)
+register_effect(EffectAction.MARK_FLAG, lambda player, value: player.flags.set_flag_id(value), intern_flag)
+register_effect(EffectAction.UNMARK_FLAG, lambda player, value: player.flags.clear_flag_id(value), intern_flag)
+register_effect(EffectAction.GAIN_ITEM, gain_item, item_grant)
+register_effect(EffectAction.CONSUME_ITEM, consume_item, item_grant)
+register_effect(EffectAction.MODIFY_STAT, modify_stat)
+register_effect(EffectAction.SET_NEXT_EVENT, lambda player, value: player.stats.advance_event(value), int)
+register_effect(EffectAction.LEARN_SPELL, lambda player, value: player.spell_manager.add_spell(value))
+register_effect(EffectAction.PLAY_ANIMATION, no_effect)
+register_effect(EffectAction.PLAY_SOUND, no_effect)
@@ -23,23 +23,28 @@ class Event:
         self.reference_number = reference_number
         self.name = name
         self.event_text = event_text
-        self.choices = choices
+        self.choices: tuple[Choice, ...] = tuple(choices)
         self.background_img = background_img
         self.background_music = background_music
+        # Every event reachable from this one through any choice outcome
+        self.transitions: tuple[int, ...] = tuple(dict.fromkeys(target for choice in self.choices for target in choice.transitions))
 
     @staticmethod
     def create_event(reference:int, data: dict):
         """
         Factory method to create an event based on the data dictionary.
-        :param data: A dictionary containing event properties.
+        :param reference: The event's reference number.
+        :param data: A dictionary of event properties keyed by reference number.
         :return: An instance of Event.
         """
+        event = data[str(reference)]
         return Event(
-            name=data[reference]["name"],
-            event_text=data[reference]["event_text"],
-            choices=[Choice.create_choice(choice) for choice in data[reference]["choices"]],
-            background_img=data[reference]["background_img"],
-            background_music=data[reference]["background_music"],
+            reference_number=int(reference),
+            name=event["name"],
+            event_text=event["event_text"],
+            choices=[Choice.create_choice(choice) for choice in event.get("choices", [])],
+            background_img=event.get("background_img", ""),
+            background_music=event.get("background_music", ""),
         )
 
     def get_available_choices(self, player:Player) -> list[Choice]:
@@ -48,7 +53,7 @@ class Event:
             :param player: The player object to evaluate choice conditions.
             :return: A list of choices available to the player.
             """
-            return [choice for choice in self.choices if choice.is_available(player)]
+            return [choice for choice in self.choices if choice.requirement_check(player)]
     
     def display_event(self, player:Player) -> StructuredEvent:
         """Returns a dictionary representation of the event.
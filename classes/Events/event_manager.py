@@ -0,0 +1,102 @@
+from __future__ import annotations
+import json
+from collections import deque
+from typing import TypedDict
+from classes.Events.event import Event
+
+class GraphReport(TypedDict):
+    dangling: list[tuple[int, int, int]]  # (event, choice index, missing target)
+    unreachable: list[int]
+    dead_ends: list[int]
+
+class EventManager:
+    def __init__(self, events_file: str = "data/test_events.json", start_event: int = 1, verbose: bool = True):
+        """
+        Loads an events file once and compiles it into an indexed story graph.
+        :param events_file: Path to the JSON events file.
+        :param start_event: The reference number the story starts from (used for reachability).
+        :param verbose: Whether to print the validation report after the graph is built.
+        """
+        self.events_file = events_file
+        self.start_event = start_event
+        self.events: dict[int, Event] = self.load_events(events_file)
+        self.report: GraphReport = self.validate()
+        if verbose:
+            self.print_report()
+
+    @staticmethod
+    def load_events(events_file: str) -> dict[int, Event]:
+        """Parse the events file and build every Event (and its choices) exactly once."""
+        with open(events_file, "r") as f:
+            data = json.load(f)
+        raw_events = data.get("events", data)
+        return {int(reference): Event.create_event(reference, raw_events) for reference in raw_events}
+
+    def get_event(self, reference: int) -> Event:
+        """
+        Get a compiled event by reference number.
+        :param reference: The event's reference number.
+        :return: The Event instance.
+        """
+        try:
+            return self.events[reference]
+        except KeyError:
+            raise KeyError(f"Event {reference} not found in {self.events_file}.") from None
+
+    def __contains__(self, reference: int) -> bool:
+        return reference in self.events
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def validate(self) -> GraphReport:
+        """
+        Check the graph for transitions to missing events, events that cannot be reached from
+        the start event, and events that have no way out to another event.
+        :return: A GraphReport describing every problem found.
+        """
+        dangling = []
+        dead_ends = []
+        for reference, event in self.events.items():
+            for index, choice in enumerate(event.choices):
+                for target in choice.transitions:
+                    if target not in self.events:
+                        dangling.append((reference, index, target))
+            if not any(target != reference for target in event.transitions):
+                dead_ends.append(reference)
+
+        # Breadth-first search over the transitions from the start event
+        reached = set()
+        if self.start_event in self.events:
+            reached.add(self.start_event)
+            queue = deque([self.start_event])
+            while queue:
+                for target in self.events[queue.popleft()].transitions:
+                    if target in self.events and target not in reached:
+                        reached.add(target)
+                        queue.append(target)
+        unreachable = [reference for reference in self.events if reference not in reached]
+
+        return {"dangling": dangling, "unreachable": unreachable, "dead_ends": dead_ends}
+
+    def print_report(self) -> None:
+        """Print any problems found while validating the graph."""
+        if self.start_event not in self.events:
+            print(f"Warning: Start event {self.start_event} not found in {self.events_file}.")
+        for reference, index, target in self.report["dangling"]:
+            print(f"Warning: Event {reference} choice {index} transitions to missing event {target}.")
+        if self.report["unreachable"]:
+            print(f"Warning: Unreachable events: {self.report['unreachable']}")
+        if self.report["dead_ends"]:
+            print(f"Warning: Dead-end events: {self.report['dead_ends']}")
+        print(f"Loaded {len(self.events)} events from {self.events_file}.")
+
+# events file -> the story graph, built once per process and shared read-only
+event_graphs: dict[str, EventManager] = {}
+
+def get_event_graph(events_file: str) -> EventManager:
+    """The process-wide graph for an events file (e.g., shared by simulator runs or server sessions)."""
+    graph = event_graphs.get(events_file)
+    if graph is None:
+        graph = event_graphs[events_file] = EventManager(events_file, verbose=False)
+    return graph
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import random
+from bisect import bisect_right
+from typing import TYPE_CHECKING
+from classes.Events.requirements import STAT_REQUIREMENTS
+if TYPE_CHECKING:
+    from classes.Events.choice import Outcome
+    from classes.Player.player import Player
+
+STAT_KEYS = frozenset(requirement.value for requirement in STAT_REQUIREMENTS)
+
+default_rng = random.Random()
+
+def merge_threshold(threshold) -> dict[str, int]:
+    """
+    Flatten a threshold list (e.g., [{"strength": 15}, {"agility": 12}]) into one {stat: minimum} dict.
+    :raises ValueError: If the threshold uses something other than a stat.
+    """
+    merged: dict[str, int] = {}
+    for condition in threshold or ():
+        for stat, minimum in condition.items():
+            if stat not in STAT_KEYS:
+                raise ValueError(f"Invalid threshold key: {stat}")
+            merged[stat] = max(minimum, merged.get(stat, minimum))
+    return merged
+
+class OutcomeResolver:
+    def __init__(self, outcomes: tuple[Outcome, ...]):
+        """
+        Pre-sorts a choice's outcomes so the winning outcome can be picked without re-checking every one.
+        - Thresholds on a single stat are searched with bisect (highest threshold met wins).
+        - Thresholds on several stats are scanned in dominance order (strictest first).
+        - If any outcome has a "weight", eligible outcomes are rolled for instead.
+        :param outcomes: The choice's outcomes, in file order.
+        """
+        self.outcomes = outcomes
+        self.thresholds: tuple[dict[str, int], ...] = tuple(merge_threshold(outcome.get("threshold")) for outcome in outcomes)
+        threshold_stats = {stat for threshold in self.thresholds for stat in threshold}
+
+        if any("weight" in outcome for outcome in outcomes):
+            self.mode = "weighted"
+            self.weights: tuple[float, ...] = tuple(outcome.get("weight", 1) for outcome in outcomes)
+        elif len(threshold_stats) <= 1:
+            self.mode = "single"
+            self.stat: str = next(iter(threshold_stats), "level")
+            # Outcomes without a threshold always match, so they sort to the bottom
+            ranked: dict[float, int] = {}
+            for index in sorted(range(len(outcomes)), key=lambda index: self.thresholds[index].get(self.stat, float("-inf"))):
+                ranked.setdefault(self.thresholds[index].get(self.stat, float("-inf")), index)  # file order wins ties
+            self.minimums: list[float] = list(ranked)
+            self.ranked_indices: list[int] = list(ranked.values())
+        else:
+            self.mode = "dominance"
+            # Sorting by the sum of minimums puts every outcome ahead of the ones it dominates
+            self.ordered: tuple[tuple[tuple[tuple[str, int], ...], int], ...] = tuple(
+                (tuple(self.thresholds[index].items()), index)
+                for index in sorted(range(len(outcomes)), key=lambda index: -sum(self.thresholds[index].values()))
+            )
+
+    def resolve(self, player: Player, rng: random.Random = None) -> Outcome | None:
+        """
+        Pick the outcome for a player.
+        :param player: The player making the choice.
+        :param rng: Random number generator for weighted outcomes (seed it for reproducible rolls).
+        :return: The winning outcome, or None if no threshold is met.
+        """
+        index = self.resolve_index(player, rng)
+        return None if index is None else self.outcomes[index]
+
+    def resolve_index(self, player: Player, rng: random.Random = None) -> int | None:
+        """Like resolve, but returns the winning outcome's position in the choice's outcomes."""
+        stats = player.stats.effective_stats
+        if self.mode == "single":
+            position = bisect_right(self.minimums, stats.get(self.stat, 0))
+            return self.ranked_indices[position - 1] if position else None
+
+        if self.mode == "dominance":
+            for threshold, index in self.ordered:
+                for stat, minimum in threshold:
+                    if stats.get(stat, 0) < minimum:
+                        break
+                else:
+                    return index
+            return None
+
+        eligible = self.eligible_weights(stats)
+        if not eligible:
+            return None
+        indices, weights = zip(*eligible)
+        return (rng or default_rng).choices(indices, weights=weights)[0]
+
+    def eligible_weights(self, stats) -> list[tuple[int, float]]:
+        """(outcome index, weight) for every weighted outcome whose threshold the stats meet."""
+        return [
+            (index, weight) for index, (threshold, weight) in enumerate(zip(self.thresholds, self.weights))
+            if all(stats.get(stat, 0) >= minimum for stat, minimum in threshold.items())
+        ]
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from enum import Enum
+from typing import Callable, TYPE_CHECKING
+from classes.Player.flag_manager import flag_registry
+if TYPE_CHECKING:
+    from classes.Player.player import Player
+
+Predicate = Callable[["Player"], bool]
+
+class Requirement(Enum):
+    STRENGTH = "strength"
+    AGILITY = "agility"
+    STAMINA = "stamina"
+    WILLPOWER = "willpower"
+    CHARISMA = "charisma"
+    LEVEL = "level"
+    ITEM = "item"
+    FLAG = "flag"
+    SPELL = "spell"
+
+    @staticmethod
+    def from_string(key: str):
+        """Convert a string key to a Requirement enum."""
+        try:
+            return Requirement(key)
+        except ValueError:
+            raise ValueError(f"Invalid requirement key: {key}")
+
+STAT_REQUIREMENTS = frozenset({
+    Requirement.STRENGTH, Requirement.AGILITY, Requirement.STAMINA,
+    Requirement.WILLPOWER, Requirement.CHARISMA, Requirement.LEVEL,
+})
+
+def always_available(player: Player) -> bool:
+    return True
+
+def compile_requirements(conditions) -> Predicate:
+    """
+    Compile a list of requirement conditions into a single predicate, once, at load time.
+    Conditions are grouped by kind and checked cheapest first (stats, flags, spells, items),
+    short-circuiting on the first failure.
+    :param conditions: A list of single-key dictionaries (e.g., [{"strength": 10}, {"flag": "met_king"}]).
+    :return: A function taking a player and returning whether every condition is met.
+    :raises ValueError: If a condition uses an unknown requirement key.
+    """
+    stat_minimums: dict[str, int] = {}
+    flags: list[str] = []
+    spells: list[str] = []
+    items: list[str] = []
+
+    for condition in conditions:
+        for key, value in condition.items():
+            requirement = Requirement.from_string(key)
+            if requirement in STAT_REQUIREMENTS:
+                if not isinstance(value, (int, float)):
+                    raise ValueError(f"Requirement '{key}' needs a number, got {value!r}.")
+                # Several thresholds on the same stat collapse into the strictest one
+                stat_minimums[key] = max(value, stat_minimums.get(key, value))
+            elif requirement == Requirement.FLAG:
+                flags.append(value)
+            elif requirement == Requirement.SPELL:
+                spells.append(value)
+            elif requirement == Requirement.ITEM:
+                items.append(value)
+
+    checks: list[Predicate] = []
+    if stat_minimums:
+        checks.append(_compile_stat_check(tuple(stat_minimums.items())))
+    if flags:
+        checks.append(_compile_flag_check(flag_registry.mask(flags)))
+    if spells:
+        checks.append(_compile_lookup_check(tuple(spells), lambda player: player.spell_manager.has_spell))
+    if items:
+        checks.append(_compile_lookup_check(tuple(items), lambda player: player.inventory.check_item))
+
+    if not checks:
+        return always_available
+    if len(checks) == 1:
+        return checks[0]
+    checks = tuple(checks)
+
+    def check_all(player: Player) -> bool:
+        for check in checks:
+            if not check(player):
+                return False
+        return True
+    return check_all
+
+def _compile_stat_check(stat_minimums: tuple[tuple[str, int], ...]) -> Predicate:
+    if len(stat_minimums) == 1:
+        (stat, minimum), = stat_minimums
+
+        def check_stat(player: Player) -> bool:
+            return player.stats.effective_stats.get(stat, 0) >= minimum
+        return check_stat
+
+    def check_stats(player: Player) -> bool:
+        stats = player.stats.effective_stats
+        for stat, minimum in stat_minimums:
+            if stats.get(stat, 0) < minimum:
+                return False
+        return True
+    return check_stats
+
+def _compile_flag_check(mask: int) -> Predicate:
+    """Flags are interned when the requirement is compiled, so the check is a single bitmask test."""
+    def check_flags(player: Player) -> bool:
+        return player.flags.has_all_mask(mask)
+    return check_flags
+
+def _compile_lookup_check(keys: tuple[str, ...], resolve: Callable) -> Predicate:
+    """Build a check that every key passes the lookup method returned by resolve(player)."""
+    if len(keys) == 1:
+        key, = keys
+
+        def check_key(player: Player) -> bool:
+            return bool(resolve(player)(key))
+        return check_key
+
+    def check_keys(player: Player) -> bool:
+        lookup = resolve(player)
+        for key in keys:
+            if not lookup(key):
+                return False
+        return True
+    return check_keys
@@ -0,0 +1,294 @@
+from __future__ import annotations
+import contextlib
+import os
+import pickle
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Optional, TYPE_CHECKING, TypedDict
+from classes.Events.event_manager import get_event_graph
+if TYPE_CHECKING:
+    from classes.Events.choice import Choice, Outcome
+    from classes.Events.event import Event
+    from classes.Player.player import Player
+
+# Why a playthrough stopped
+ENDED = "ended"  # Reached an ending (an event with no way out to another event)
+SOFT_LOCK = "soft_lock"  # Stuck before an ending (see Simulator.play)
+MISSING_EVENT = "missing_event"  # Sent to an event that is not in the graph
+
+class RunResult(TypedDict):
+    seed: int
+    status: str
+    event: int  # The event the run stopped at
+    reason: str  # Why a soft-locked run is stuck ("" otherwise)
+    visited: list[int]  # Events reached, in first-visit order
+    steps: int
+    level: int
+    hp: int
+    flags: dict[str, Any]
+
+class EndingReport(TypedDict):
+    count: int
+    levels: dict[int, int]  # level -> runs
+    hp_min: int
+    hp_max: int
+    hp_mean: float
+
+class SoftLockReport(TypedDict):
+    count: int
+    reasons: dict[str, int]
+    seed: int  # A seed that reproduces the soft lock
+
+class SimulationReport(TypedDict):
+    runs: int
+    statuses: dict[str, int]
+    reach: dict[int, float]  # event -> fraction of runs that reached it
+    endings: dict[int, EndingReport]
+    soft_locks: dict[int, SoftLockReport]  # event -> runs stuck there
+    flags: dict[str, dict[Any, int]]  # flag -> value at the end of the run -> runs (runs without the flag are not counted)
+    mean_steps: float
+
+######################################################################################
+# Choice policies: called with (player, event, available choices, rng) and return the choice to make
+
+ChoicePolicy = Callable[["Player", "Event", "list[Choice]", random.Random], "Choice"]
+
+class RandomPolicy:
+    """Pick any available choice, uniformly."""
+    def __call__(self, player: Player, event: Event, choices: list[Choice], rng: random.Random) -> Choice:
+        return rng.choice(choices)
+
+class GreedyPolicy:
+    def __init__(self, weights: dict[str, float] = None):
+        """
+        Pick the choice whose outcome scores best on average, breaking ties at random.
+        :param weights: Effect action -> weight applied to the effect's value (e.g., {"modify_xp": 1, "modify_hp": 2}).
+        """
+        self.weights = weights if weights is not None else {"modify_xp": 1, "modify_hp": 1}
+
+    def score(self, outcome: Optional[Outcome]) -> float:
+        if outcome is None:
+            return float("-inf")
+        score = 0.0
+        for effect in outcome.get("effects", ()):
+            weight = self.weights.get(effect.get("action"))
+            if weight:
+                try:
+                    score += weight * float(effect["value"])
+                except (TypeError, ValueError):
+                    pass
+        return score
+
+    def expected_score(self, player: Player, choice: Choice) -> float:
+        """The choice's score, averaged over its weighted outcomes; the run's rolls are left untouched."""
+        resolver = choice.outcome_resolver
+        if resolver.mode != "weighted":
+            return self.score(resolver.resolve(player))
+        eligible = resolver.eligible_weights(player.stats.effective_stats)
+        total = sum(weight for _, weight in eligible)
+        if not total:
+            return float("-inf")
+        return sum(weight * self.score(choice.outcomes[index]) for index, weight in eligible) / total
+
+    def __call__(self, player: Player, event: Event, choices: list[Choice], rng: random.Random) -> Choice:
+        scored = [(self.expected_score(player, choice), rng.random(), index) for index, choice in enumerate(choices)]
+        return choices[max(scored)[2]]
+
+class ScriptedPolicy:
+    def __init__(self, script: dict[int, str | int], fallback: ChoicePolicy = None):
+        """
+        Make set choices at set events, e.g. to replay a route through the story.
+        :param script: Event reference -> the choice's text, or its index among the event's choices.
+        :param fallback: Policy for events not in the script, or whose scripted choice is unavailable. Defaults to random.
+        """
+        self.script = {int(event): choice for event, choice in script.items()}
+        self.fallback = fallback or RandomPolicy()
+
+    def __call__(self, player: Player, event: Event, choices: list[Choice], rng: random.Random) -> Choice:
+        scripted = self.script.get(event.reference_number)
+        if isinstance(scripted, int) and 0 <= scripted < len(event.choices):
+            scripted = event.choices[scripted].text
+        for choice in choices:
+            if choice.text == scripted:
+                return choice
+        return self.fallback(player, event, choices, rng)
+
+######################################################################################
+
+class SimulationTally:
+    def __init__(self):
+        """Running totals over many playthroughs, small enough to send back from a worker process."""
+        self.runs = 0
+        self.steps = 0
+        self.statuses: Counter = Counter()
+        self.reached: Counter = Counter()
+        self.endings: dict[int, list] = {}  # event -> [count, level counter, hp min, hp max, hp sum]
+        self.soft_locks: dict[int, list] = {}  # event -> [count, reason counter, first seed]
+        self.flags: dict[str, Counter] = {}
+
+    def add(self, result: RunResult) -> None:
+        self.runs += 1
+        self.steps += result["steps"]
+        self.statuses[result["status"]] += 1
+        self.reached.update(result["visited"])
+        for flag, value in result["flags"].items():
+            self.flags.setdefault(flag, Counter())[value] += 1
+        if result["status"] == ENDED:
+            ending = self.endings.setdefault(result["event"], [0, Counter(), result["hp"], result["hp"], 0])
+            ending[0] += 1
+            ending[1][result["level"]] += 1
+            ending[2] = min(ending[2], result["hp"])
+            ending[3] = max(ending[3], result["hp"])
+            ending[4] += result["hp"]
+        elif result["status"] == SOFT_LOCK:
+            soft_lock = self.soft_locks.setdefault(result["event"], [0, Counter(), result["seed"]])
+            soft_lock[0] += 1
+            soft_lock[1][result["reason"]] += 1
+            soft_lock[2] = min(soft_lock[2], result["seed"])
+
+    def merge(self, other: SimulationTally) -> None:
+        self.runs += other.runs
+        self.steps += other.steps
+        self.statuses.update(other.statuses)
+        self.reached.update(other.reached)
+        for flag, values in other.flags.items():
+            self.flags.setdefault(flag, Counter()).update(values)
+        for event, (count, levels, hp_min, hp_max, hp_sum) in other.endings.items():
+            ending = self.endings.setdefault(event, [0, Counter(), hp_min, hp_max, 0])
+            ending[0] += count
+            ending[1].update(levels)
+            ending[2] = min(ending[2], hp_min)
+            ending[3] = max(ending[3], hp_max)
+            ending[4] += hp_sum
+        for event, (count, reasons, seed) in other.soft_locks.items():
+            soft_lock = self.soft_locks.setdefault(event, [0, Counter(), seed])
+            soft_lock[0] += count
+            soft_lock[1].update(reasons)
+            soft_lock[2] = min(soft_lock[2], seed)
+
+    def report(self) -> SimulationReport:
+        runs = self.runs or 1
+        return {
+            "runs": self.runs,
+            "statuses": dict(self.statuses),
+            "reach": {event: count / runs for event, count in sorted(self.reached.items())},
+            "endings": {
+                event: {"count": count, "levels": dict(sorted(levels.items())), "hp_min": hp_min, "hp_max": hp_max, "hp_mean": hp_sum / count}
+                for event, (count, levels, hp_min, hp_max, hp_sum) in sorted(self.endings.items())
+            },
+            "soft_locks": {
+                event: {"count": count, "reasons": dict(reasons), "seed": seed}
+                for event, (count, reasons, seed) in sorted(self.soft_locks.items())
+            },
+            "flags": {flag: dict(values) for flag, values in sorted(self.flags.items())},
+            "mean_steps": self.steps / runs,
+        }
+
+######################################################################################
+
+class Simulator:
+    def __init__(self, events_file: str, player: Player, policy: ChoicePolicy = None, start_event: int = None, max_steps: int = 1000, quiet: bool = True):
+        """
+        Plays the story headlessly, many times over, to see where players actually go.
+        Each playthrough starts from a copy of the given player, as it was when the simulator was
+        built, and its own seeded random number generator, so any run can be replayed from its seed. Runs are spread over a process pool;
+        every worker loads the event graph once.
+        Custom effects and policies must be importable (module-level) to be used by worker processes.
+        :param events_file: The story to play.
+        :param player: The starting player. It is pickled once here and unpickled for every run,
+                       which is much cheaper than a deep copy.
+        :param policy: How choices are made. Defaults to RandomPolicy.
+        :param start_event: Where runs start. Defaults to the player's current event.
+        :param max_steps: Choices made before a run that has not reached an ending counts as soft-locked.
+        :param quiet: Silence what game code prints while playing.
+        """
+        self.events_file = events_file
+        self.player_state = pickle.dumps(player)
+        self.policy = policy or RandomPolicy()
+        self.start_event = start_event if start_event is not None else player.stats.meta_info["event"]
+        self.max_steps = max_steps
+        self.quiet = quiet
+
+    def play(self, seed: int) -> RunResult:
+        """
+        Play one run to an ending. A run is soft-locked when it is stuck at an event that is not an
+        ending: no choice is available, no available choice has an outcome the player qualifies for,
+        or max_steps choices go by without reaching an ending.
+        :param seed: Seed for the run's choices and weighted outcomes.
+        """
+        graph = get_event_graph(self.events_file)
+        endings = set(graph.report["dead_ends"])
+        rng = random.Random(seed)
+        player = pickle.loads(self.player_state)
+        stats = player.stats
+        stats.advance_event(self.start_event)
+        visited = {}
+        status, reason, steps = ENDED, "", 0
+        with contextlib.ExitStack() as stack:
+            if self.quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            while True:
+                reference = stats.meta_info["event"]
+                if reference not in graph:
+                    status = MISSING_EVENT
+                    break
+                visited[reference] = None
+                event = graph.get_event(reference)
+                if reference in endings or not event.choices:
+                    break
+                if steps >= self.max_steps:
+                    status, reason = SOFT_LOCK, "step limit"
+                    break
+                choices = event.get_available_choices(player)
+                if not choices:
+                    status, reason = SOFT_LOCK, "no available choice"
+                    break
+                # Choices that turn out to have no outcome for the player are set aside and another is tried
+                while choices:
+                    choice = self.policy(player, event, choices, rng)
+                    if choice.choose(player, rng) is not None:
+                        break
+                    choices = [other for other in choices if other is not choice]
+                else:
+                    status, reason = SOFT_LOCK, "no outcome"
+                    break
+                steps += 1
+        return {
+            "seed": seed,
+            "status": status,
+            "event": stats.meta_info["event"],
+            "reason": reason,
+            "visited": list(visited),
+            "steps": steps,
+            "level": stats.explicit_stats["level"],
+            "hp": stats.resources["hp"],
+            "flags": player.flags.list_flags(),
+        }
+
+    def play_many(self, seeds: Iterable[int]) -> SimulationTally:
+        """Play a run per seed in this process."""
+        tally = SimulationTally()
+        for seed in seeds:
+            tally.add(self.play(seed))
+        return tally
+
+    def run(self, runs: int, seed: int = 0, workers: int = None, chunk_size: int = None) -> SimulationReport:
+        """
+        Play many runs and summarize them.
+        :param runs: Number of playthroughs; run i uses seed + i.
+        :param seed: The first seed.
+        :param workers: Worker processes (None for one per CPU, 0 to play everything in this process).
+        :param chunk_size: Runs per task sent to a worker. Defaults to about four tasks per worker.
+        :return: The aggregate report.
+        """
+        seeds = range(seed, seed + runs)
+        if workers == 0:
+            return self.play_many(seeds).report()
+        workers = workers or os.cpu_count() or 1
+        chunk_size = chunk_size or max(1, -(-runs // (workers * 4)))
+        tally = SimulationTally()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for partial in executor.map(self.play_many, [seeds[start:start + chunk_size] for start in range(0, runs, chunk_size)]):
+                tally.merge(partial)
+        return tally.report()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+import copy
+import json
+import os
+import random
+from typing import TYPE_CHECKING
+from classes.Events.choice import Choice
+from classes.Events import effects
+from classes.Events.effects import register_effect
+from classes.Events.event_manager import EventManager
+from classes.Events.simulator import GreedyPolicy, ScriptedPolicy, Simulator
+if TYPE_CHECKING:
+    from classes.Player.player import Player
+
+
+class EventTestManager:
+    """A class that manages testing for events and choices."""
+    def __init__(self, player:Player, events_file:str):
+        self.test_player = copy.deepcopy(player)
+        self.events_file = events_file
+
+    def test_event_flow(self):
+        """Run tests for the compiled event graph."""
+        print("Starting Event tests...")
+
+        print("\n--- Testing Event Graph ---")
+        event_manager = EventManager(self.events_file)
+        assert len(event_manager) == 3, f"Expected 3 events, found {len(event_manager)}."
+        event = event_manager.get_event(1)
+        assert event.name == "The Forest Clearing", "Failed to index event 1."
+        assert event is event_manager.get_event(1), "Events should be built once and reused."
+        assert event.transitions == (2,), f"Unexpected transitions for event 1: {event.transitions}"
+        assert event_manager.report["dangling"] == [], "Unexpected dangling transitions."
+        assert event_manager.report["unreachable"] == [], "Unexpected unreachable events."
+        assert event_manager.report["dead_ends"] == [3], f"Expected event 3 to be a dead end, found {event_manager.report['dead_ends']}."
+        assert event_manager.get_event(3).choices[0].min_requirement == (), "Empty requirements should be dropped."
+        print("Event graph passed.")
+
+        print("\n--- Testing Choice Availability ---")
+        available = event.get_available_choices(self.test_player)
+        assert len(available) == 1, "Fight choice should be available with 10 strength."
+        self.test_player.stats.modify_stats([{"strength": -1}])
+        assert event.get_available_choices(self.test_player) == [], "Fight choice should be unavailable below 10 strength."
+        self.test_player.stats.modify_stats([{"strength": 1}])
+        choice = event.choices[0]
+        assert choice.evaluate_condition({"strength": 10}, self.test_player), "Stat condition failed."
+        assert not choice.evaluate_condition({"flag": "met_goblin"}, self.test_player), "Unset flag should fail."
+        assert not choice.evaluate_condition({"luck": 3}, self.test_player), "Unknown keys should fail."
+        try:
+            Choice.create_choice({"text": "Bad", "min_requirement": [{"luck": 3}], "outcomes": []})
+            assert False, "Unknown requirement keys should be rejected when the choice is compiled."
+        except ValueError:
+            pass
+        print("Choice availability passed.")
+
+        print("\n--- Testing Outcome Effects ---")
+        stats = self.test_player.stats
+        stats.modify_hp(500)
+        choice.apply_outcome(choice.outcomes[1], self.test_player)
+        assert stats.resources["hp"] == stats.derived_stats["max_hp"] - 5, "modify_hp effect failed."
+        assert stats.explicit_stats["exp"] == 20, "modify_xp effect failed."
+        assert stats.meta_info["event"] == 2, "set_next_event effect failed."
+
+        register_effect("test_gold", lambda player, value: player.flags.set_flag("gold", value), int)
+        custom_choice = Choice.create_choice({"text": "Loot", "outcomes": [{"threshold": [{}], "text": "", "effects": [
+            {"action": "test_gold", "value": "7"},
+            {"action": "modify_day", "value": ".5"},
+            {"action": "modify_stat", "value": {"stamina": 2}},
+        ]}]})
+        custom_choice.apply_outcome(custom_choice.outcomes[0], self.test_player)
+        assert self.test_player.flags.check_flag("gold") == 7, "Custom effect failed."
+        assert stats.meta_info["day"] == 1.5, "modify_day effect failed."
+        assert stats.explicit_stats["stamina"] == 12, "modify_stat effect failed."
+        assert stats.derived_stats["max_hp"] == stats.calculate_hp(), "Derived stats not recalculated after effects."
+        loot = Choice.create_choice({"text": "Loot", "outcomes": [{"threshold": [{}], "text": "", "effects": [
+            {"action": "gain_item", "value": {"ref": 1, "count": 3}},
+            {"action": "consume_item", "value": 1},
+        ]}]})
+        assert loot.choose(self.test_player) is loot.outcomes[0], "Expected the only outcome."
+        assert self.test_player.inventory.count_item("Health Potion") == 2, "gain_item/consume_item effects failed."
+        loot.apply_outcome(dict(loot.outcomes[0]), self.test_player)  # Equal to, but not, the choice's outcome
+        assert self.test_player.inventory.count_item("Health Potion") == 4, "Outcomes from elsewhere should still apply."
+        self.test_player.inventory.remove_item("Health Potion", 4)
+        study = Choice.create_choice({"text": "Study", "outcomes": [{"threshold": [{}], "text": "", "effects": [
+            {"action": "learn_spell", "value": {"name": "Mend", "description": "", "mana_cost": 5, "rank": 1, "effects": [{"action": "modify_hp", "value": 10}]}},
+        ]}]})
+        study.choose(self.test_player)
+        mend = self.test_player.spell_manager.get_spell("Mend")
+        assert type(mend) is dict and mend["effects"] == [{"action": "modify_hp", "value": 10}], "Inline spells should be learned as plain data."
+        hp = stats.resources["hp"]
+        self.test_player.spell_manager.use_spell("Mend", self.test_player)
+        assert stats.resources["hp"] == min(hp + 10, stats.derived_stats["max_hp"]) > hp, "Inline spell effects failed."
+        # Item refs are looked up when the effect runs, so unknown ones are skipped then
+        missing = Choice.create_choice({"text": "Loot", "outcomes": [{"threshold": [{}], "text": "", "effects": [
+            {"action": "gain_item", "value": 9999},
+            {"action": "consume_item", "value": {"ref": 9999, "count": 2}},
+        ]}]})
+        slots = list(self.test_player.inventory.items)
+        missing.apply_outcome(missing.outcomes[0], self.test_player)
+        assert self.test_player.inventory.items == slots, "Unknown item refs should change nothing."
+        default_files = effects.item_files
+        effects.set_item_files(("data/equipment.json",))  # Compiled effects follow the configured catalogs
+        try:
+            loot.apply_outcome(loot.outcomes[0], self.test_player)
+            assert self.test_player.inventory.items == slots, "Items outside the configured catalogs should be skipped."
+        finally:
+            effects.set_item_files(default_files)
+        for effect in ({"action": "explode", "value": 1}, {"action": "gain_item", "value": "sword"}):
+            try:
+                Choice.create_choice({"text": "Bad", "outcomes": [{"threshold": [{}], "text": "", "effects": [effect]}]})
+                assert False, f"Invalid effects should be rejected when the choice is compiled: {effect}"
+            except ValueError:
+                pass
+        print("Outcome effects passed.")
+
+        print("\n--- Testing Outcome Resolution ---")
+        player = copy.deepcopy(self.test_player)
+        player.stats.explicit_stats["strength"] = 12
+        assert choice.resolve_outcome(player) is choice.outcomes[1], "Expected the strength 10 outcome."
+        player.stats.explicit_stats["strength"] = 15
+        assert choice.resolve_outcome(player) is choice.outcomes[0], "Expected the strength 15 outcome."
+        player.stats.explicit_stats["strength"] = 9
+        assert choice.resolve_outcome(player) is None, "No outcome should match below every threshold."
+
+        graded = Choice.create_choice({"text": "Graded", "outcomes": [
+            {"threshold": [{"strength": 12}], "text": "strength", "effects": []},
+            {"threshold": [{"strength": 12}, {"agility": 12}], "text": "both", "effects": []},
+            {"threshold": [{}], "text": "fallback", "effects": []},
+        ]})
+        player.stats.explicit_stats.update({"strength": 12, "agility": 12})
+        assert graded.resolve_outcome(player)["text"] == "both", "Dominant outcome should win."
+        player.stats.explicit_stats["agility"] = 11
+        assert graded.resolve_outcome(player)["text"] == "strength", "Expected the strength-only outcome."
+        player.stats.explicit_stats["strength"] = 1
+        assert graded.resolve_outcome(player)["text"] == "fallback", "Expected the fallback outcome."
+
+        weighted = Choice.create_choice({"text": "Gamble", "outcomes": [
+            {"threshold": [{}], "weight": 3, "text": "win", "effects": []},
+            {"threshold": [{}], "weight": 1, "text": "lose", "effects": []},
+        ]})
+        rolls = [weighted.resolve_outcome(player, random.Random(seed))["text"] for seed in range(20)]
+        assert rolls == [weighted.resolve_outcome(player, random.Random(seed))["text"] for seed in range(20)], "Seeded rolls should repeat."
+        assert set(rolls) == {"win", "lose"}, f"Expected both weighted outcomes, got {set(rolls)}."
+        print("Outcome resolution passed.")
+
+        print("\n--- Testing Simulator ---")
+        start = copy.deepcopy(self.test_player)
+        start.stats.modify_hp(500)
+        report = Simulator(self.events_file, start, start_event=1).run(50, workers=0)
+        assert report["statuses"] == {"ended": 50} and report["reach"] == {1: 1.0, 2: 1.0, 3: 1.0}, f"Unexpected runs: {report}"
+        assert report["endings"][3]["hp_min"] == report["endings"][3]["hp_max"] == start.stats.derived_stats["max_hp"] - 15, "Unexpected HP at the ending."
+        assert report["flags"]["gold"] == {7: 50}, "Flags should be counted at the end of each run."
+        start.stats.modify_stats([{"strength": -1}])
+        report = Simulator(self.events_file, start, start_event=1).run(10, workers=0)
+        assert report["soft_locks"] == {1: {"count": 10, "reasons": {"no available choice": 10}, "seed": 0}}, f"Expected a soft lock at event 1: {report['soft_locks']}"
+        start.stats.modify_stats([{"strength": 1}])
+
+        # Left earns XP but needs 30 strength further on; Right sets a flag and may loop before the ending
+        story_file = os.path.join("saves", "simulator_story.json")
+        os.makedirs("saves", exist_ok=True)
+        with open(story_file, "w") as f:
+            json.dump({"events": {
+                "1": {"name": "Fork", "event_text": "", "choices": [
+                    {"text": "Left", "outcomes": [{"threshold": [{}], "text": "", "effects": [
+                        {"action": "modify_xp", "value": 10}, {"action": "set_next_event", "value": 2}]}]},
+                    {"text": "Right", "outcomes": [{"threshold": [{}], "text": "", "effects": [
+                        {"action": "mark_flag", "value": "went_right"}, {"action": "set_next_event", "value": 3}]}]},
+                    {"text": "Climb", "min_requirement": [{"strength": 50}], "outcomes": [{"threshold": [{}], "text": "", "effects": [
+                        {"action": "set_next_event", "value": 4}]}]},
+                ]},
+                "2": {"name": "Wall", "event_text": "", "choices": [
+                    {"text": "Push", "outcomes": [{"threshold": [{"strength": 30}], "text": "", "effects": [
+                        {"action": "set_next_event", "value": 5}]}]},
+                ]},
+                "3": {"name": "Maze", "event_text": "", "choices": [
+                    {"text": "Wander", "outcomes": [
+                        {"threshold": [{}], "weight": 1, "text": "", "effects": [{"action": "set_next_event", "value": 3}]},
+                        {"threshold": [{}], "weight": 1, "text": "", "effects": [{"action": "set_next_event", "value": 5}]},
+                    ]},
+                ]},
+                "4": {"name": "Peak", "event_text": "", "choices": [
+                    {"text": "Descend", "outcomes": [{"threshold": [{}], "text": "", "effects": [{"action": "set_next_event", "value": 5}]}]},
+                ]},
+                "5": {"name": "Home", "event_text": "", "choices": []},
+            }}, f)
+        simulator = Simulator(story_file, start, start_event=1)
+        report = simulator.run(400, seed=1, workers=0)
+        assert report["statuses"]["ended"] + report["statuses"]["soft_lock"] == 400, f"Unexpected statuses: {report['statuses']}"
+        assert report["reach"][1] == 1.0 and 4 not in report["reach"], "Unexpected reach probabilities."
+        assert 0.4 < report["reach"][2] < 0.6 and report["reach"][2] + report["reach"][5] == 1.0, f"Unexpected reach probabilities: {report['reach']}"
+        assert report["soft_locks"][2]["reasons"] == {"no outcome": report["statuses"]["soft_lock"]}, "Expected soft locks at the wall."
+        assert report["flags"]["went_right"] == {True: report["endings"][5]["count"]}, "Flag distribution failed."
+        assert report["mean_steps"] > 1.5, "Maze loops should add steps."
+        assert simulator.run(400, seed=1, workers=2) == report, "Runs in worker processes should match runs in this process."
+        greedy = Simulator(story_file, start, GreedyPolicy(), start_event=1).run(20, workers=0)
+        assert greedy["statuses"] == {"soft_lock": 20}, "Greedy play should always take the XP."
+        gamble = Choice.create_choice({"text": "Gamble", "outcomes": [
+            {"threshold": [{}], "weight": 1, "text": "", "effects": [{"action": "modify_xp", "value": 100}]},
+            {"threshold": [{}], "weight": 9, "text": "", "effects": [{"action": "modify_xp", "value": 0}]},
+        ]})
+        safe = Choice.create_choice({"text": "Safe", "outcomes": [{"threshold": [{}], "text": "", "effects": [{"action": "modify_xp", "value": 20}]}]})
+        picks = {GreedyPolicy()(start, None, [gamble, safe], random.Random(seed)).text for seed in range(50)}
+        assert picks == {"Safe"}, "Greedy play should score weighted outcomes by their expected value."
+        scripted = Simulator(story_file, start, ScriptedPolicy({1: "Right"}), start_event=1).run(20, workers=0)
+        assert scripted["statuses"] == {"ended": 20} and scripted["reach"][3] == 1.0, "Scripted play should always go right."
+        os.remove(story_file)
+        print("Simulator passed.")
+
+        print("\n--- All event tests passed! ---")
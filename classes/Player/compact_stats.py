@@ -0,0 +1,317 @@
+from __future__ import annotations
+from array import array
+from contextlib import nullcontext
+from collections.abc import MutableMapping
+from typing import Iterator
+from classes.Player import derived_stats as derived_registry
+from classes.Player.derived_stats import DERIVED_STATS
+from classes.Player.experience import get_xp_curve
+from classes.Player.status_effects import StatusManager
+
+EXPLICIT_STATS = ("strength", "agility", "stamina", "willpower", "charisma", "level", "exp")
+RESOURCES = ("hp", "mp")
+RESOURCE_CAPS = {"hp": "max_hp", "mp": "max_mp"}
+DEFAULT_EXPLICIT = (10, 10, 10, 10, 10, 1, 0)
+
+class StatLayout:
+    def __init__(self):
+        """
+        Fixed offsets into a CompactStats value array: explicit stats, then derived stats, then resources.
+        Derived stats are taken from the registry when the layout is built, and the layout goes stale
+        when the registry changes (see get_layout).
+        """
+        self.generation = derived_registry.generation
+        self.explicit = EXPLICIT_STATS
+        self.derived = tuple(DERIVED_STATS)
+        self.resources = RESOURCES
+        self.offsets: dict[str, int] = {}
+        for offset, name in enumerate(self.explicit + self.derived + self.resources):
+            self.offsets[name] = offset
+        self.derived_start = len(self.explicit)
+        self.resource_start = self.derived_start + len(self.derived)
+        self.size = self.resource_start + len(self.resources)
+        self.formulas = tuple(DERIVED_STATS[name] for name in self.derived)
+        # explicit stat -> bitmask of the derived stats that read it
+        self.dependent_masks: dict[str, int] = {name: 0 for name in self.explicit}
+        for bit, formula in enumerate(self.formulas):
+            for dependency in formula.depends_on:
+                if dependency in self.dependent_masks:
+                    self.dependent_masks[dependency] |= 1 << bit
+        self.all_derived_mask = (1 << len(self.derived)) - 1
+        self.cap_mask = 0
+        for cap in RESOURCE_CAPS.values():
+            self.cap_mask |= 1 << self.derived.index(cap)
+
+layout: StatLayout = None
+
+def get_layout() -> StatLayout:
+    """The shared layout, rebuilt whenever a derived stat is registered or removed."""
+    global layout
+    if layout is None or layout.generation != derived_registry.generation:
+        layout = StatLayout()
+    return layout
+
+######################################################################################
+
+class StatsView(MutableMapping):
+    __slots__ = ("stats", "names", "start")
+
+    def __init__(self, stats: CompactStats, names: tuple[str, ...], start: int):
+        """Dict-like window onto one section of a CompactStats value array."""
+        self.stats = stats
+        self.names = names
+        self.start = start
+
+    def __getitem__(self, name: str) -> int:
+        offset = self.stats.layout.offsets.get(name)
+        if offset is None or not self.start <= offset < self.start + len(self.names):
+            raise KeyError(name)
+        return self.stats.read(offset)
+
+    def __setitem__(self, name: str, value: int) -> None:
+        if name not in self.names:
+            raise KeyError(name)
+        self.stats.write(name, value)
+
+    def __delitem__(self, name: str) -> None:
+        raise TypeError("Stats cannot be removed.")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class ReadOnlyStatsView(StatsView):
+    __slots__ = ()
+
+    def __setitem__(self, name: str, value: int) -> None:
+        raise TypeError("Derived stats are read-only.")
+
+class MetaInfoView(MutableMapping):
+    __slots__ = ("stats",)
+    names = ("day", "event")
+
+    def __init__(self, stats: CompactStats):
+        """Dict-like window onto a CompactStats' day and event fields."""
+        self.stats = stats
+
+    def __getitem__(self, name: str) -> int | float:
+        if name not in self.names:
+            raise KeyError(name)
+        return getattr(self.stats, name)
+
+    def __setitem__(self, name: str, value: int | float) -> None:
+        if name not in self.names:
+            raise KeyError(name)
+        setattr(self.stats, name, value)
+
+    def __delitem__(self, name: str) -> None:
+        raise TypeError("Meta info cannot be removed.")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+######################################################################################
+
+class CompactStats:
+    __slots__ = ("_layout", "values", "fractions", "dirty", "day", "event", "_status_manager")
+
+    def __init__(self, initial_explicit: dict[str, int] = None) -> None:
+        """
+        Memory-light stats for NPCs and other large populations. Values live in one fixed-layout
+        integer array; derived stats are computed lazily and tracked with a dirty bitmask. The rare
+        derived stat whose formula gives a non-integer (e.g., "agility / 2") is kept in a small side dict.
+        Offers the same get / modify_stats / to_dict / load_from_dict API as Stats.
+        :param initial_explicit: A dictionary of initial explicit stats.
+        """
+        self._layout = get_layout()
+        self.values = array("q", bytes(8 * self.layout.size))
+        self.values[:len(EXPLICIT_STATS)] = array("q", DEFAULT_EXPLICIT)
+        self.fractions: dict[int, float] = None  # offset -> derived value the integer array cannot hold
+        self.dirty = self.layout.all_derived_mask
+        self.day = 1
+        self.event = 1
+        self._status_manager = None
+        if initial_explicit:
+            for stat, value in initial_explicit.items():
+                if stat in self.layout.dependent_masks:
+                    self.values[self.layout.offsets[stat]] = value
+        for resource, cap in RESOURCE_CAPS.items():
+            self.values[self.layout.offsets[resource]] = self.read(self.layout.offsets[cap])
+
+    @property
+    def layout(self) -> StatLayout:
+        """This instance's layout, moved to the current one if derived stats were registered or removed since."""
+        layout = self._layout
+        if layout.generation != derived_registry.generation:
+            layout = self.relayout()
+        return layout
+
+    def relayout(self) -> StatLayout:
+        """Copy explicit stats and resources into an array for the current layout; derived stats are recomputed on read."""
+        old, new = self._layout, get_layout()
+        values = array("q", bytes(8 * new.size))
+        for name in old.explicit + old.resources:
+            values[new.offsets[name]] = self.values[old.offsets[name]]
+        self._layout, self.values, self.fractions, self.dirty = new, values, None, new.all_derived_mask
+        return new
+
+    # Raw access
+    def read(self, offset: int) -> int | float:
+        """Read the value at an offset, computing a derived stat if it is out of date."""
+        layout = self.layout
+        if layout.derived_start <= offset < layout.resource_start:
+            bit = 1 << (offset - layout.derived_start)
+            if self.dirty & bit:
+                value = layout.formulas[offset - layout.derived_start].compute(self.explicit_stats)
+                if isinstance(value, int):
+                    self.values[offset] = value
+                    if self.fractions:
+                        self.fractions.pop(offset, None)
+                else:
+                    if self.fractions is None:
+                        self.fractions = {}
+                    self.fractions[offset] = value
+                self.dirty &= ~bit
+            if self.fractions and offset in self.fractions:
+                return self.fractions[offset]
+        return self.values[offset]
+
+    def write(self, stat: str, value: int) -> None:
+        """Write an explicit stat or resource, invalidating the derived stats that read it."""
+        self.values[self.layout.offsets[stat]] = value
+        mask = self.layout.dependent_masks.get(stat, 0)
+        if mask:
+            self.dirty |= mask
+            if mask & self.layout.cap_mask:
+                self.recalculate_derived_stats()
+
+    # Dict-like views, for code written against Stats
+    @property
+    def explicit_stats(self) -> StatsView:
+        return StatsView(self, self.layout.explicit, 0)
+
+    @property
+    def effective_stats(self) -> StatsView:
+        # CompactStats has no modifier layer; status effects change explicit stats in place
+        return self.explicit_stats
+
+    @property
+    def derived_stats(self) -> ReadOnlyStatsView:
+        return ReadOnlyStatsView(self, self.layout.derived, self.layout.derived_start)
+
+    @property
+    def resources(self) -> StatsView:
+        return StatsView(self, self.layout.resources, self.layout.resource_start)
+
+    @property
+    def meta_info(self) -> MetaInfoView:
+        return MetaInfoView(self)
+
+    @property
+    def status_manager(self) -> StatusManager:
+        # Most NPCs never get a status effect, so the manager is created on first use
+        if self._status_manager is None:
+            self._status_manager = StatusManager()
+        return self._status_manager
+
+    def deferred_recalculation(self):
+        """Stats API parity: CompactStats already recalculates lazily, so there is nothing to defer."""
+        return nullcontext(self)
+
+    def recalculate_derived_stats(self) -> None:
+        """Ensure temporary stats remain within bounds."""
+        offsets = self.layout.offsets
+        for resource, cap in RESOURCE_CAPS.items():
+            offset = offsets[resource]
+            self.values[offset] = min(self.values[offset], self.read(offsets[cap]))
+
+    # Stat modification methods
+    def get(self, stat: str) -> int:
+        """Get the value of a stat, derived stat, or resource."""
+        offset = self.layout.offsets.get(stat)
+        if offset is not None:
+            return self.read(offset)
+        if stat in ("day", "event"):
+            return getattr(self, stat)
+        raise KeyError(f"Stat '{stat}' not found in any category.")
+
+    def modify_stats(self, stat_modifications: list[dict[str, int]]) -> None:
+        """Modify explicit stats and recalculate derived stats."""
+        values, offsets, masks = self.values, self.layout.offsets, self.layout.dependent_masks
+        for stat_pair in stat_modifications:
+            for stat, value in stat_pair.items():
+                if stat in masks:
+                    values[offsets[stat]] += value
+                    self.dirty |= masks[stat]
+                else:
+                    print(f"Warning: Stat '{stat}' not found in explicit stats.")
+        self.recalculate_derived_stats()
+
+    def gain_exp(self, amount: int) -> None:
+        """Adds EXP and handles leveling up."""
+        offsets = self.layout.offsets
+        level, exp = get_xp_curve().resolve(self.values[offsets["level"]], self.values[offsets["exp"]] + amount)
+        self.values[offsets["exp"]] = exp
+        if level != self.values[offsets["level"]]:
+            self.write("level", level)
+
+    def level_up(self) -> None:
+        """Handles leveling up."""
+        self.write("level", self.values[self.layout.offsets["level"]] + 1)
+
+    def modify_day(self, amount: float) -> None:
+        self.day += amount
+
+    def advance_event(self, event: int) -> None:
+        self.event = event
+
+    # Temporary stats
+    def modify_hp(self, amount: int) -> None:
+        self.modify_resource("hp", amount)
+
+    def modify_mp(self, amount: int) -> None:
+        self.modify_resource("mp", amount)
+
+    def modify_resource(self, resource: str, amount: int) -> None:
+        offsets = self.layout.offsets
+        cap = self.read(offsets[RESOURCE_CAPS[resource]])
+        self.values[offsets[resource]] = max(0, min(self.values[offsets[resource]] + amount, cap))
+
+    # Utility methods
+    def to_dict(self) -> dict:
+        """Return all stats as a dictionary."""
+        return {
+            "explicit_stats": dict(self.explicit_stats),
+            "derived_stats": dict(self.derived_stats),
+            "resources": dict(self.resources),
+            "meta_info": dict(self.meta_info),
+        }
+
+    def load_from_dict(self, data: dict) -> None:
+        """Load stats from a dictionary with validation."""
+        offsets = self.layout.offsets
+        for key, names in (("explicit_stats", self.layout.explicit), ("resources", self.layout.resources)):
+            if key in data and isinstance(data[key], dict):
+                for stat, value in data[key].items():
+                    if stat in names:
+                        self.values[offsets[stat]] = value
+            else:
+                print(f"Warning: Missing or invalid data for {key}.")
+        if "meta_info" in data and isinstance(data["meta_info"], dict):
+            self.day = data["meta_info"].get("day", self.day)
+            self.event = data["meta_info"].get("event", self.event)
+        else:
+            print("Warning: Missing or invalid data for meta_info.")
+        self.dirty = self.layout.all_derived_mask
+        self.recalculate_derived_stats()
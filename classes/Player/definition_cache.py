@@ -0,0 +1,97 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from typing import Optional
+from classes.Player.item_registry import ItemRegistry
+
+# (mtime in nanoseconds, size in bytes) of a data file when it was parsed
+FileSignature = tuple[int, int]
+
+class CatalogEntry:
+    __slots__ = ("path", "signature", "data", "checked_at")
+
+    def __init__(self, path: str, signature: FileSignature, data: dict, checked_at: float):
+        self.path = path
+        self.signature = signature
+        self.data = data
+        self.checked_at = checked_at
+
+class DefinitionCache:
+    def __init__(self, check_interval: float = 1.0):
+        """
+        Parsed item catalogs shared by every SaveManager in the process. Each catalog is parsed the
+        first time it is needed and reparsed only when its modification time or size changes on disk.
+        Registries are shared too, one per combination of catalogs, and rebuilt when one of their
+        catalogs is reloaded.
+        :param check_interval: Seconds between checks of a file for changes (0 checks on every access).
+        """
+        self.check_interval = check_interval
+        self.catalogs: dict[str, CatalogEntry] = {}
+        # catalog paths -> (signatures the registry was built from, registry)
+        self.registries: dict[tuple[str, ...], tuple[tuple[FileSignature, ...], ItemRegistry]] = {}
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def file_signature(path: str) -> FileSignature:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_catalog(self, path: str) -> CatalogEntry:
+        """The parsed catalog for a file, reparsed if the file changed since it was last read."""
+        path = os.path.abspath(path)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.catalogs.get(path)
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                return entry
+            signature = self.file_signature(path)
+            if entry is not None and entry.signature == signature:
+                entry.checked_at = now
+                return entry
+            with open(path, "r") as f:
+                entry = CatalogEntry(path, signature, json.load(f), now)
+            self.catalogs[path] = entry
+            return entry
+
+    def get_definitions(self, paths: tuple[str, ...]) -> dict[str, dict]:
+        """The raw item data of several catalogs, merged in order."""
+        merged = {}
+        for path in paths:
+            merged.update(self.get_catalog(path).data)
+        return merged
+
+    def get_registry(self, paths: tuple[str, ...]) -> ItemRegistry:
+        """The shared item registry for a set of catalogs."""
+        with self.lock:
+            entries = [self.get_catalog(path) for path in paths]
+            signatures = tuple(entry.signature for entry in entries)
+            key = tuple(entry.path for entry in entries)
+            cached = self.registries.get(key)
+            if cached is not None and cached[0] == signatures:
+                return cached[1]
+            merged = {}
+            for entry in entries:
+                merged.update(entry.data)
+            registry = ItemRegistry(merged)
+            self.registries[key] = (signatures, registry)
+            return registry
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Forget one catalog (or all of them) so it is reparsed on next use."""
+        with self.lock:
+            if path is None:
+                self.catalogs.clear()
+                self.registries.clear()
+            else:
+                path = os.path.abspath(path)
+                self.catalogs.pop(path, None)
+                for key in [key for key in self.registries if path in key]:
+                    del self.registries[key]
+
+definition_cache = DefinitionCache()
+
+def get_definition_cache() -> DefinitionCache:
+    """The process-wide definition cache."""
+    return definition_cache
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import ast
+import json
+from collections.abc import Mapping
+from typing import Callable, Iterator, TYPE_CHECKING
+if TYPE_CHECKING:
+    from classes.Player.stats import Stats
+
+# Names formulas may call besides stat names
+FORMULA_FUNCTIONS = {"min": min, "max": max, "abs": abs, "round": round, "int": int}
+FORMULA_GLOBALS = {"__builtins__": {}, **FORMULA_FUNCTIONS}
+# The only syntax a formula may use: arithmetic on stat names and numbers, and calls to FORMULA_FUNCTIONS
+FORMULA_NODES = (ast.Expression, ast.Name, ast.Load, ast.Constant, ast.BinOp, ast.UnaryOp, ast.operator, ast.unaryop, ast.Call)
+# Powers are limited to small constant exponents (e.g., "level ** 2"); "9 ** 9 ** 9" would never finish
+MAX_EXPONENT = 4
+
+def parse_formula(name: str, formula: str) -> ast.Expression:
+    """
+    Parse a formula, rejecting anything but the syntax in FORMULA_NODES, and powers beyond MAX_EXPONENT.
+    Formulas can come from data files, so they must not reach attributes, subscripts or other builtins.
+    :raises ValueError: If the formula does not parse or uses anything else.
+    """
+    try:
+        tree = ast.parse(formula, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Derived stat '{name}' has an invalid formula: {e.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, FORMULA_NODES):
+            raise ValueError(f"Derived stat '{name}' formula may not use {type(node).__name__}: {formula}")
+        if isinstance(node, ast.Name) and node.id.startswith("__"):
+            raise ValueError(f"Derived stat '{name}' formula may not read {node.id}: {formula}")
+        if isinstance(node, ast.Constant) and (not isinstance(node.value, (int, float)) or isinstance(node.value, bool)):
+            raise ValueError(f"Derived stat '{name}' formula may only use numbers: {formula}")
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow) and not (
+                isinstance(node.right, ast.Constant) and type(node.right.value) is int and 0 <= node.right.value <= MAX_EXPONENT):
+            raise ValueError(f"Derived stat '{name}' formula may only raise to a constant power from 0 to {MAX_EXPONENT}: {formula}")
+        if isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name) or node.func.id not in FORMULA_FUNCTIONS):
+            raise ValueError(f"Derived stat '{name}' formula may only call {', '.join(FORMULA_FUNCTIONS)}: {formula}")
+    return tree
+
+class DerivedStat:
+    def __init__(self, name: str, formula: str | Callable[[Mapping[str, int]], int], depends_on: tuple[str, ...] = None):
+        """
+        A stat computed from explicit stats.
+        :param name: Name of the derived stat (e.g., "max_hp").
+        :param formula: An expression over stat names (e.g., "stamina * 10 + level * 5"),
+                        or a function taking the explicit stats mapping. Expressions are limited to
+                        arithmetic and calls to FORMULA_FUNCTIONS (see parse_formula).
+        :param depends_on: The explicit stats the formula reads. Inferred for expressions.
+        """
+        self.name = name
+        self.formula = formula
+        if isinstance(formula, str):
+            self.code = compile(parse_formula(name, formula), f"<derived stat {name}>", "eval")
+            inferred = tuple(stat for stat in self.code.co_names if stat not in FORMULA_FUNCTIONS)
+            self.depends_on: tuple[str, ...] = tuple(depends_on) if depends_on is not None else inferred
+        else:
+            if depends_on is None:
+                raise ValueError(f"Derived stat '{name}' needs depends_on when its formula is a function.")
+            self.code = None
+            self.depends_on = tuple(depends_on)
+
+    def compute(self, explicit_stats: Mapping[str, int]):
+        """Evaluate the formula against a mapping of explicit stats (or of equally shaped columns)."""
+        if self.code is None:
+            return self.formula(explicit_stats)
+        try:
+            return eval(self.code, FORMULA_GLOBALS, explicit_stats)
+        except NameError as e:
+            raise KeyError(f"Derived stat '{self.name}' reads a missing stat: {e}") from None
+
+    def __repr__(self):
+        return f"DerivedStat({self.name}, depends_on={self.depends_on})"
+
+DERIVED_STATS: dict[str, DerivedStat] = {}
+# explicit stat -> names of the derived stats that read it
+DEPENDENTS: dict[str, tuple[str, ...]] = {}
+# Bumped whenever a derived stat is registered or removed; caches built under an older generation are dropped
+generation = 0
+
+def register_derived_stat(name: str, formula: str | Callable[[Mapping[str, int]], int], depends_on: tuple[str, ...] = None) -> DerivedStat:
+    """
+    Add (or replace) a derived stat for every Stats instance.
+    New and replaced formulas take effect immediately: existing instances drop their cached
+    derived stats on their next read.
+    :param name: Name of the derived stat.
+    :param formula: An expression over stat names, or a function taking the explicit stats mapping.
+    :param depends_on: The explicit stats the formula reads. Inferred for expressions.
+    :return: The registered DerivedStat.
+    """
+    derived_stat = DerivedStat(name, formula, depends_on)
+    DERIVED_STATS[name] = derived_stat
+    rebuild_dependents()
+    return derived_stat
+
+def unregister_derived_stat(name: str) -> None:
+    """Remove a derived stat added with register_derived_stat."""
+    DERIVED_STATS.pop(name, None)
+    rebuild_dependents()
+
+def rebuild_dependents() -> None:
+    global generation
+    generation += 1
+    dependents: dict[str, list[str]] = {}
+    for stat in DERIVED_STATS.values():
+        for dependency in stat.depends_on:
+            dependents.setdefault(dependency, []).append(stat.name)
+    DEPENDENTS.clear()
+    DEPENDENTS.update({stat: tuple(names) for stat, names in dependents.items()})
+
+def load_derived_stats(file: str) -> list[DerivedStat]:
+    """
+    Register derived stats from a JSON file, so designers can add stats without code changes.
+    Entries are either {"name": "expression"} or {"name": {"formula": "expression", "depends_on": [...]}}.
+    :param file: Path to the JSON file.
+    :return: The registered derived stats.
+    """
+    with open(file, "r") as f:
+        definitions = json.load(f)
+    registered = []
+    for name, definition in definitions.items():
+        if isinstance(definition, str):
+            registered.append(register_derived_stat(name, definition))
+        else:
+            registered.append(register_derived_stat(name, definition["formula"], definition.get("depends_on")))
+    return registered
+
+register_derived_stat("exp_to_next_level", "level ** 2 * 50")
+register_derived_stat("max_hp", "stamina * 10 + level * 5")
+register_derived_stat("max_mp", "willpower * 8 + level * 3")
+register_derived_stat("hit", "agility * 2 + level")
+register_derived_stat("damage", "strength * 3 + level * 2")
+register_derived_stat("ac", "10 + agility")
+
+######################################################################################
+
+class TrackedStats(dict):
+    def __init__(self, data=(), on_change: Callable[[str], None] = None):
+        """A dict of stats that reports every key written through it."""
+        super().__init__(data)
+        self.on_change = on_change
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        if self.on_change:
+            self.on_change(key)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __reduce__(self):
+        # Rebuild from a plain copy so unpickling/deepcopy does not notify a half-built owner
+        return (self.__class__, (dict(self),), self.__dict__)
+
+class DerivedStatsView(Mapping):
+    def __init__(self, stats: Stats):
+        """Read-only, lazily computed view of a Stats instance's derived stats (from its effective stats)."""
+        self.stats = stats
+
+    def __getitem__(self, name: str) -> int:
+        cache = self.stats.derived_cache
+        if self.stats.derived_generation != generation:  # Formulas changed since the cache was filled
+            cache.clear()
+            self.stats.derived_generation = generation
+        try:
+            return cache[name]
+        except KeyError:
+            pass
+        try:
+            derived_stat = DERIVED_STATS[name]
+        except KeyError:
+            raise KeyError(name) from None
+        value = cache[name] = derived_stat.compute(self.stats.effective_stats)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(DERIVED_STATS)
+
+    def __len__(self) -> int:
+        return len(DERIVED_STATS)
+
+    def __repr__(self):
+        return repr(dict(self))
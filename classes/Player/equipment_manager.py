@@ -1,7 +1,8 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, TypedDict
+from classes.Player.items import Equipment, item_from_record, item_record
+from classes.Player.loadout_optimizer import LoadoutOptimizer, LoadoutPlan, stat_coefficients
 if TYPE_CHECKING:
-    from classes.Player.items import Equipment
     from classes.Player.player import Player
 
 class EquippedItems(TypedDict):
@@ -16,6 +17,11 @@ class EquippedItems(TypedDict):
     ring2: Equipment
     amulet: Equipment
 
+# Item slots that fit in more than one equipment slot
+SLOT_GROUPS: dict[str, tuple[str, ...]] = {
+    "ring": ("ring1", "ring2"),
+}
+
 class EquipmentManager:
     def __init__(self, player:Player):
         """
@@ -35,6 +41,47 @@ class EquipmentManager:
             "ring2": None,
             "amulet": None,
         }
+        self.dirty: set[str] = set()  # Slots changed since the last save journal commit
+        self.version: int = 0  # Bumped on every change, so Player snapshots can tell whether to recapture the equipment
+        # Running per-stat sum of every equipped item's stats, kept in step with explicit stats
+        self.stat_bonuses: dict[str, int] = {}
+
+    def slots_for(self, item: Equipment) -> tuple[str, ...]:
+        """The slots an item can go in (a "ring" fits ring1 or ring2)."""
+        return SLOT_GROUPS.get(item.slot, (item.slot,))
+
+    def choose_slot(self, item: Equipment) -> str:
+        """The first empty slot that fits the item, or the first fitting slot if they are all taken."""
+        slots = self.slots_for(item)
+        for slot in slots:
+            if self.equipped_items.get(slot) is None:
+                return slot
+        return slots[0]
+
+    def apply_bonus_delta(self, removed: list[Equipment], added: list[Equipment]) -> None:
+        """
+        Take the stats of removed items off and put the stats of added items on, as one net change
+        per stat with a single derived stat recalculation.
+        """
+        delta: dict[str, int] = {}
+        for sign, items in ((-1, removed), (1, added)):
+            for item in items:
+                for stat, value in item.bonuses.items():
+                    delta[stat] = delta.get(stat, 0) + sign * value
+        stats = self.player.stats
+        with stats.deferred_recalculation():
+            for stat, value in delta.items():
+                if not value:
+                    continue
+                if stat not in stats.explicit_stats:
+                    print(f"Warning: Stat '{stat}' not found in explicit stats.")
+                    continue
+                stats.explicit_stats[stat] += value
+                total = self.stat_bonuses.get(stat, 0) + value
+                if total:
+                    self.stat_bonuses[stat] = total
+                else:
+                    self.stat_bonuses.pop(stat, None)
 
     def equip(self, item:Equipment, inventory_index=None):
         """
@@ -45,36 +92,31 @@ class EquipmentManager:
         if not item.is_usable(self.player):
             return
 
-        if item.slot not in self.equipped_items:
+        if not all(slot in self.equipped_items for slot in self.slots_for(item)):
             print(f"Invalid equipment slot: {item.slot}")
             return
-        
+        slot = self.choose_slot(item)
+
         # Ensure the item is removed from inventory if it exists there
         self.player.inventory.remove_item(item.name, count=1)
 
         # Handle swapping with an already equipped item
-        if self.equipped_items[item.slot]:
-            replaced_item = self.equipped_items[item.slot]
-            self.equipped_items[item.slot] = None  # Temporarily unequip the replaced item
-
-            # Remove the stats of the replaced item
-            self.player.stats.modify_stats([{stat: -value for stat, value in item.items()} for item in replaced_item.stats])
-
+        replaced_item = self.equipped_items[slot]
+        if replaced_item:
             # Add the replaced item back to the inventory at the same index
             if inventory_index is not None:
                 self.player.inventory.add_item(replaced_item, index=inventory_index)
             else:
                 self.player.inventory.add_item(replaced_item)
 
-            print(f"Replaced {replaced_item.name} with {item.name} in the {item.slot} slot.")
+            print(f"Replaced {replaced_item.name} with {item.name} in the {slot} slot.")
 
-        # Equip the new item
-        self.equipped_items[item.slot] = item
-        print(f"Equipped {item.name} in the {item.slot} slot.")
-
-        print(item.stats)
-        # Apply the stats of the newly equipped item
-        self.player.stats.modify_stats(item.stats)
+        # Equip the new item, swapping the old item's stats for the new one's in one step
+        self.equipped_items[slot] = item
+        self.dirty.add(slot)
+        self.version += 1
+        self.apply_bonus_delta([replaced_item] if replaced_item else [], [item])
+        print(f"Equipped {item.name} in the {slot} slot.")
 
     def unequip(self, slot):
         """
@@ -90,18 +132,170 @@ class EquipmentManager:
             print(f"No item equipped in the {slot} slot.")
             return
 
-        # Remove the item
+        # Remove the item and its stats
         print(f"Unequipped {item.name} from the {slot} slot.")
         self.equipped_items[slot] = None
-
-        # Remove the stats of the unequipped item
-        # Multiply by -1 to reverse the stat effects
-        print("REMOVING STATS")
-        self.player.stats.modify_stats([(-1 * stat, value) for stat, value in item.stats.items()])
+        self.dirty.add(slot)
+        self.version += 1
+        self.apply_bonus_delta([item], [])
 
         # Return the unequipped item to inventory
         self.player.inventory.add_item(item)
 
+    def equip_loadout(self, items: list[Equipment] | dict[str, Equipment]) -> dict[str, Equipment]:
+        """
+        Equip a full set of gear at once, with one stat recalculation for the whole set.
+        Requirements are checked against the stats the player will have with the rest of the set on,
+        so one item may rely on another item's bonus, but never on its own. Items that still fall
+        short are skipped. Replaced items go back to the inventory; items that are already worn
+        move to their new slot (or stay where they are, when given as a list) and keep their stats.
+        :param items: The gear to equip; later items win when several want the same slot.
+                      A slot -> item dictionary puts items in the given slots.
+        :return: Slot -> item for the items that were equipped.
+        """
+        current_slots = {id(item): slot for slot, item in self.equipped_items.items() if item}
+        planned: dict[str, Equipment] = {}
+        taken: dict[str, set[str]] = {}
+        for chosen_slot, item in (items.items() if isinstance(items, dict) else ((None, item) for item in items)):
+            slots = self.slots_for(item)
+            if not all(slot in self.equipped_items for slot in slots) or (chosen_slot and chosen_slot not in slots):
+                print(f"Invalid equipment slot: {chosen_slot or item.slot}")
+                continue
+            used = taken.setdefault(item.slot, set())
+            if chosen_slot is None:
+                # An item that is already worn stays where it is if it can
+                worn_in = current_slots.get(id(item))
+                chosen_slot = worn_in if worn_in in slots and worn_in not in used else next((slot for slot in slots if slot not in used), slots[0])
+            for slot, other in list(planned.items()):
+                if other is item:  # The same item listed twice: the later slot wins
+                    del planned[slot]
+            used.add(chosen_slot)
+            planned[chosen_slot] = item
+
+        # Drop items whose requirements are not met until the rest of the set supports itself
+        while True:
+            # Stats without the items that leave their slots: those replaced, and worn items that move
+            leaving = {id(item): item for slot, item in self.equipped_items.items() if item and slot in planned}
+            leaving.update((id(item), item) for item in planned.values() if id(item) in current_slots)
+            base = dict(self.player.stats.effective_stats)
+            for item in leaving.values():
+                for stat, value in item.bonuses.items():
+                    base[stat] = base.get(stat, 0) - value
+            with_set = dict(base)
+            for item in planned.values():
+                for stat, value in item.bonuses.items():
+                    with_set[stat] = with_set.get(stat, 0) + value
+            failing = []
+            for slot, item in planned.items():
+                without_item = dict(with_set)
+                for stat, value in item.bonuses.items():
+                    without_item[stat] -= value
+                unmet = item.unmet_requirement(without_item)
+                if unmet:
+                    failing.append(slot)
+                    print(f"Cannot equip {item.name}. {unmet[0].capitalize()} {unmet[1]} required.")
+            if not failing:
+                break
+            for slot in failing:
+                del planned[slot]
+
+        # Worn items moving to another slot leave their old one first; they keep their stats
+        # and never pass through the inventory
+        planned_ids = {id(item) for item in planned.values()}
+        moved = set()
+        for slot, item in self.equipped_items.items():
+            if item is not None and id(item) in planned_ids and planned.get(slot) is not item:
+                self.equipped_items[slot] = None
+                self.dirty.add(slot)
+                self.version += 1
+                moved.add(id(item))
+
+        removed, added = [], []
+        for slot, item in planned.items():
+            replaced_item = self.equipped_items[slot]
+            if replaced_item is item:
+                continue
+            if id(item) not in moved:
+                self.player.inventory.remove_item(item.name, count=1)
+                added.append(item)
+            if replaced_item:
+                removed.append(replaced_item)
+                self.player.inventory.add_item(replaced_item)
+            self.equipped_items[slot] = item
+            self.dirty.add(slot)
+            self.version += 1
+        self.apply_bonus_delta(removed, added)
+        return planned
+
+    def best_loadout(self, weights: dict[str, float], items: list[Equipment] = None) -> LoadoutPlan:
+        """
+        The best gear the player could wear, without equipping anything.
+        :param weights: Stat name -> weight, over explicit or derived stats (e.g., {"damage": 1, "max_hp": 0.5}).
+        :param items: The gear to choose from. Defaults to the equipped items and the equipment in the inventory.
+        """
+        if items is None:
+            items = [item for item in self.equipped_items.values() if item]
+            items.extend(item for item in self.player.inventory.items if isinstance(item, Equipment))
+        optimizer = LoadoutOptimizer(weights, self.equipped_items, SLOT_GROUPS)
+        return optimizer.optimize(self.unequipped_stats(), items, self.equipped_items)
+
+    def auto_equip(self, weights: dict[str, float]) -> LoadoutPlan:
+        """
+        Equip the best gear from the inventory and the current loadout (see best_loadout).
+        Slots the plan leaves empty keep their item, unless it lowers the objective.
+        """
+        plan = self.best_loadout(weights)
+        coefficients = stat_coefficients(weights, self.unequipped_stats())
+        planned = {id(item) for item in plan["equipped"].values() if item is not None}
+        for slot, item in plan["equipped"].items():
+            current = self.equipped_items[slot]
+            if item is None and current is not None and id(current) not in planned:
+                if sum(coefficients.get(stat, 0) * value for stat, value in current.bonuses.items()) < 0:
+                    self.unequip(slot)
+        self.equip_loadout({slot: item for slot, item in plan["equipped"].items() if item is not None})
+        return plan
+
+    def unequipped_stats(self) -> dict[str, int]:
+        """The player's effective stats without any equipment."""
+        stats = dict(self.player.stats.effective_stats)
+        for stat, value in self.stat_bonuses.items():
+            stats[stat] = stats.get(stat, 0) - value
+        return stats
+
+    def restore_equipped(self, items: dict[str, Equipment]) -> None:
+        """
+        Put items straight into their slots, e.g. when loading a save. Stats are left untouched,
+        since they are expected to already include the items' bonuses.
+        :param items: Slot -> item; slots not listed are emptied.
+        """
+        for slot in self.equipped_items:
+            self.equipped_items[slot] = None
+        self.dirty.update(self.equipped_items)
+        self.version += 1
+        self.stat_bonuses = {}
+        for slot, item in items.items():
+            if slot not in self.equipped_items:
+                print(f"Invalid equipment slot: {slot}")
+                continue
+            self.equipped_items[slot] = item
+            for stat, value in item.bonuses.items():
+                self.stat_bonuses[stat] = self.stat_bonuses.get(stat, 0) + value
+
+    # Snapshots (see Player.snapshot)
+    def snapshot_state(self) -> tuple:
+        """Equipped items (as item records) and their stat bonuses as an immutable value."""
+        return (tuple((slot, item_record(item) if item else None) for slot, item in self.equipped_items.items()),
+                tuple(self.stat_bonuses.items()))
+
+    def restore_state(self, state: tuple) -> None:
+        """Put back equipment from snapshot_state. Stats are left untouched; they are restored with the stats."""
+        equipped_items, stat_bonuses = state
+        for slot, record in equipped_items:
+            self.equipped_items[slot] = item_from_record(record) if record else None
+        self.stat_bonuses = dict(stat_bonuses)
+        self.dirty.update(self.equipped_items)
+        self.version += 1
+
     def is_equipped(self, item_name: str, slot: str = None) -> bool:
         """
         Check if a specific item is equipped.
@@ -0,0 +1,119 @@
+from __future__ import annotations
+from bisect import bisect_right
+from typing import TypedDict
+from classes.Player.derived_stats import register_derived_stat
+
+class LevelUpEvent(TypedDict):
+    old_level: int
+    new_level: int
+    levels: list[int]  # every level crossed, in order
+    exp: int  # EXP left over towards the next level
+
+class XPCurve:
+    # Used to register the curve as the exp_to_next_level derived stat; None means "call the curve"
+    expression: str = None
+
+    def __init__(self, max_level: int = None):
+        """
+        Base XP curve. Subclasses define exp_to_next_level; the cumulative table is built lazily
+        so any curve can resolve large EXP grants with a binary search instead of a level-by-level loop.
+        :param max_level: Optional level cap.
+        """
+        self.max_level = max_level
+        self.cumulative: list[int] = [0, 0]  # cumulative[level] = EXP needed to reach level from level 1
+
+    def exp_to_next_level(self, level: int) -> int:
+        raise NotImplementedError
+
+    def cumulative_exp(self, level: int) -> int:
+        """Total EXP needed to go from level 1 to the given level."""
+        while len(self.cumulative) <= level:
+            last = len(self.cumulative) - 1
+            self.cumulative.append(self.cumulative[last] + self.exp_to_next_level(last))
+        return self.cumulative[level]
+
+    def level_for_exp(self, total: int) -> int:
+        """Highest level whose cumulative EXP is at most total."""
+        # Grow the table geometrically until it covers the total, then bisect
+        size = len(self.cumulative)
+        while self.cumulative[-1] <= total and (self.max_level is None or size <= self.max_level):
+            size *= 2
+            self.cumulative_exp(size if self.max_level is None else min(size, self.max_level))
+        return bisect_right(self.cumulative, total) - 1
+
+    def resolve(self, level: int, exp: int) -> tuple[int, int]:
+        """
+        Work out where a character ends up after EXP is added.
+        :param level: Current level.
+        :param exp: EXP held towards the next level (including the new grant).
+        :return: (new level, EXP left over towards the level after that).
+        """
+        total = self.cumulative_exp(level) + exp
+        new_level = max(level, self.level_for_exp(total))
+        if self.max_level is not None:
+            new_level = min(new_level, max(level, self.max_level))
+        return new_level, total - self.cumulative_exp(new_level)
+
+class QuadraticCurve(XPCurve):
+    def __init__(self, multiplier: int = 50, max_level: int = None):
+        """
+        The default curve: exp_to_next_level = level ** 2 * multiplier. Solved in closed form.
+        :param multiplier: EXP multiplier per squared level.
+        :param max_level: Optional level cap.
+        """
+        super().__init__(max_level)
+        self.multiplier = multiplier
+        self.expression = f"level ** 2 * {multiplier}"
+
+    def exp_to_next_level(self, level: int) -> int:
+        return level ** 2 * self.multiplier
+
+    @staticmethod
+    def sum_of_squares(n: int) -> int:
+        return n * (n + 1) * (2 * n + 1) // 6
+
+    def cumulative_exp(self, level: int) -> int:
+        return self.multiplier * self.sum_of_squares(level - 1)
+
+    def level_for_exp(self, total: int) -> int:
+        # Largest n with sum_of_squares(n) <= total / multiplier; n ~ cbrt(3 * quotient)
+        quotient = total // self.multiplier
+        n = int(round((3 * quotient) ** (1 / 3))) if quotient > 0 else 0
+        while self.sum_of_squares(n + 1) <= quotient:
+            n += 1
+        while n > 0 and self.sum_of_squares(n) > quotient:
+            n -= 1
+        return n + 1
+
+class TableCurve(XPCurve):
+    def __init__(self, exp_per_level: list[int]):
+        """
+        A designer-supplied curve. The last level in the table is the level cap.
+        :param exp_per_level: EXP needed to go from level i + 1 to level i + 2, for each i.
+        """
+        super().__init__(max_level=len(exp_per_level) + 1)
+        self.exp_per_level = list(exp_per_level)
+        for level in range(1, len(exp_per_level) + 1):
+            self.cumulative.append(self.cumulative[level] + exp_per_level[level - 1])
+
+    def exp_to_next_level(self, level: int) -> int:
+        if level > len(self.exp_per_level):
+            return self.exp_per_level[-1]  # Shown once the cap is reached
+        return self.exp_per_level[level - 1]
+
+xp_curve: XPCurve = QuadraticCurve()
+
+def get_xp_curve() -> XPCurve:
+    return xp_curve
+
+def set_xp_curve(curve: XPCurve) -> None:
+    """
+    Use a different XP curve for every character, including the exp_to_next_level derived stat.
+    :param curve: The new curve.
+    """
+    global xp_curve
+    xp_curve = curve
+    if curve.expression:
+        register_derived_stat("exp_to_next_level", curve.expression)
+    else:
+        register_derived_stat("exp_to_next_level", lambda stats: curve.exp_to_next_level(stats["level"]), ("level",))
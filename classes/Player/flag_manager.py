@@ -1,34 +1,233 @@
+from __future__ import annotations
+from typing import Any, Iterable
+
+class FlagRegistry:
+    def __init__(self):
+        """
+        Interns flag names to small integer IDs, shared by every FlagManager in the process.
+        A flag's ID is its bit position in a FlagManager's bitset. Event requirements and effects
+        intern their flags when events are loaded, so checks at play time never touch strings.
+        """
+        self.ids: dict[str, int] = {}
+        self.names: list[str] = []
+
+    def intern(self, name: str) -> int:
+        """The ID for a flag name, assigning the next free one if the name is new."""
+        flag_id = self.ids.get(name)
+        if flag_id is None:
+            flag_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return flag_id
+
+    def mask(self, names: Iterable[str]) -> int:
+        """A bitmask with the bit of every named flag set."""
+        mask = 0
+        for name in names:
+            mask |= 1 << self.intern(name)
+        return mask
+
+    def ids_in(self, mask: int) -> Iterable[int]:
+        """The IDs of the bits set in a mask, lowest first."""
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    # The registry is process-wide, never duplicated
+    def __copy__(self) -> FlagRegistry:
+        return self
+
+    def __deepcopy__(self, memo) -> FlagRegistry:
+        return self
+
+flag_registry = FlagRegistry()
+
+def get_flag_registry() -> FlagRegistry:
+    return flag_registry
+
+def intern_flag(name: str) -> int:
+    """Intern a flag name in the process-wide registry."""
+    return flag_registry.intern(name)
+
+######################################################################################
+
 class FlagManager:
     def __init__(self):
-        """Initialize the flag manager."""
-        self.flags = {}
+        """
+        Initialize the flag manager.
+        Flags set to True are bits in an integer bitset indexed by interned flag ID; any other value
+        (numbers, strings, False) lives in a side table, with its bit set when the value is truthy.
+        """
+        self.registry = flag_registry
+        self.bits: int = 0  # Bit per flag that is set to a truthy value
+        self.values: dict[int, Any] = {}  # flag ID -> value, for flags whose value is not True
+        self.dirty: set[str] = set()  # Flags set or cleared since the last save journal commit
+        self.version: int = 0  # Bumped on every change, so Player snapshots can tell whether to recapture the flags
 
     def set_flag(self, key:str, value=True)->None:
         """Sets a flag with the given key and value."""
-        self.flags[key] = value
+        self.set_flag_id(self.registry.intern(key), value)
+
+    def set_flag_id(self, flag_id: int, value=True) -> None:
+        """Sets a flag by interned ID."""
+        bit = 1 << flag_id
+        if value is True:
+            self.bits |= bit
+            if self.values:
+                self.values.pop(flag_id, None)
+        else:
+            self.values[flag_id] = value
+            if value:
+                self.bits |= bit
+            else:
+                self.bits &= ~bit
+        self.dirty.add(self.registry.names[flag_id])
+        self.version += 1
 
     def check_flag(self, key:str)->None:
         """Checks the value of a flag."""
-        return self.flags.get(key, False)
+        flag_id = self.registry.ids.get(key)
+        if flag_id is None:
+            return False
+        return self.check_flag_id(flag_id)
+
+    def check_flag_id(self, flag_id: int):
+        """Checks the value of a flag by interned ID."""
+        if self.bits >> flag_id & 1:
+            return self.values.get(flag_id, True) if self.values else True
+        return self.values.get(flag_id, False) if self.values else False
+
+    def has_flag(self, key: str) -> bool:
+        """Whether a flag is present (with any value, including False)."""
+        flag_id = self.registry.ids.get(key)
+        return flag_id is not None and (bool(self.bits >> flag_id & 1) or flag_id in self.values)
 
     def clear_flag(self, key:str)->None:
         """Removes a flag."""
-        if key in self.flags:
-            del self.flags[key]
+        flag_id = self.registry.ids.get(key)
+        if flag_id is not None:
+            self.clear_flag_id(flag_id)
+
+    def clear_flag_id(self, flag_id: int) -> None:
+        """Removes a flag by interned ID."""
+        bit = 1 << flag_id
+        if self.bits & bit or flag_id in self.values:
+            self.bits &= ~bit
+            self.values.pop(flag_id, None)
+            self.dirty.add(self.registry.names[flag_id])
+            self.version += 1
 
     def set_flags(self, flags_dict: dict[str, bool])->None:
         """Sets multiple flags from a dictionary."""
-        self.flags.update(flags_dict)
+        for key, value in flags_dict.items():
+            self.set_flag(key, value)
 
     def clear_flags(self, keys: list[str])->None:
         """Clears multiple flags by their keys."""
         for key in keys:
-            self.flags.pop(key, None)
+            self.clear_flag(key)
+
+    # Bulk operations on boolean flags
+    def set_many(self, keys: Iterable[str]) -> None:
+        """Set several flags to True at once."""
+        keys = list(keys)
+        mask = self.registry.mask(keys)
+        self.bits |= mask
+        if self.values:
+            for flag_id in self.registry.ids_in(mask):
+                self.values.pop(flag_id, None)
+        self.dirty.update(keys)
+        self.version += 1
+
+    def clear_many(self, keys: Iterable[str]) -> None:
+        """Clear several flags at once."""
+        keys = [key for key in keys if key in self.registry.ids]
+        mask = self.registry.mask(keys)
+        present = self.bits & mask
+        if self.values:
+            for flag_id in self.registry.ids_in(mask):
+                if flag_id in self.values:
+                    del self.values[flag_id]
+                    present |= 1 << flag_id
+        self.bits &= ~mask
+        self.dirty.update(self.registry.names[flag_id] for flag_id in self.registry.ids_in(present))
+        self.version += 1
+
+    def has_all(self, keys: Iterable[str]) -> bool:
+        """Whether every named flag is set to a truthy value."""
+        return self.has_all_mask(self.registry.mask(keys))
+
+    def has_any(self, keys: Iterable[str]) -> bool:
+        """Whether any named flag is set to a truthy value."""
+        return self.has_any_mask(self.registry.mask(keys))
+
+    def has_all_mask(self, mask: int) -> bool:
+        """Whether every flag in a mask (see FlagRegistry.mask) is set to a truthy value."""
+        return self.bits & mask == mask
+
+    def has_any_mask(self, mask: int) -> bool:
+        """Whether any flag in a mask is set to a truthy value."""
+        return self.bits & mask != 0
+
+    # Listing
+    @property
+    def flags(self) -> dict[str, Any]:
+        """All flags and their values (a new dictionary; use the methods above to change flags)."""
+        return self.list_flags()
 
     def list_flags(self)->dict[str, bool]:
         """Lists all flags."""
-        return self.flags
-    
+        names = self.registry.names
+        flags = {names[flag_id]: True for flag_id in self.registry.ids_in(self.bits)}
+        for flag_id, value in self.values.items():
+            flags[names[flag_id]] = value
+        return flags
+
     def filter_flags(self, value:str=None)->dict[str, bool]:
         """Returns flags with the specified value."""
-        return {k: v for k, v in self.flags.items() if v == value or value is None}
\ No newline at end of file
+        if value is True and not self.values:
+            names = self.registry.names
+            return {names[flag_id]: True for flag_id in self.registry.ids_in(self.bits)}
+        return {k: v for k, v in self.list_flags().items() if v == value or value is None}
+
+    def __len__(self) -> int:
+        present = self.bits
+        for flag_id in self.values:
+            present |= 1 << flag_id
+        return bin(present).count("1")
+
+    # Snapshots (see Player.snapshot)
+    def snapshot_state(self) -> tuple:
+        """The bitset and the side table of non-True values as an immutable value."""
+        return self.bits, tuple(self.values.items())
+
+    def restore_state(self, state: tuple) -> None:
+        bits, values = state
+        values = dict(values)
+        # Only flags whose value differs are marked for the save journal
+        changed = (self.bits ^ bits) | sum(1 << flag_id for flag_id in values.keys() ^ self.values.keys())
+        changed |= sum(1 << flag_id for flag_id, value in values.items() if self.values.get(flag_id, value) != value)
+        self.dirty.update(self.registry.names[flag_id] for flag_id in self.registry.ids_in(changed))
+        self.bits = bits
+        self.values = values
+        self.version += 1
+
+    # Flags are pickled by name, so IDs are re-interned in the loading process's registry
+    def __reduce__(self):
+        return (restore_flags, (self.list_flags(),))
+
+    def __deepcopy__(self, memo) -> FlagManager:
+        copied = FlagManager.__new__(FlagManager)
+        copied.registry = self.registry
+        copied.bits = self.bits
+        copied.values = dict(self.values)
+        copied.dirty = set(self.dirty)
+        copied.version = self.version
+        memo[id(self)] = copied
+        return copied
+
+def restore_flags(flags: dict[str, Any]) -> FlagManager:
+    manager = FlagManager()
+    manager.set_flags(flags)
+    manager.dirty.clear()
+    return manager
@@ -1,6 +1,6 @@
 from __future__ import annotations
-import copy
 from typing import TYPE_CHECKING
+from classes.Player.items import item_from_record, item_record
 if TYPE_CHECKING:
     from classes.Player.items import Item
     from classes.Player.player import Player
@@ -8,8 +8,114 @@ if TYPE_CHECKING:
 
 class Inventory:
     def __init__(self):
-        """Initialize an empty inventory."""
-        self.items: list[Item] = []
+        """
+        Initialize an empty inventory.
+        Items are kept in ordered slots for display, alongside a name -> stacks index and running
+        per-name totals, so lookups and quantity checks never scan the whole inventory.
+        """
+        self.slots: list[Item] = []
+        self.stacks: dict[str, list[Item]] = {}  # name -> stacks of that item, oldest first
+        self.totals: dict[str, int] = {}  # name -> total count across stacks
+        self.ref_names: dict[int, str] = {}  # ref -> name
+        self.type_counts: dict[type, int] = {}  # item class -> number of stacks
+        self.dirty: bool = False  # Whether the slots changed since the last save journal commit
+        self.version: int = 0  # Bumped on every change, so Player snapshots can tell whether to recapture the inventory
+
+    @property
+    def items(self) -> list[Item]:
+        """The inventory slots, in display order. Use the Inventory methods to change them."""
+        return self.slots
+
+    @items.setter
+    def items(self, items: list[Item]) -> None:
+        self.slots = []
+        self.stacks.clear()
+        self.totals.clear()
+        self.ref_names.clear()
+        self.type_counts.clear()
+        for item in items:
+            self.insert_slot(item)
+
+    # Snapshots (see Player.snapshot)
+    def snapshot_state(self) -> tuple:
+        """The inventory as an immutable value: one item record per slot."""
+        return tuple(item_record(item) for item in self.slots)
+
+    def restore_state(self, state: tuple) -> None:
+        self.items = [item_from_record(record) for record in state]
+        self.dirty = True
+        self.version += 1
+
+    # Index maintenance
+    def insert_slot(self, item: Item, index: int = None) -> None:
+        self.dirty = True
+        self.version += 1
+        if index is not None:
+            self.slots.insert(index, item)
+        else:
+            self.slots.append(item)
+        self.stacks.setdefault(item.name, []).append(item)
+        self.totals[item.name] = self.totals.get(item.name, 0) + item.count
+        self.ref_names[item.ref] = item.name
+        self.type_counts[type(item)] = self.type_counts.get(type(item), 0) + 1
+
+    def remove_slot(self, item: Item, index: int = None) -> None:
+        if index is not None:
+            self.slots.pop(index)
+        else:
+            self.slots.remove(item)
+        self.unindex(item)
+
+    def remove_slots(self, items: list[Item]) -> None:
+        """
+        Remove several slots in one pass over the slot list.
+        The slots are a plain list in display order (indexable, reorderable), so taking items out of
+        it stays O(n) however they are found; this keeps it to a single C-level pass per removal,
+        with the per-name bookkeeping done through the stack index.
+        """
+        if not items:
+            return
+        # Non-stackable items added with a count share one instance across slots,
+        # so each slot is removed as many times as it was used up, first slots first
+        removed: dict[int, int] = {}
+        for item in items:
+            removed[id(item)] = removed.get(id(item), 0) + 1
+        kept = []
+        for slot in self.slots:
+            if removed.get(id(slot)):
+                removed[id(slot)] -= 1
+            else:
+                kept.append(slot)
+        self.slots[:] = kept
+        for item in items:
+            self.unindex(item)
+
+    def unindex(self, item: Item) -> None:
+        """Drop a removed slot from the name, ref and type indexes."""
+        self.dirty = True
+        self.version += 1
+        stacks = self.stacks[item.name]
+        for position, stack in enumerate(stacks):
+            if stack is item:
+                del stacks[position]
+                break
+        self.adjust_total(item.name, -item.count)
+        if not stacks:
+            del self.stacks[item.name]
+            if self.ref_names.get(item.ref) == item.name:
+                del self.ref_names[item.ref]
+        self.type_counts[type(item)] -= 1
+        if not self.type_counts[type(item)]:
+            del self.type_counts[type(item)]
+
+    def adjust_total(self, name: str, delta: int) -> None:
+        self.dirty = True
+        self.version += 1
+        total = self.totals.get(name, 0) + delta
+        if total > 0:
+            self.totals[name] = total
+        else:
+            self.totals.pop(name, None)
 
     def add_item(self, item:Item, count:int=1, index:int=None)->None:
         """
@@ -20,31 +126,24 @@ class Inventory:
         """
         if item.stackable:
             # Look for an existing stack of the same item
-            for inv_item in self.items:
-                if inv_item.name == item.name:
-                    # Increase the stack count, but cap it at 99
-                    if inv_item.count < 99:
-                        added = min(99 - inv_item.count, count)
-                        inv_item.count += added
-                        count -= added
-                        print(f"Added {added} {item.name}(s) to the stack. Current count: {inv_item.count}.")
-                        if count <= 0:
-                            return
-            # If there's remaining count, add a new stack
-            new_item = copy.deepcopy(item)
+            for inv_item in self.stacks.get(item.name, ()):
+                # Increase the stack count, but cap it at 99
+                if inv_item.count < 99:
+                    added = min(99 - inv_item.count, count)
+                    inv_item.count += added
+                    self.adjust_total(item.name, added)
+                    count -= added
+                    print(f"Added {added} {item.name}(s) to the stack. Current count: {inv_item.count}.")
+                    if count <= 0:
+                        return
+            # If there's remaining count, add a new stack sharing the item's definition
             if count > 0:
-                new_item.count = count
-                if index is not None:
-                    self.items.insert(index, new_item)
-                else:
-                    self.items.append(new_item)
+                self.insert_slot(item.copy(count), index)
+                if index is None:
                     print(f"Created a new stack of {item.name} with {count}.")
         else:
             for _ in range(count):
-                if index is not None:
-                    self.items.insert(index, item)
-                else:
-                    self.items.append(item)
+                self.insert_slot(item, index)
                 print(f"Added {item.name} to the inventory.")
 
     def remove_item(self, identifier, count=1):
@@ -54,42 +153,45 @@ class Inventory:
         :param count: The quantity to remove (for stackable items).
         """
         if isinstance(identifier, int):  # Index-based removal
-            if 0 <= identifier < len(self.items):
-                item = self.items[identifier]
+            if 0 <= identifier < len(self.slots):
+                item = self.slots[identifier]
                 if item.stackable:
                     if item.count > count:
                         item.count -= count
+                        self.adjust_total(item.name, -count)
                         print(f"Removed {count} {item.name}(s). Remaining: {item.count}.")
                     else:
                         print(f"Removed the entire stack of {item.name}.")
-                        self.items.pop(identifier)
+                        self.remove_slot(item, identifier)
                 else:
                     print(f"Removed {item.name} from the inventory.")
-                    self.items.pop(identifier)
+                    self.remove_slot(item, identifier)
             else:
                 print("Invalid inventory slot.")
         elif isinstance(identifier, str):  # Name-based removal
             remaining_to_remove = count
-            # Iterate through all items matching the name
-            for item in sorted(self.items, key=lambda x: x.count):
-                if item.name == identifier:
-                    if item.stackable:
-                        if item.count > remaining_to_remove:
-                            item.count -= remaining_to_remove
-                            print(f"Removed {remaining_to_remove} {item.name}(s). Remaining: {item.count}.")
-                            return  # All required items removed
-                        else:
-                            print(f"Removed the entire stack of {item.name}.")
-                            remaining_to_remove -= item.count
-                            self.items.remove(item)  # Remove depleted stack
-                            if remaining_to_remove <= 0:
-                                return  # All required items removed
-                    else:
-                        print(f"Removed {item.name} from the inventory.")
-                        self.items.remove(item)
-                        remaining_to_remove -= 1
-                        if remaining_to_remove <= 0:
-                            return  # All required items removed
+            depleted: list[Item] = []  # Taken out of the slots together, in one pass
+            # Only stacks of this item are visited, smallest first
+            for item in sorted(self.stacks.get(identifier, ()), key=lambda x: x.count):
+                if item.stackable:
+                    if item.count > remaining_to_remove:
+                        item.count -= remaining_to_remove
+                        self.adjust_total(item.name, -remaining_to_remove)
+                        print(f"Removed {remaining_to_remove} {item.name}(s). Remaining: {item.count}.")
+                        remaining_to_remove = 0
+                        break
+                    print(f"Removed the entire stack of {item.name}.")
+                    remaining_to_remove -= item.count
+                else:
+                    print(f"Removed {item.name} from the inventory.")
+                    remaining_to_remove -= 1
+                depleted.append(item)
+                if remaining_to_remove <= 0:
+                    break  # All required items removed
+            if len(depleted) == 1:
+                self.remove_slot(depleted[0])
+            else:
+                self.remove_slots(depleted)
             # If we exhaust the loop and still have items to remove
             if remaining_to_remove > 0:
                 print(f"Could not remove {count} {identifier}(s). Only removed {count - remaining_to_remove}.")
@@ -100,17 +202,35 @@ class Inventory:
         """
         Check if an item is present in the inventory, optionally filtering by type and verifying quantity.
         :param required_item: The name of the item to check.
-        :param quantity: The required quantity (default is 1).
+        :param quantity: The required quantity across all stacks (default is 1).
         :param item_type: The specific class type of the item (e.g., PlotItem).
         :return: True if the item exists with the required quantity, otherwise False.
         """
-        for item in self.items:
-            if item.name == required_item and (item_type is None or isinstance(item, item_type)):
-                if item.stackable and item.count >= quantity:
-                    return True
-                elif not item.stackable and quantity == 1:
-                    return True
-        return False
+        if self.totals.get(required_item, 0) < quantity:
+            return False
+        if item_type is None:
+            return True
+        return sum(item.count for item in self.stacks[required_item] if isinstance(item, item_type)) >= quantity
+
+    def count_item(self, identifier: str | int) -> int:
+        """
+        Total quantity of an item across all stacks.
+        :param identifier: The item's name or ref.
+        """
+        name = self.ref_names.get(identifier, identifier) if isinstance(identifier, int) else identifier
+        return self.totals.get(name, 0)
+
+    def get_stacks(self, identifier: str | int) -> list[Item]:
+        """
+        All stacks of an item, oldest first.
+        :param identifier: The item's name or ref.
+        """
+        name = self.ref_names.get(identifier, identifier) if isinstance(identifier, int) else identifier
+        return list(self.stacks.get(name, ()))
+
+    def has_item_type(self, item_type: type) -> bool:
+        """Check if the inventory holds any item of the given class (or a subclass)."""
+        return any(issubclass(cls, item_type) for cls in self.type_counts)
 
     def sort_items(self, key:function=None, reverse:bool=False)->list[Item]:
         """
@@ -118,7 +238,9 @@ class Inventory:
         :param key: A function to extract a comparison key (e.g., lambda x: x.name).
         :param reverse: Whether to sort in descending order.
         """
-        return self.items.sort(key=key, reverse=reverse)
+        self.dirty = True
+        self.version += 1
+        return self.slots.sort(key=key, reverse=reverse)
     
     def use(self, slot_index: int, player: Player) -> None:
         """
@@ -126,8 +248,8 @@ class Inventory:
         :param slot_index: The index of the item in the inventory.
         :param player: The player using the item.
         """
-        if 0 <= slot_index < len(self.items):
-            item = self.items[slot_index]
+        if 0 <= slot_index < len(self.slots):
+            item = self.slots[slot_index]
 
             # Check if the item is usable
             if item.is_usable(player):
@@ -137,12 +259,14 @@ class Inventory:
                 # Handle stackable items
                 if item.stackable:
                     item.count -= 1
+                    self.adjust_total(item.name, -1)
                     if item.count <= 0:
-                        self.items.pop(slot_index)
+                        item.count = 0
+                        self.remove_slot(item, slot_index)
                         print(f"{item.name} stack is empty and has been removed.")
                 else:
                     # Remove non-stackable items
-                    self.items.pop(slot_index)
+                    self.remove_slot(item, slot_index)
                     print(f"{item.name} has been removed from the inventory.")
             else:
                 print(f"{item.name} cannot be used in the current context.")
@@ -153,7 +277,7 @@ class Inventory:
 
     def list_items(self)->list[str]:
         """List all items in the inventory."""
-        return [(item.name, item.count) for item in self.items]
+        return [(item.name, item.count) for item in self.slots]
 
     def swap_items(self, index1:int, index2:int)->None:
         """
@@ -161,8 +285,10 @@ class Inventory:
         :param index1: Index of the first item.
         :param index2: Index of the second item.
         """
-        if 0 <= index1 < len(self.items) and 0 <= index2 < len(self.items):
-            self.items[index1], self.items[index2] = self.items[index2], self.items[index1]
+        if 0 <= index1 < len(self.slots) and 0 <= index2 < len(self.slots):
+            self.slots[index1], self.slots[index2] = self.slots[index2], self.slots[index1]
+            self.dirty = True
+            self.version += 1
             print(f"Swapped items at index {index1} and {index2}.")
         else:
             print("Invalid indices for swapping.")
\ No newline at end of file
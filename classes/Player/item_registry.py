@@ -0,0 +1,72 @@
+from __future__ import annotations
+import json
+from functools import partial
+from typing import Callable, Iterable, Optional
+from classes.Player.items import Item, ItemDefinition, item_class_for
+
+ItemConstructor = Callable[..., Item]
+
+class ItemRegistry:
+    def __init__(self, data: dict[str, dict]):
+        """
+        Every item definition, built once from the item data, with a ready constructor per ref.
+        Creating an item is then a dictionary lookup and a small allocation; definitions are shared
+        by every item created from the registry.
+        :param data: Item data keyed by ref (e.g., {"1": {"name": "Health Potion", ...}}).
+        :raises ValueError: If an item uses a type with no registered class.
+        """
+        self.definitions: dict[int, ItemDefinition] = {}
+        self.constructors: dict[int, ItemConstructor] = {}
+        for reference, item in data.items():
+            self.register(ItemDefinition.from_data(reference, item))
+
+    @classmethod
+    def from_files(cls, files: Iterable[str]) -> ItemRegistry:
+        """Build a registry from several item data files."""
+        data = {}
+        for file in files:
+            with open(file, "r") as f:
+                data.update(json.load(f))
+        return cls(data)
+
+    def register(self, definition: ItemDefinition) -> None:
+        """Add (or replace) a definition and precompute its constructor."""
+        self.definitions[definition.ref] = definition
+        self.constructors[definition.ref] = partial(item_class_for(definition.type), definition)
+
+    def get_definition(self, item_ref: int) -> Optional[ItemDefinition]:
+        return self.definitions.get(int(item_ref))
+
+    def create_item(self, item_ref: int, count: int = 1) -> Optional[Item]:
+        """
+        Create an item.
+        :param item_ref: The item's reference number.
+        :param count: The quantity the item entry holds.
+        :return: The item, or None if the ref is unknown.
+        """
+        constructor = self.constructors.get(int(item_ref))
+        if constructor is None:
+            print(f"Unknown item reference: {item_ref}")
+            return None
+        return constructor(count)
+
+    def create_items(self, item_refs: Iterable[int]) -> list[Item]:
+        """
+        Create one item per ref, in order. Unknown refs are skipped.
+        :param item_refs: Reference numbers (e.g., a loot table roll).
+        """
+        constructors = self.constructors
+        items = []
+        for item_ref in item_refs:
+            constructor = constructors.get(int(item_ref))
+            if constructor is None:
+                print(f"Unknown item reference: {item_ref}")
+                continue
+            items.append(constructor())
+        return items
+
+    def __contains__(self, item_ref: int) -> bool:
+        return int(item_ref) in self.definitions
+
+    def __len__(self) -> int:
+        return len(self.definitions)
@@ -1,69 +1,136 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from types import MappingProxyType
+from typing import Mapping, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
     from classes.Player.player import Player
     from classes.Player.status_effects import StatusEffect
 
 
+def freeze_stat_list(stat_list) -> tuple[MappingProxyType, ...]:
+    """Convert a list of stat dictionaries (e.g., [{"strength": 5}]) into a read-only tuple."""
+    return tuple(MappingProxyType(dict(stat_pair)) for stat_pair in stat_list or ())
+
+class ItemDefinition:
+    __slots__ = ("ref", "type", "name", "stackable", "description", "gold_cost", "properties")
+
+    COMMON_FIELDS = ("type", "name", "stackable", "description", "gold_cost")
+    STAT_LIST_FIELDS = ("stats", "required_stats")
+
+    def __init__(self, ref: int, type: str, name: str, stackable=False, description="", gold_cost=0, properties: dict = None):
+        """
+        The shared, immutable data for one item ref. Every instance of the item points at the same
+        definition, so an inventory entry only stores its definition, its count and any state of its own.
+        :param ref: The item's reference number.
+        :param type: The item type from the data files (e.g., "Consumable").
+        :param properties: Type-specific fields (e.g., "effect_type", "slot", "stats").
+        """
+        properties = dict(properties or {})
+        for field in self.STAT_LIST_FIELDS:
+            if field in properties:
+                properties[field] = freeze_stat_list(properties[field])
+        for slot, value in (("ref", ref), ("type", type), ("name", name), ("stackable", stackable),
+                            ("description", description), ("gold_cost", gold_cost),
+                            ("properties", MappingProxyType(properties))):
+            object.__setattr__(self, slot, value)
+
+    @classmethod
+    def from_data(cls, reference: int, item: dict) -> ItemDefinition:
+        """
+        Build a definition from an entry of the item data files.
+        :param reference: The item's reference number.
+        :param item: The item's data (e.g., {"name": "Health Potion", "type": "Consumable", ...}).
+        """
+        return cls(
+            ref=int(reference),
+            type=item["type"],
+            name=item["name"],
+            stackable=item.get("stackable", False),
+            description=item.get("description", ""),
+            gold_cost=item.get("gold_cost", 0),
+            properties={key: value for key, value in item.items() if key not in cls.COMMON_FIELDS},
+        )
+
+    def to_data(self) -> dict:
+        """The definition as a plain data-file entry."""
+        data = {"type": self.type, "name": self.name, "stackable": self.stackable,
+                "description": self.description, "gold_cost": self.gold_cost}
+        for key, value in self.properties.items():
+            data[key] = [dict(stat_pair) for stat_pair in value] if key in self.STAT_LIST_FIELDS else value
+        return data
+
+    def get(self, key: str, default=None):
+        """Look up a type-specific field."""
+        return self.properties.get(key, default)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ItemDefinition is immutable (tried to set '{name}').")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"ItemDefinition is immutable (tried to delete '{name}').")
+
+    # Definitions are shared, never duplicated
+    def __copy__(self) -> ItemDefinition:
+        return self
+
+    def __deepcopy__(self, memo) -> ItemDefinition:
+        return self
+
+    def __reduce__(self):
+        return (ItemDefinition.from_data, (self.ref, self.to_data()))
+
+    def __repr__(self):
+        return f"ItemDefinition({self.ref}, {self.name!r}, type={self.type!r})"
+
+#########################################################################################
+
 class Item:
-    def __init__(self, ref:int, name:str, stackable=False, description="", gold_cost=0, count=1):
+    __slots__ = ("definition", "count", "state")
+
+    def __init__(self, definition: ItemDefinition, count: int = 1, state: dict = None):
         """
-        Base class for all items.
-        :param name: Name of the item.
-        :param stackable: Whether the item can be stacked.
-        :param description: A brief description of the item.
-        :param value: The item's monetary value.
+        Base class for all items: a lightweight record pointing at a shared ItemDefinition.
+        :param definition: The item's shared definition.
+        :param count: How many of the item this entry holds.
+        :param state: Per-instance state (e.g., durability), if the item has any.
         """
-        self.ref = ref
-        self.name = name
+        self.definition = definition
         self.count = count
-        self.stackable = stackable
-        self.description = description
-        self.gold_cost = gold_cost
+        self.state = state
+
+    @property
+    def ref(self) -> int:
+        return self.definition.ref
+
+    @property
+    def name(self) -> str:
+        return self.definition.name
+
+    @property
+    def stackable(self) -> bool:
+        return self.definition.stackable
+
+    @property
+    def description(self) -> str:
+        return self.definition.description
+
+    @property
+    def gold_cost(self) -> int:
+        return self.definition.gold_cost
+
+    def copy(self, count: int = None) -> Item:
+        """A new entry for the same definition (the definition itself is shared, not copied)."""
+        return type(self)(self.definition, self.count if count is None else count, dict(self.state) if self.state else None)
 
     @staticmethod
     def create_item(reference:int, data: dict) -> Item:
         """
         Factory method to create an item based on the data dictionary.
+        Builds a fresh definition on every call; use an ItemRegistry to create items repeatedly.
         :param data: A dictionary containing item properties.
         :return: An instance of Item or its subclasses.
         """
-        print(reference)
-        item = data[str(reference)]
-        item_type = item["type"]
-        if item_type == "Consumable":
-            return Consumable(
-                ref=reference,
-                name=item["name"],
-                stackable=item["stackable"],
-                description=item["description"],
-                gold_cost=item["gold_cost"],
-                effect_type=item["effect_type"],
-                effect_value=item.get("effect_value", 0),
-                status_effect=item.get("status_effect", None),
-            )
-        elif item_type == "Equipment":
-            return Equipment(
-                ref=reference,
-                name=item["name"],
-                stackable=item["stackable"],
-                description=item["description"],
-                gold_cost=item["gold_cost"],
-                slot=item["slot"],
-                stats=item["stats"],
-                required_stats=item.get("required_stats", {}),
-            )
-        elif item_type == "PlotItem":
-            return PlotItem(
-                ref=reference,
-                name=item["name"],
-                stackable=item["stackable"],
-                description=item["description"],
-                gold_cost=item["gold_cost"],
-                quest_name=item["quest_name"],
-            )
-        else:
-            raise ValueError(f"Unknown item type: {item_type}")
+        definition = ItemDefinition.from_data(reference, data[str(reference)])
+        return item_class_for(definition.type)(definition)
 
     def is_usable(self, player):
         """
@@ -86,17 +153,25 @@ class Item:
 #########################################################################################
 
 class Consumable(Item):
-    def __init__(self, ref, name, stackable, description, gold_cost, effect_type, effect_value, status_effect=None):
-        """
-        Consumable items with diverse effects.
-        :param effect_type: The type of effect ("restore_hp", "restore_mp", "remove_status", "apply_status").
-        :param effect_value: The magnitude of the effect (e.g., amount of HP restored).
-        :param status_effect: A StatusEffect object to apply, if applicable.
-        """
-        super().__init__(ref, name, stackable=stackable, description=description, gold_cost=gold_cost)
-        self.effect_type:str = effect_type  # "restore_hp", "restore_mp", etc.
-        self.effect_value:int = effect_value
-        self.status_effect:str = status_effect
+    """
+    Consumable items with diverse effects. Their definition provides:
+    effect_type: The type of effect ("restore_hp", "restore_mp", "remove_status", "apply_status").
+    effect_value: The magnitude of the effect (e.g., amount of HP restored).
+    status_effect: The status effect to apply or remove, if applicable.
+    """
+    __slots__ = ()
+
+    @property
+    def effect_type(self) -> str:
+        return self.definition.get("effect_type")
+
+    @property
+    def effect_value(self) -> int:
+        return self.definition.get("effect_value", 0)
+
+    @property
+    def status_effect(self) -> str:
+        return self.definition.get("status_effect")
 
     def use_item(self, player:Player)->None:
         """
@@ -137,13 +212,19 @@ class Consumable(Item):
     
 #########################################################################################
 class PlotItem(Item):
-    def __init__(self, ref, name, stackable, description, gold_cost, quest_name):
-        """
-        Plot items, usually for quests or story progression.
-        :param quest_name: The name of the quest this item is tied to.
-        """
-        super().__init__(ref, name, stackable=stackable|False, description=description, gold_cost=gold_cost)
-        self.quest_name = quest_name
+    """
+    Plot items, usually for quests or story progression.
+    Their definition may name the quest the item is tied to ("quest_name").
+    """
+    __slots__ = ()
+
+    @property
+    def stackable(self) -> bool:
+        return False
+
+    @property
+    def quest_name(self) -> str:
+        return self.definition.get("quest_name")
 
     def use_item(self, target):
         """
@@ -160,17 +241,50 @@ class PlotItem(Item):
 
 #########################################################################################
 class Equipment(Item):
-    def __init__(self, ref, name, stackable, description, gold_cost, slot, stats: list[dict[str,int]]=[{}], required_stats:list[dict[str, int]]=[{}]):
+    """
+    Equipment items like weapons or armor. Their definition provides:
+    slot: The equipment slot (e.g., "weapon", "armor").
+    stats: Stat modifiers (e.g., [{"strength": 5}, {"agility": 2}]).
+    required_stats: Minimum stats required to equip the item (e.g., [{"strength": 10}]).
+    """
+    __slots__ = ()
+
+    @property
+    def stackable(self) -> bool:
+        return False
+
+    @property
+    def slot(self) -> str:
+        return self.definition.get("slot")
+
+    @property
+    def stats(self) -> tuple[MappingProxyType, ...]:
+        return self.definition.get("stats", ())
+
+    @property
+    def required_stats(self) -> tuple[MappingProxyType, ...]:
+        return self.definition.get("required_stats", ())
+
+    @property
+    def bonuses(self) -> dict[str, int]:
+        """The item's stat modifiers summed per stat (e.g., {"strength": 5, "stamina": 3})."""
+        bonuses: dict[str, int] = {}
+        for stat_pair in self.stats:
+            for stat, value in stat_pair.items():
+                bonuses[stat] = bonuses.get(stat, 0) + value
+        return bonuses
+
+    def unmet_requirement(self, stats: Mapping[str, int]) -> Optional[tuple[str, int]]:
         """
-        Equipment items like weapons or armor.
-        :param slot: The equipment slot (e.g., "weapon", "armor").
-        :param stats: A list of dictionariues of stat modifiers (e.g., [{"strength": 5}, {"agility": 2}]).
-        :param required_stats: A list of minimum stats required to equip the item (e.g., [{"strength": 10}]).
+        The first required stat the given stats fall short of.
+        :param stats: Stat values to check (e.g., a player's effective stats).
+        :return: (stat, required value), or None if every requirement is met.
         """
-        super().__init__(ref, name, stackable=stackable|False, description=description, gold_cost=gold_cost)
-        self.slot = slot
-        self.stats = stats # Default to an empty dict if not provided
-        self.required_stats = required_stats  # Default to an empty dict if not provided
+        for stat_requirement in self.required_stats:
+            for stat, required_value in stat_requirement.items():
+                if stats.get(stat, 0) < required_value:
+                    return stat, required_value
+        return None
 
     def is_usable(self, player: Player)->bool:
         """
@@ -178,13 +292,13 @@ class Equipment(Item):
         :param player: The player attempting to equip the item.
         :return: True if the player meets the required stats, otherwise False.
         """
-        for stat_requirement in self.required_stats:
-            for stat, required_value in stat_requirement.items():  # Iterate over items
-                if player.stats.explicit_stats.get(stat, 0) < required_value:
-                    print(f"Cannot equip {self.name}. {stat.capitalize()} {required_value} required. (current stat is {player.stats.explicit_stats.get(stat, 0)})")
-                    return False
+        unmet = self.unmet_requirement(player.stats.effective_stats)
+        if unmet:
+            stat, required_value = unmet
+            print(f"Cannot equip {self.name}. {stat.capitalize()} {required_value} required. (current stat is {player.stats.effective_stats.get(stat, 0)})")
+            return False
         return True
-        
+
     def use_item(self, player:Player):
         """
         Attempt to equip the item to the proper slot.
@@ -199,3 +313,51 @@ class Equipment(Item):
             player.equipment_manager.equip(self)
         else:
             print(f"{player.name} does not have an EquipmentManager.")
+
+#########################################################################################
+# Item types
+
+# type name from the data files -> item class
+ITEM_TYPES: dict[str, type[Item]] = {}
+
+def register_item_type(type_name: str, item_class: type[Item] = None):
+    """
+    Register the class built for an item type. Can also be used as a class decorator.
+    :param type_name: The "type" used in the item data files (e.g., "Consumable").
+    :param item_class: The Item subclass to construct.
+    """
+    def register(item_class: type[Item]) -> type[Item]:
+        ITEM_TYPES[type_name] = item_class
+        return item_class
+
+    if item_class is None:
+        return register
+    return register(item_class)
+
+def item_class_for(type_name: str) -> type[Item]:
+    """
+    The class registered for an item type.
+    :raises ValueError: If no class is registered for the type.
+    """
+    try:
+        return ITEM_TYPES[type_name]
+    except KeyError:
+        raise ValueError(f"Unknown item type: {type_name}") from None
+
+register_item_type("Consumable", Consumable)
+register_item_type("Equipment", Equipment)
+register_item_type("PlotItem", PlotItem)
+register_item_type("Plot Item", PlotItem)  # Spelling used by data/plotitems.json
+
+######################################################################################
+# Item records: immutable copies of item entries, used by Player snapshots
+
+# (item class, shared definition, count, per-instance state as (key, value) pairs or None)
+ItemRecord = tuple[type[Item], ItemDefinition, int, Optional[tuple]]
+
+def item_record(item: Item) -> ItemRecord:
+    return type(item), item.definition, item.count, tuple(item.state.items()) if item.state else None
+
+def item_from_record(record: ItemRecord) -> Item:
+    item_class, definition, count, state = record
+    return item_class(definition, count, dict(state) if state else None)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+from operator import ge, le
+from typing import Iterable, Mapping, Optional, TYPE_CHECKING, TypedDict
+from classes.Player.derived_stats import DERIVED_STATS
+if TYPE_CHECKING:
+    from classes.Player.items import Equipment
+
+class LoadoutPlan(TypedDict):
+    equipped: dict[str, Optional[Equipment]]  # slot -> item, None for a slot left empty
+    score: float  # Objective value of the loadout
+    stats: dict[str, int]  # Stats with the loadout on
+
+def stat_coefficients(weights: Mapping[str, float], base_stats: Mapping[str, int]) -> dict[str, float]:
+    """
+    How much one point of each stat is worth to a weighted objective.
+    :param weights: Stat name -> weight. Names may be explicit stats or derived stats (e.g., {"damage": 1, "ac": 2}).
+    :param base_stats: The stats derived stats are measured around. Exact for linear formulas,
+                       such as the built-in derived stats.
+    :return: Explicit stat -> objective gain per point.
+    """
+    coefficients: dict[str, float] = {}
+    for name, weight in weights.items():
+        derived_stat = DERIVED_STATS.get(name)
+        if derived_stat is None:
+            coefficients[name] = coefficients.get(name, 0) + weight
+            continue
+        before = derived_stat.compute(base_stats)
+        for stat in derived_stat.depends_on:
+            raised = dict(base_stats)
+            raised[stat] = raised.get(stat, 0) + 1
+            coefficients[stat] = coefficients.get(stat, 0) + weight * (derived_stat.compute(raised) - before)
+    return coefficients
+
+class Candidate:
+    __slots__ = ("item", "bonus", "requirements", "score")
+
+    def __init__(self, item: Equipment, bonus: tuple[int, ...], requirements: tuple[tuple[int, int], ...], score: float):
+        """An item prepared for the search, with its stats as vectors over the optimizer's stat index."""
+        self.item = item
+        self.bonus = bonus
+        self.requirements = requirements  # (stat index, required value) pairs
+        self.score = score
+
+class SlotGroup:
+    __slots__ = ("slots", "candidates", "stat_max", "best")
+
+    def __init__(self, slots: tuple[str, ...], candidates: list[Candidate], stat_count: int):
+        """
+        The equipment slots one kind of item fits in (e.g., ring1 and ring2 for rings), and the
+        candidates for them, best first.
+        """
+        self.slots = slots
+        self.candidates = candidates
+        capacity = len(slots)
+        # Upper bounds on what the group can add: per stat, and to the objective
+        self.stat_max = tuple(
+            sum(sorted((max(0, c.bonus[i]) for c in candidates), reverse=True)[:capacity]) for i in range(stat_count)
+        )
+        self.best = sum(max(0, c.score) for c in candidates[:capacity])
+
+######################################################################################
+
+class LoadoutOptimizer:
+    def __init__(self, weights: Mapping[str, float], slots: Iterable[str], slot_groups: Mapping[str, tuple[str, ...]] = None):
+        """
+        Finds the loadout with the highest weighted objective whose items all meet their required stats,
+        counting bonuses from the rest of the loadout but never an item's own bonus.
+        Items that can never beat another item for the same slots are dropped up front, and the
+        remaining search is a branch and bound over slots, best items first, that cuts branches
+        which cannot beat the best loadout found or can no longer meet a chosen item's requirements.
+        :param weights: Stat name -> weight, over explicit or derived stats (see stat_coefficients).
+        :param slots: The equipment slots that can be filled.
+        :param slot_groups: Item slot -> equipment slots it fits, for items that fit several (e.g., {"ring": ("ring1", "ring2")}).
+        """
+        self.weights = dict(weights)
+        self.slots = tuple(slots)
+        self.slot_groups = dict(slot_groups or {})
+
+    def optimize(self, base_stats: Mapping[str, int], items: Iterable[Equipment], current: Mapping[str, Optional[Equipment]] = None) -> LoadoutPlan:
+        """
+        The best loadout from a set of items.
+        :param base_stats: The player's stats without any equipment.
+        :param items: Every item that may be equipped (inventory and currently equipped gear).
+        :param current: The current slot -> item, so kept items stay in the slot they are in.
+        :return: The plan, with every slot listed.
+        """
+        coefficients = stat_coefficients(self.weights, base_stats)
+        items = list(items)
+        bonuses = [item.bonuses for item in items]
+
+        # Every stat an item adds or requires gets a position in the search's stat vectors
+        stat_names: list[str] = []
+        for item, bonus in zip(items, bonuses):
+            stat_names.extend(bonus)
+            for stat_requirement in item.required_stats:
+                stat_names.extend(stat_requirement)
+        stat_names = list(dict.fromkeys(stat_names))
+        stat_index = {stat: i for i, stat in enumerate(stat_names)}
+        stat_count = len(stat_names)
+        base = tuple(base_stats.get(stat, 0) for stat in stat_names)
+
+        # Build candidates per group of slots
+        by_group: dict[tuple[str, ...], list[Candidate]] = {}
+        for item, bonus in zip(items, bonuses):
+            slots = self.slot_groups.get(item.slot, (item.slot,))
+            if not all(slot in self.slots for slot in slots):
+                continue
+            vector = tuple(bonus.get(stat, 0) for stat in stat_names)
+            requirements: dict[int, int] = {}
+            for stat_requirement in item.required_stats:
+                for stat, required_value in stat_requirement.items():
+                    requirements[stat_index[stat]] = max(required_value, requirements.get(stat_index[stat], required_value))
+            score = sum(coefficients.get(stat, 0) * value for stat, value in bonus.items())
+            by_group.setdefault(slots, []).append(Candidate(item, vector, tuple(requirements.items()), score))
+
+        groups = []
+        for slots, candidates in by_group.items():
+            candidates.sort(key=lambda c: -c.score)
+            groups.append(SlotGroup(slots, self.drop_dominated(candidates, len(slots), stat_count), stat_count))
+        # Any requirement no loadout can reach rules its item out
+        reachable = [base[i] + sum(group.stat_max[i] for group in groups) for i in range(stat_count)]
+        groups = [
+            SlotGroup(group.slots, [c for c in group.candidates if all(reachable[i] >= value for i, value in c.requirements)], stat_count)
+            for group in groups
+        ]
+        # Search the groups with the most to gain first
+        groups.sort(key=lambda group: -group.best)
+
+        # Suffix bounds: what the groups from g onwards can still add
+        suffix_best = [0.0] * (len(groups) + 1)
+        suffix_stat_max = [(0,) * stat_count] * (len(groups) + 1)
+        for g in range(len(groups) - 1, -1, -1):
+            suffix_best[g] = suffix_best[g + 1] + groups[g].best
+            suffix_stat_max[g] = tuple(a + b for a, b in zip(suffix_stat_max[g + 1], groups[g].stat_max))
+
+        best_score = 0.0
+        best_picks: list[Candidate] = []
+        picks: list[Candidate] = []
+        totals = [0] * stat_count
+        nothing_left = (0,) * stat_count
+
+        def feasible(stat_max: tuple[int, ...]) -> bool:
+            for pick in picks:
+                for i, required_value in pick.requirements:
+                    if base[i] + totals[i] - pick.bonus[i] + stat_max[i] < required_value:
+                        return False
+            return True
+
+        def add(candidate: Candidate, sign: int) -> None:
+            for i, value in enumerate(candidate.bonus):
+                if value:
+                    totals[i] += sign * value
+
+        def search(g: int, start: int, remaining: int, score: float) -> None:
+            nonlocal best_score, best_picks
+            if g == len(groups):
+                if score > best_score and feasible(nothing_left):
+                    best_score, best_picks = score, list(picks)
+                return
+            group = groups[g]
+            candidates = group.candidates
+            # Bound: the best of what is left in this group, plus every later group at its best
+            bound = score + sum(max(0, c.score) for c in candidates[start:start + remaining]) + suffix_best[g + 1]
+            if bound <= best_score or not feasible(suffix_stat_max[g]):
+                return
+            if remaining:
+                for index in range(start, len(candidates)):
+                    candidate = candidates[index]
+                    if score + candidate.score + sum(max(0, c.score) for c in candidates[index + 1:index + remaining]) + suffix_best[g + 1] <= best_score:
+                        break  # Candidates are sorted, so later ones cannot do better
+                    picks.append(candidate)
+                    add(candidate, 1)
+                    search(g, index + 1, remaining - 1, score + candidate.score)
+                    add(candidate, -1)
+                    picks.pop()
+            # Leave the rest of this group's slots empty
+            search(g + 1, 0, len(groups[g + 1].slots) if g + 1 < len(groups) else 0, score)
+
+        search(0, 0, len(groups[0].slots) if groups else 0, 0.0)
+
+        current = current or {}
+        equipped: dict[str, Optional[Equipment]] = {slot: None for slot in self.slots}
+        for group in groups:
+            in_group = set(group.candidates)
+            group_items = [pick.item for pick in best_picks if pick in in_group]
+            # Items kept from the current loadout stay in their slot
+            free = list(group.slots)
+            for slot in group.slots:
+                current_item = current.get(slot)
+                if current_item is not None and any(item is current_item for item in group_items):
+                    equipped[slot] = current_item
+                    free.remove(slot)
+                    group_items = [item for item in group_items if item is not current_item]
+            for slot, item in zip(free, group_items):
+                equipped[slot] = item
+
+        stats = dict(base_stats)
+        for pick in best_picks:
+            for stat, value in pick.item.bonuses.items():
+                stats[stat] = stats.get(stat, 0) + value
+        return {"equipped": equipped, "score": best_score, "stats": stats}
+
+    @staticmethod
+    def drop_dominated(candidates: list[Candidate], capacity: int, stat_count: int) -> list[Candidate]:
+        """
+        Drop candidates that at least `capacity` kept candidates beat outright: a score as high, every
+        bonus as high and no requirement higher. Swapping one of those in can never make a loadout worse.
+        :param candidates: Sorted best score first, so only earlier candidates can dominate later ones.
+        """
+        kept: list[tuple[Candidate, list[int]]] = []
+        for candidate in candidates:
+            requirements = [0] * stat_count
+            for i, value in candidate.requirements:
+                requirements[i] = value
+            dominated_by = 0
+            for other, other_requirements in kept:
+                if (other.score >= candidate.score
+                        and all(map(ge, other.bonus, candidate.bonus))
+                        and all(map(le, other_requirements, requirements))):
+                    dominated_by += 1
+                    if dominated_by >= capacity:
+                        break
+            if dominated_by < capacity:
+                kept.append((candidate, requirements))
+        return [candidate for candidate, _ in kept]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+from typing import Callable
+
+class ModifierLayer:
+    def __init__(self, on_change: Callable[[str], None] = None):
+        """
+        Aggregated stat modifiers kept apart from base stats.
+        Each stat has a running additive total and a running multiplicative total (summed fractions,
+        0.1 = +10%), updated incrementally as modifiers are added and removed, so the order in which
+        effects come and go cannot make values drift.
+        :param on_change: Called with the stat name whenever its totals change.
+        """
+        self.additive: dict[str, int] = {}
+        self.multiplicative: dict[str, float] = {}
+        self.counts: dict[str, int] = {}  # Active modifiers per stat
+        self.on_change = on_change
+
+    def add(self, stat: str, value: int | float, kind: str = "add") -> None:
+        """
+        Add a modifier.
+        :param stat: The stat it modifies.
+        :param value: Flat amount for "add", fraction for "mul" (e.g., 0.25 for +25%).
+        :param kind: "add" or "mul".
+        """
+        totals = self.totals_for(kind)
+        totals[stat] = totals.get(stat, 0) + value
+        self.counts[stat] = self.counts.get(stat, 0) + 1
+        if self.on_change:
+            self.on_change(stat)
+
+    def remove(self, stat: str, value: int | float, kind: str = "add") -> None:
+        """Remove a modifier previously added with the same arguments."""
+        totals = self.totals_for(kind)
+        totals[stat] = totals.get(stat, 0) - value
+        self.counts[stat] = self.counts.get(stat, 0) - 1
+        if self.counts[stat] <= 0:
+            # Nothing left on this stat: reset exactly rather than keep float residue
+            self.counts.pop(stat)
+            self.additive.pop(stat, None)
+            self.multiplicative.pop(stat, None)
+        if self.on_change:
+            self.on_change(stat)
+
+    def totals_for(self, kind: str) -> dict:
+        if kind == "add":
+            return self.additive
+        if kind == "mul":
+            return self.multiplicative
+        raise ValueError(f"Invalid modifier kind: {kind}")
+
+    def effective(self, stat: str, base: int) -> int:
+        """The stat's value after modifiers: (base + additive) * (1 + multiplicative)."""
+        value = base + self.additive.get(stat, 0)
+        multiplier = self.multiplicative.get(stat)
+        if multiplier:
+            return int(round(value * (1 + multiplier)))
+        return value
+
+    def clear(self) -> None:
+        """Remove every modifier."""
+        stats = list(self.counts)
+        self.additive.clear()
+        self.multiplicative.clear()
+        self.counts.clear()
+        if self.on_change:
+            for stat in stats:
+                self.on_change(stat)
+
+    def snapshot_state(self) -> tuple:
+        """The modifier totals as an immutable value (see Player.snapshot)."""
+        return tuple(self.additive.items()), tuple(self.multiplicative.items()), tuple(self.counts.items())
+
+    def restore_state(self, state: tuple) -> None:
+        """Put back totals from snapshot_state. on_change is not called; the owner refreshes what depends on them."""
+        additive, multiplicative, counts = state
+        self.additive = dict(additive)
+        self.multiplicative = dict(multiplicative)
+        self.counts = dict(counts)
@@ -5,10 +5,93 @@ from classes.Player.spell_manager import SpellManager
 from classes.Player.stats import Stats
 
 
+class PlayerSnapshot:
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: dict[str, tuple]):
+        """
+        An immutable copy of a player's state, one part per component (see Player.snapshot).
+        Parts are plain immutable values, so snapshots share every part that did not change
+        between them. Flags are stored by interned ID, so a snapshot is only valid in the
+        process that took it.
+        :param parts: Component name -> the component's snapshot_state().
+        """
+        self.parts = parts
+
+    # Snapshots never change, so copies share them
+    def __copy__(self) -> "PlayerSnapshot":
+        return self
+
+    def __deepcopy__(self, memo) -> "PlayerSnapshot":
+        return self
+
 class Player:
     def __init__(self):
         self.stats = Stats()
         self.inventory = Inventory()
         self.equipment_manager = EquipmentManager(self)
         self.flags = FlagManager()
-        self.spell_manager = SpellManager(self)
\ No newline at end of file
+        self.spell_manager = SpellManager(self)
+        # The snapshot the player was last taken as or restored to, and each component's version at that point
+        self.base_snapshot: PlayerSnapshot = None
+        self.synced_versions: dict[str, int] = {}
+
+    def snapshot_components(self) -> dict:
+        """Component name -> the object holding that part of the player's state."""
+        return {
+            "stats": self.stats,
+            "effects": self.stats.status_manager,
+            "inventory": self.inventory,
+            "equipment": self.equipment_manager,
+            "flags": self.flags,
+            "spells": self.spell_manager,
+        }
+
+    def snapshot(self) -> PlayerSnapshot:
+        """
+        Capture the player's state, e.g. for undo or to look ahead and come back.
+        Every component keeps a version counter; components that have not changed since the last
+        snapshot (or restore) reuse that snapshot's part, so the cost is proportional to what changed.
+        :return: A snapshot that later changes to the player never affect.
+        """
+        base = self.base_snapshot
+        parts = {}
+        for name, component in self.snapshot_components().items():
+            if base is not None and self.synced_versions.get(name) == component.version:
+                parts[name] = base.parts[name]
+            else:
+                parts[name] = component.snapshot_state()
+                self.synced_versions[name] = component.version
+        self.base_snapshot = PlayerSnapshot(parts)
+        return self.base_snapshot
+
+    def restore(self, snapshot: PlayerSnapshot) -> None:
+        """
+        Put the player back into a snapshot's state. Components already in that state are skipped,
+        so stepping back through recent snapshots only touches what differs.
+        Restored state is marked for the save journal like any other change.
+        """
+        base = self.base_snapshot
+        for name, component in self.snapshot_components().items():
+            part = snapshot.parts[name]
+            if base is not None and base.parts[name] is part and self.synced_versions.get(name) == component.version:
+                continue
+            component.restore_state(part)
+            self.synced_versions[name] = component.version
+        self.base_snapshot = snapshot
+
+    def fork(self) -> "Player":
+        """
+        A new, independent player in the same state, without deep-copying the object graph.
+        Definitions, spells and other immutable data are shared.
+        """
+        player = Player()
+        player.restore(self.snapshot())
+        return player
+
+    # The base snapshot only speeds up later snapshots, and holds process-specific flag IDs
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["base_snapshot"] = None
+        state["synced_versions"] = {}
+        return state
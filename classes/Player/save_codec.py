@@ -0,0 +1,166 @@
+from __future__ import annotations
+import struct
+import zlib
+from typing import Any, Callable
+
+# Compact binary save format.
+# A save is a fixed header (magic, schema version, payload checksum) followed by one encoded value.
+# Values use a small tagged encoding: integers as zigzag varints, strings and containers prefixed
+# with their varint length. Saves written with an older schema version are upgraded on load by
+# the registered migrations, one version at a time.
+
+MAGIC = b"PYAS"
+SCHEMA_VERSION = 1
+HEADER = struct.Struct("<4sHI")  # magic, schema version, crc32 of the payload
+
+NONE, FALSE, TRUE, INT, FLOAT, STR, LIST, DICT = range(8)
+FLOAT_STRUCT = struct.Struct("<d")
+
+Migration = Callable[[dict], dict]
+
+# version -> function upgrading a save from that version to the next one
+MIGRATIONS: dict[int, Migration] = {}
+
+def register_migration(from_version: int, migration: Migration = None):
+    """
+    Register the upgrade from one schema version to the next. Can also be used as a decorator.
+    :param from_version: The version the migration reads; it must return data for from_version + 1.
+    :param migration: A function taking and returning the decoded save data.
+    """
+    def register(migration: Migration) -> Migration:
+        MIGRATIONS[from_version] = migration
+        return migration
+
+    if migration is None:
+        return register
+    return register(migration)
+
+######################################################################################
+# Values
+
+def write_varint(out: bytearray, number: int) -> None:
+    while number > 0x7F:
+        out.append((number & 0x7F) | 0x80)
+        number >>= 7
+    out.append(number)
+
+def read_varint(buffer: bytes, offset: int) -> tuple[int, int]:
+    number = shift = 0
+    while True:
+        byte = buffer[offset]
+        offset += 1
+        number |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return number, offset
+        shift += 7
+
+def encode_value(value: Any, out: bytearray) -> None:
+    """
+    Append the encoding of a JSON-like value (None, bool, int, float, str, list/tuple, dict with str keys).
+    :raises ValueError: If the value (or something inside it) has another type.
+    """
+    if value is None:
+        out.append(NONE)
+    elif value is True:
+        out.append(TRUE)
+    elif value is False:
+        out.append(FALSE)
+    elif isinstance(value, int):
+        out.append(INT)
+        write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += FLOAT_STRUCT.pack(value)
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        out.append(STR)
+        write_varint(out, len(encoded))
+        out += encoded
+    elif isinstance(value, (list, tuple)):
+        out.append(LIST)
+        write_varint(out, len(value))
+        for item in value:
+            encode_value(item, out)
+    elif isinstance(value, dict):
+        out.append(DICT)
+        write_varint(out, len(value))
+        for key, item in value.items():
+            encode_value(str(key), out)
+            encode_value(item, out)
+    else:
+        raise ValueError(f"Cannot encode value of type {type(value).__name__}: {value!r}")
+
+def decode_value(buffer: bytes, offset: int = 0) -> tuple[Any, int]:
+    """
+    Decode one value.
+    :return: The value and the offset just past it.
+    """
+    tag = buffer[offset]
+    offset += 1
+    if tag == NONE:
+        return None, offset
+    if tag == TRUE:
+        return True, offset
+    if tag == FALSE:
+        return False, offset
+    if tag == INT:
+        number, offset = read_varint(buffer, offset)
+        return (number >> 1) ^ -(number & 1), offset
+    if tag == FLOAT:
+        return FLOAT_STRUCT.unpack_from(buffer, offset)[0], offset + FLOAT_STRUCT.size
+    if tag == STR:
+        length, offset = read_varint(buffer, offset)
+        return bytes(buffer[offset:offset + length]).decode("utf-8"), offset + length
+    if tag == LIST:
+        length, offset = read_varint(buffer, offset)
+        items = []
+        for _ in range(length):
+            item, offset = decode_value(buffer, offset)
+            items.append(item)
+        return items, offset
+    if tag == DICT:
+        length, offset = read_varint(buffer, offset)
+        mapping = {}
+        for _ in range(length):
+            key, offset = decode_value(buffer, offset)
+            mapping[key], offset = decode_value(buffer, offset)
+        return mapping, offset
+    raise ValueError(f"Invalid value tag {tag} at offset {offset - 1}.")
+
+######################################################################################
+# Saves
+
+def encode_save(data: dict) -> bytes:
+    """Encode save data with the current schema version header."""
+    payload = bytearray()
+    encode_value(data, payload)
+    return HEADER.pack(MAGIC, SCHEMA_VERSION, zlib.crc32(payload)) + payload
+
+def decode_save(blob: bytes) -> dict:
+    """
+    Decode a binary save, migrating it to the current schema version.
+    :raises ValueError: If the data is not a save, is corrupted, or comes from a newer or unmigratable version.
+    """
+    if len(blob) < HEADER.size:
+        raise ValueError("Save data is truncated.")
+    magic, version, checksum = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a binary save file.")
+    payload = memoryview(blob)[HEADER.size:]
+    if zlib.crc32(payload) != checksum:
+        raise ValueError("Save data is corrupted (checksum mismatch).")
+    data, end = decode_value(payload)
+    if end != len(payload):
+        raise ValueError("Save data has trailing bytes.")
+    return migrate_save(data, version)
+
+def migrate_save(data: dict, version: int) -> dict:
+    """Upgrade decoded save data from the given schema version to the current one."""
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Save schema version {version} is newer than supported version {SCHEMA_VERSION}.")
+    while version < SCHEMA_VERSION:
+        if version not in MIGRATIONS:
+            raise ValueError(f"No migration from save schema version {version}.")
+        data = MIGRATIONS[version](data)
+        version += 1
+    return data
@@ -0,0 +1,236 @@
+from __future__ import annotations
+import json
+import os
+from typing import IO, Optional, TYPE_CHECKING
+from classes.Player.save_codec import decode_save, encode_save
+if TYPE_CHECKING:
+    from classes.Player.player import Player
+    from classes.Player.save_manager import SaveManager
+
+def atomic_write(path: str, data: bytes) -> None:
+    """
+    Replace a file's contents so that a crash leaves either the old or the new contents, never a mix:
+    write to a temporary file, fsync it, then rename it over the target.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    fsync_directory(directory)
+
+def fsync_directory(directory: str) -> None:
+    """Persist a rename inside a directory (no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class SaveJournal:
+    def __init__(
+        self,
+        save_manager: SaveManager,
+        snapshot_file: str = None,
+        journal_file: str = None,
+        compact_every: int = 100,
+        fsync_every: int = 8,
+    ) -> None:
+        """
+        Journaled saves: each commit appends only what changed since the previous one (one JSON line),
+        and every compact_every commits the full state is written as a binary snapshot and the journal
+        is emptied. Loading restores the snapshot and replays the journal on top of it.
+        Changes are read from the dirty markers kept by Stats, FlagManager, Inventory and EquipmentManager.
+        :param save_manager: Provides item creation and the save data layout.
+        :param snapshot_file: Defaults to the save file with a ".snapshot" extension.
+        :param journal_file: Defaults to the save file with a ".journal" extension.
+        :param compact_every: Commits between snapshots.
+        :param fsync_every: Commits between fsyncs of the journal (1 = every commit is durable on return).
+        """
+        base = os.path.splitext(save_manager.save_file)[0]
+        self.save_manager = save_manager
+        self.snapshot_file = snapshot_file or f"{base}.snapshot"
+        self.journal_file = journal_file or f"{base}.journal"
+        self.compact_every = compact_every
+        self.fsync_every = fsync_every
+        self.sequence: int = 0  # Sequence number of the last record written
+        self.records_since_snapshot: int = 0
+        self.unsynced: int = 0
+        self.has_snapshot: bool = False
+        self.journal: Optional[IO[str]] = None
+
+    # Change tracking
+    @staticmethod
+    def clear_changes(player: Player) -> None:
+        player.stats.dirty.clear()
+        player.flags.dirty.clear()
+        player.inventory.dirty = False
+        player.equipment_manager.dirty.clear()
+
+    @staticmethod
+    def collect_changes(player: Player) -> dict:
+        """Build a delta record from the player's dirty markers and clear them."""
+        record = {}
+        stats = player.stats
+        if stats.dirty:
+            sections: dict[str, dict] = {}
+            for section, key in stats.dirty:
+                values = getattr(stats, section)
+                if key in values:
+                    sections.setdefault(section, {})[key] = values[key]
+            if sections:
+                record["stats"] = sections
+        flags = player.flags
+        if flags.dirty:
+            current = flags.list_flags()
+            record["flags"] = {
+                "set": {key: current[key] for key in flags.dirty if key in current},
+                "cleared": [key for key in flags.dirty if key not in current],
+            }
+        if player.inventory.dirty:
+            record["inventory"] = [[item.ref, item.count] for item in player.inventory.items]
+        equipment = player.equipment_manager
+        if equipment.dirty:
+            record["equipment"] = {
+                slot: item.ref if item else None
+                for slot, item in ((slot, equipment.equipped_items[slot]) for slot in equipment.dirty)
+            }
+        SaveJournal.clear_changes(player)
+        return record
+
+    def apply_record(self, player: Player, record: dict) -> None:
+        """Replay one delta record onto a player."""
+        stats = player.stats
+        with stats.deferred_recalculation():
+            for section in ("explicit_stats", "resources", "meta_info"):
+                if section in record.get("stats", {}):
+                    getattr(stats, section).update(record["stats"][section])
+        if "flags" in record:
+            player.flags.set_flags(record["flags"]["set"])
+            player.flags.clear_flags(record["flags"]["cleared"])
+        if "inventory" in record:
+            player.inventory.items = [
+                item for item in (self.save_manager.create_item(ref, count) for ref, count in record["inventory"]) if item
+            ]
+        if "equipment" in record:
+            equipped = {slot: item for slot, item in player.equipment_manager.equipped_items.items() if item}
+            for slot, ref in record["equipment"].items():
+                item = self.save_manager.create_item(ref) if ref is not None else None
+                if item:
+                    equipped[slot] = item
+                else:
+                    equipped.pop(slot, None)
+            player.equipment_manager.restore_equipped(equipped)
+
+    # Writing
+    def commit(self, player: Player) -> bool:
+        """
+        Append the player's changes since the last commit (e.g., after every choice).
+        The first commit of a journal that was not loaded writes a full snapshot instead.
+        :return: True if anything changed and a record was written.
+        """
+        if not self.has_snapshot:
+            self.compact(player)
+            return True
+        record = self.collect_changes(player)
+        if not record:
+            return False
+        self.sequence += 1
+        record["seq"] = self.sequence
+        journal = self.open_journal()
+        journal.write(json.dumps(record, separators=(",", ":")) + "\n")
+        journal.flush()
+        self.unsynced += 1
+        self.records_since_snapshot += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+        if self.records_since_snapshot >= self.compact_every:
+            self.compact(player)
+        return True
+
+    def sync(self) -> None:
+        """Force committed records to disk."""
+        if self.journal and self.unsynced:
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+        self.unsynced = 0
+
+    def compact(self, player: Player) -> None:
+        """Write a full snapshot of the player and empty the journal."""
+        data = self.save_manager.to_binary_data(self.save_manager.build_save_data(player))
+        data["journal_sequence"] = self.sequence
+        atomic_write(self.snapshot_file, encode_save(data))
+        # Records up to journal_sequence are now in the snapshot, so a crash before the
+        # truncation below only leaves records that loading skips
+        if self.journal:
+            self.journal.close()
+        self.journal = open(self.journal_file, "w", encoding="utf-8")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.records_since_snapshot = 0
+        self.unsynced = 0
+        self.has_snapshot = True
+        self.clear_changes(player)
+
+    def open_journal(self) -> IO[str]:
+        if self.journal is None:
+            self.journal = open(self.journal_file, "a", encoding="utf-8")
+        return self.journal
+
+    def close(self) -> None:
+        """Sync and close the journal."""
+        if self.journal:
+            self.sync()
+            self.journal.close()
+            self.journal = None
+
+    # Reading
+    def load(self, player: Player) -> bool:
+        """
+        Restore a player from the snapshot plus the journal. A partially written last record
+        (e.g., from a crash mid-write) is ignored.
+        :return: False if there was no snapshot to load.
+        """
+        self.close()
+        if not os.path.exists(self.snapshot_file):
+            print(f"Snapshot {self.snapshot_file} not found.")
+            return False
+        with open(self.snapshot_file, "rb") as f:
+            data = decode_save(f.read())
+        self.save_manager.restore_binary_data(player, data)
+        self.sequence = data.get("journal_sequence", 0)
+        self.records_since_snapshot = 0
+        self.has_snapshot = True
+
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                lines = f.read().split("\n")
+            for line_number, line in enumerate(lines):
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    if line_number == len(lines) - 1:
+                        # Torn final write: drop it from the journal before appending after it
+                        self.truncate_journal(lines[:line_number])
+                        break
+                    raise ValueError(f"Corrupted journal record on line {line_number + 1}.") from None
+                if record["seq"] <= self.sequence:
+                    continue  # Already part of the snapshot
+                self.apply_record(player, record)
+                self.sequence = record["seq"]
+                self.records_since_snapshot += 1
+        self.clear_changes(player)
+        return True
+
+    def truncate_journal(self, lines: list[str]) -> None:
+        contents = "".join(f"{line}\n" for line in lines if line)
+        atomic_write(self.journal_file, contents.encode("utf-8"))
@@ -1,11 +1,17 @@
 import json
-from typing import Optional, TYPE_CHECKING
-from classes.Player.items import Consumable, Equipment, Item, PlotItem
+from typing import Iterable, Optional, TYPE_CHECKING
+from classes.Player.definition_cache import DefinitionCache, get_definition_cache
+from classes.Player.item_registry import ItemRegistry
+from classes.Player.items import Item
+from classes.Player.save_codec import decode_save, encode_save
+from classes.Player.save_journal import atomic_write
 
 if TYPE_CHECKING:
     from classes.Player.player import Player
 
 class SaveManager:
+    SAVE_FORMATS = ("json", "binary")
+
     def __init__(
         self,
         player,
@@ -13,33 +19,54 @@ class SaveManager:
         consumables_file: str = "data/consumables.json",
         equipment_file: str = "data/equipment.json",
         plotitems_file: str = "data/plotitems.json",
+        save_format: str = "json",
+        definition_cache: DefinitionCache = None,
     ) -> None:
+        """
+        :param save_format: "json" for readable saves, "binary" for the compact versioned format
+                            (see save_codec), which also restores equipment without re-applying its stats.
+        :param definition_cache: Where item catalogs are parsed and kept; defaults to the process-wide cache,
+                                 so SaveManagers using the same files share one copy of the definitions.
+        """
+        if save_format not in self.SAVE_FORMATS:
+            raise ValueError(f"Invalid save format: {save_format}")
         self.player = player
         self.save_file = save_file
+        self.save_format = save_format
         self.item_files = {
             "Consumable": consumables_file,
             "Equipment": equipment_file,
             "Plot": plotitems_file,
         }
-        self.item_definitions = self.load_all_item_definitions()
+        self.definition_cache = definition_cache or get_definition_cache()
+
+    @property
+    def item_registry(self) -> ItemRegistry:
+        """The shared registry for this manager's item files, loaded on first use and reloaded when a file changes."""
+        return self.definition_cache.get_registry(tuple(self.item_files.values()))
+
+    @property
+    def item_definitions(self) -> dict[str, dict]:
+        return self.load_all_item_definitions()
 
     def load_all_item_definitions(self) -> dict[str, dict]:
         """Load all item definitions from multiple JSON files and flattens them into one dictionary."""
-        item_defs = {}
-        for file in self.item_files.values():
-            with open(file, "r") as f:
-                item_defs.update(json.load(f))
-        return item_defs
+        return self.definition_cache.get_definitions(tuple(self.item_files.values()))
 
-    def create_item(self, item_ref: int) -> Optional[Item]:
-        """Create an item instance based on its name."""
-        return Item.create_item(item_ref, self.item_definitions)
+    def create_item(self, item_ref: int, count: int = 1) -> Optional[Item]:
+        """Create an item instance from its reference number."""
+        return self.item_registry.create_item(item_ref, count)
 
-    def save_game(self, player: "Player") -> None:  # Use string literal for forward reference
-        """Save the player's game state to a JSON file."""
-        data = {
-            "stats": player.stats.to_dict(),
-            "flags": player.flags.list_flags(),
+    def create_items(self, item_refs: Iterable[int]) -> list[Item]:
+        """Create one item instance per reference number, in order."""
+        return self.item_registry.create_items(item_refs)
+
+    def build_save_data(self, player: "Player") -> dict:
+        """Collect a snapshot of the player's game state as a JSON-ready dictionary."""
+        return {
+            # Copied so the data stays a consistent snapshot if the player changes while it is being written
+            "stats": {section: dict(values) for section, values in player.stats.to_dict().items()},
+            "flags": dict(player.flags.list_flags()),
             "inventory": [
                 {"ref": item.ref, "count": item.count} for item in player.inventory.items
             ],
@@ -48,39 +75,85 @@ class SaveManager:
                 for slot, item in player.equipment_manager.equipped_items.items()
             },
         }
-        print(data)
-        with open(self.save_file, "w") as f:
-            json.dump(data, f, indent=4)
+
+    @staticmethod
+    def to_binary_data(data: dict) -> dict:
+        """
+        Reshape save data into the binary schema: derived stats are dropped (they are recomputed on load),
+        inventory entries become [ref, count] pairs and only occupied equipment slots are kept.
+        """
+        stats = data["stats"]
+        return {
+            "stats": {key: stats[key] for key in ("explicit_stats", "resources", "meta_info")},
+            "flags": data["flags"],
+            "inventory": [[entry["ref"], entry["count"]] for entry in data["inventory"]],
+            "equipment": {slot: ref for slot, ref in data["equipment"].items() if ref is not None},
+        }
+
+    def save_game(self, player: "Player") -> None:  # Use string literal for forward reference
+        """Save the player's game state in the configured save format."""
+        self.write_save_data(self.build_save_data(player))
         print(f"Game saved to {self.save_file}.")
 
+    def write_save_data(self, data: dict) -> None:
+        """Serialize save data in the configured format and atomically replace the save file."""
+        if self.save_format == "binary":
+            atomic_write(self.save_file, encode_save(self.to_binary_data(data)))
+        else:
+            atomic_write(self.save_file, json.dumps(data, indent=4).encode("utf-8"))
+
+    def read_save_data(self) -> dict:
+        """Read and decode the save file (binary saves are migrated to the current schema)."""
+        if self.save_format == "binary":
+            with open(self.save_file, "rb") as f:
+                return decode_save(f.read())
+        with open(self.save_file, "r") as f:
+            return json.load(f)
+
     def load_game(self, player: "Player") -> None:
-        """Load the player's game state from a JSON file."""
+        """Load the player's game state from the save file."""
         try:
-            with open(self.save_file, "r") as f:
-                data = json.load(f)
-
-            # Restore stats
-            player.stats.load_from_dict(data["stats"])
-
-            # Restore flags
-            player.flags.set_flags(data["flags"])
-
-            # Restore inventory
-            player.inventory.items = []
-            for item_ref in data["inventory"]:
-                item = self.create_item(item_ref["ref"])
-                if item:
-                    player.inventory.add_item(item, item_ref["count"])
-                    
-            # Restore equipment
-            for slot, item_ref in data["equipment"].items():
-                if item_ref:
-                    item = self.create_item(item_ref)
-                    if item:
-                        player.equipment_manager.equip(item)
-
+            self.restore_save_data(player, self.read_save_data())
             print(f"Game loaded from {self.save_file}.")
         except FileNotFoundError:
             print(f"Save file {self.save_file} not found. Starting a new game.")
         except Exception as e:
             print(f"Error loading game: {e}")
+
+    def restore_save_data(self, player: "Player", data: dict) -> None:
+        """Apply decoded save data (as returned by read_save_data) to a player."""
+        if self.save_format == "binary":
+            self.restore_binary_data(player, data)
+            return
+
+        # Restore stats
+        player.stats.load_from_dict(data["stats"])
+
+        # Restore flags
+        player.flags.set_flags(data["flags"])
+
+        # Restore inventory
+        player.inventory.items = []
+        for item_ref in data["inventory"]:
+            item = self.create_item(item_ref["ref"])
+            if item:
+                player.inventory.add_item(item, item_ref["count"])
+
+        # Restore equipment; saved stats already include its bonuses
+        player.equipment_manager.restore_equipped(
+            {slot: item for slot, item in ((slot, self.create_item(ref)) for slot, ref in data["equipment"].items() if ref) if item}
+        )
+
+    def restore_binary_data(self, player: "Player", data: dict) -> None:
+        """
+        Restore a decoded binary save. Saved stats already include equipment bonuses, so items are
+        put back into their slots directly instead of being equipped again.
+        """
+        player.stats.load_from_dict(data["stats"])
+        player.flags.set_flags(data["flags"])
+        player.inventory.items = [
+            item for item in (self.create_item(ref, count) for ref, count in data["inventory"]) if item
+        ]
+        player.equipment_manager.restore_equipped(
+            {slot: item for slot, item in ((slot, self.create_item(ref)) for slot, ref in data["equipment"].items()) if item}
+        )
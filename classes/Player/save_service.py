@@ -0,0 +1,117 @@
+from __future__ import annotations
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional, TypedDict, TYPE_CHECKING
+if TYPE_CHECKING:
+    from classes.Player.player import Player
+    from classes.Player.save_manager import SaveManager
+
+class SaveMetrics(TypedDict):
+    requested: int  # Saves requested
+    written: int  # Writes completed
+    coalesced: int  # Requests folded into a write that was already waiting
+    failed: int  # Writes that raised
+    waiting: bool  # Whether a snapshot is waiting behind the write in progress
+    writing: bool  # Whether a write is in progress
+    last_write_seconds: float
+    max_write_seconds: float
+    max_wait_seconds: float  # Longest time from a request to its write completing
+
+class AsyncSaveService:
+    def __init__(self, save_manager: SaveManager, executor: Executor = None) -> None:
+        """
+        Saves without blocking the event loop. A save request snapshots the player immediately (cheap
+        dictionary copies) and returns; serializing and writing happen on a worker thread.
+        While a write is in progress, further requests replace the waiting snapshot instead of queueing,
+        so any burst of saves costs at most one extra write and the newest state always wins.
+        Must be used from within a running event loop.
+        :param save_manager: Provides the save format, file and item creation.
+        :param executor: Runs the file I/O; defaults to a single dedicated thread.
+        """
+        self.save_manager = save_manager
+        self.owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="save")
+        # (snapshot, completion future, time of the oldest request it covers)
+        self.waiting: Optional[tuple[dict, asyncio.Future, float]] = None
+        self.writer: Optional[asyncio.Task] = None
+        self.metrics: SaveMetrics = {
+            "requested": 0,
+            "written": 0,
+            "coalesced": 0,
+            "failed": 0,
+            "waiting": False,
+            "writing": False,
+            "last_write_seconds": 0.0,
+            "max_write_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def request_save(self, player: Player) -> asyncio.Future:
+        """
+        Snapshot the player and schedule a write.
+        :return: A future resolved once a write including this snapshot is on disk (awaiting it is optional).
+        """
+        data = self.save_manager.build_save_data(player)
+        self.metrics["requested"] += 1
+        if self.waiting is not None:
+            _, future, requested_at = self.waiting
+            self.waiting = (data, future, requested_at)
+            self.metrics["coalesced"] += 1
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiting = (data, future, time.perf_counter())
+        self.metrics["waiting"] = True
+        if self.writer is None:
+            self.writer = asyncio.get_running_loop().create_task(self.write_waiting())
+        return future
+
+    async def save(self, player: Player) -> None:
+        """Save and wait for the write to complete."""
+        await self.request_save(player)
+
+    async def load(self, player: Player) -> None:
+        """Read and decode the save file on the worker thread, then restore the player on the loop."""
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self.executor, self.save_manager.read_save_data)
+        self.save_manager.restore_save_data(player, data)
+
+    async def write_waiting(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self.waiting is not None:
+                data, future, requested_at = self.waiting
+                self.waiting = None
+                self.metrics["waiting"] = False
+                self.metrics["writing"] = True
+                started = time.perf_counter()
+                try:
+                    await loop.run_in_executor(self.executor, self.save_manager.write_save_data, data)
+                except Exception as e:
+                    self.metrics["failed"] += 1
+                    print(f"Error saving game: {e}")
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    self.metrics["written"] += 1
+                    if not future.cancelled():
+                        future.set_result(None)
+                finished = time.perf_counter()
+                self.metrics["writing"] = False
+                self.metrics["last_write_seconds"] = finished - started
+                self.metrics["max_write_seconds"] = max(self.metrics["max_write_seconds"], finished - started)
+                self.metrics["max_wait_seconds"] = max(self.metrics["max_wait_seconds"], finished - requested_at)
+        finally:
+            self.writer = None
+
+    async def flush(self) -> None:
+        """Wait until every requested save has been written."""
+        while self.writer is not None:
+            await asyncio.shield(self.writer)
+
+    async def close(self) -> None:
+        """Flush pending saves and release the worker thread (if the service created it)."""
+        await self.flush()
+        if self.owns_executor:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+import json
+import sqlite3
+import time
+from typing import Iterable, Optional, TYPE_CHECKING
+if TYPE_CHECKING:
+    from classes.Player.player import Player
+    from classes.Player.save_manager import SaveManager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saves (
+    id INTEGER PRIMARY KEY,
+    player_id TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    UNIQUE (player_id, slot)
+);
+CREATE TABLE IF NOT EXISTS stats (
+    save_id INTEGER NOT NULL REFERENCES saves(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value NUMERIC,
+    PRIMARY KEY (save_id, section, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stats_by_value ON stats (section, key, value);
+CREATE TABLE IF NOT EXISTS flags (
+    save_id INTEGER NOT NULL REFERENCES saves(id) ON DELETE CASCADE,
+    flag TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (save_id, flag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS flags_by_name ON flags (flag, value);
+CREATE TABLE IF NOT EXISTS inventory (
+    save_id INTEGER NOT NULL REFERENCES saves(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    ref INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (save_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS inventory_by_ref ON inventory (ref);
+CREATE TABLE IF NOT EXISTS equipment (
+    save_id INTEGER NOT NULL REFERENCES saves(id) ON DELETE CASCADE,
+    slot TEXT NOT NULL,
+    ref INTEGER NOT NULL,
+    PRIMARY KEY (save_id, slot)
+) WITHOUT ROWID;
+"""
+
+STAT_SECTIONS = ("explicit_stats", "resources", "meta_info")
+
+class SaveStore:
+    def __init__(self, path: str = "saves/saves.db"):
+        """
+        Many players' save slots in one SQLite database, with stats, flags, inventory and equipment
+        in their own indexed tables so they can be queried across players.
+        Save data uses the same layout as SaveManager.to_binary_data, so loaded data can be restored
+        with SaveManager.restore_binary_data (equipment is put back without re-applying its stats).
+        :param path: The database file (":memory:" for a temporary database).
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+        # Keys of the slots being read by load_many
+        self.connection.execute("CREATE TEMP TABLE wanted (player_id TEXT, slot TEXT)")
+
+    # Writing
+    def save(self, player_id: str, slot: str, data: dict) -> None:
+        """Write one save slot, replacing it if it exists."""
+        self.save_many([(player_id, slot, data)])
+
+    def save_many(self, saves: Iterable[tuple[str, str, dict]]) -> None:
+        """
+        Write several save slots in a single transaction.
+        :param saves: (player_id, slot, data) triples, data in SaveManager.to_binary_data layout.
+        """
+        with self.connection:
+            cursor = self.connection.cursor()
+            for player_id, slot, data in saves:
+                save_id = self.upsert_save(cursor, player_id, slot)
+                for table in ("stats", "flags", "inventory", "equipment"):
+                    cursor.execute(f"DELETE FROM {table} WHERE save_id = ?", (save_id,))
+                cursor.executemany(
+                    "INSERT INTO stats (save_id, section, key, value) VALUES (?, ?, ?, ?)",
+                    [(save_id, section, key, value)
+                     for section in STAT_SECTIONS for key, value in data["stats"].get(section, {}).items()],
+                )
+                cursor.executemany(
+                    "INSERT INTO flags (save_id, flag, value) VALUES (?, ?, ?)",
+                    [(save_id, flag, json.dumps(value)) for flag, value in data["flags"].items()],
+                )
+                cursor.executemany(
+                    "INSERT INTO inventory (save_id, position, ref, count) VALUES (?, ?, ?, ?)",
+                    [(save_id, position, ref, count) for position, (ref, count) in enumerate(data["inventory"])],
+                )
+                cursor.executemany(
+                    "INSERT INTO equipment (save_id, slot, ref) VALUES (?, ?, ?)",
+                    [(save_id, equipment_slot, ref) for equipment_slot, ref in data["equipment"].items() if ref is not None],
+                )
+
+    @staticmethod
+    def upsert_save(cursor: sqlite3.Cursor, player_id: str, slot: str) -> int:
+        cursor.execute(
+            "INSERT INTO saves (player_id, slot, saved_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (player_id, slot) DO UPDATE SET saved_at = excluded.saved_at",
+            (player_id, slot, time.time()),
+        )
+        cursor.execute("SELECT id FROM saves WHERE player_id = ? AND slot = ?", (player_id, slot))
+        return cursor.fetchone()[0]
+
+    def delete(self, player_id: str, slot: str) -> bool:
+        """Delete a save slot. :return: True if it existed."""
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM saves WHERE player_id = ? AND slot = ?", (player_id, slot))
+        return cursor.rowcount > 0
+
+    # Reading
+    def load(self, player_id: str, slot: str) -> Optional[dict]:
+        """Read one save slot, or None if it does not exist."""
+        return self.load_many([(player_id, slot)]).get((player_id, slot))
+
+    def load_many(self, keys: Iterable[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+        """
+        Read several save slots with one query per table.
+        :param keys: (player_id, slot) pairs.
+        :return: (player_id, slot) -> data, for the slots that exist.
+        """
+        cursor = self.connection.cursor()
+        cursor.executemany("INSERT INTO wanted (player_id, slot) VALUES (?, ?)", list(keys))
+        try:
+            cursor.execute(
+                "SELECT saves.id, saves.player_id, saves.slot FROM saves "
+                "JOIN wanted ON wanted.player_id = saves.player_id AND wanted.slot = saves.slot"
+            )
+            saves = {save_id: (player_id, slot) for save_id, player_id, slot in cursor.fetchall()}
+            results = {
+                save_id: {"stats": {section: {} for section in STAT_SECTIONS}, "flags": {}, "inventory": [], "equipment": {}}
+                for save_id in saves
+            }
+            if results:
+                selected = "SELECT {columns} FROM {table} WHERE save_id IN (SELECT id FROM saves JOIN wanted USING (player_id, slot))"
+                for save_id, section, key, value in cursor.execute(selected.format(columns="save_id, section, key, value", table="stats")):
+                    results[save_id]["stats"][section][key] = value
+                for save_id, flag, value in cursor.execute(selected.format(columns="save_id, flag, value", table="flags")):
+                    results[save_id]["flags"][flag] = json.loads(value)
+                for save_id, ref, count in cursor.execute(selected.format(columns="save_id, ref, count", table="inventory") + " ORDER BY save_id, position"):
+                    results[save_id]["inventory"].append([ref, count])
+                for save_id, slot, ref in cursor.execute(selected.format(columns="save_id, slot, ref", table="equipment")):
+                    results[save_id]["equipment"][slot] = ref
+        finally:
+            cursor.execute("DELETE FROM wanted")
+        self.connection.commit()
+        return {saves[save_id]: data for save_id, data in results.items()}
+
+    def list_slots(self, player_id: str) -> list[str]:
+        """A player's save slots, most recently saved first."""
+        rows = self.connection.execute(
+            "SELECT slot FROM saves WHERE player_id = ? ORDER BY saved_at DESC", (player_id,)
+        )
+        return [slot for slot, in rows]
+
+    # Queries
+    def players_with_flag(self, flag: str, value=True) -> list[tuple[str, str]]:
+        """(player_id, slot) of every save where the flag has the given value."""
+        rows = self.connection.execute(
+            "SELECT saves.player_id, saves.slot FROM flags JOIN saves ON saves.id = flags.save_id "
+            "WHERE flags.flag = ? AND flags.value = ? ORDER BY saves.player_id, saves.slot",
+            (flag, json.dumps(value)),
+        )
+        return rows.fetchall()
+
+    def players_with_stat(self, section: str, key: str, value: int | float) -> list[tuple[str, str]]:
+        """(player_id, slot) of every save where a stat equals the given value."""
+        rows = self.connection.execute(
+            "SELECT saves.player_id, saves.slot FROM stats JOIN saves ON saves.id = stats.save_id "
+            "WHERE stats.section = ? AND stats.key = ? AND stats.value = ? ORDER BY saves.player_id, saves.slot",
+            (section, key, value),
+        )
+        return rows.fetchall()
+
+    def players_on_event(self, event: int) -> list[tuple[str, str]]:
+        """(player_id, slot) of every save currently at the given event."""
+        return self.players_with_stat("meta_info", "event", event)
+
+    def players_with_item(self, item_ref: int) -> list[tuple[str, str]]:
+        """(player_id, slot) of every save holding the item in its inventory."""
+        rows = self.connection.execute(
+            "SELECT DISTINCT saves.player_id, saves.slot FROM inventory JOIN saves ON saves.id = inventory.save_id "
+            "WHERE inventory.ref = ? ORDER BY saves.player_id, saves.slot",
+            (item_ref,),
+        )
+        return rows.fetchall()
+
+    # Players
+    def save_player(self, save_manager: SaveManager, player: Player, player_id: str, slot: str = "default") -> None:
+        """Save a player's current state into a slot."""
+        self.save(player_id, slot, save_manager.to_binary_data(save_manager.build_save_data(player)))
+
+    def load_player(self, save_manager: SaveManager, player: Player, player_id: str, slot: str = "default") -> bool:
+        """
+        Restore a player from a slot.
+        :return: False if the slot does not exist.
+        """
+        data = self.load(player_id, slot)
+        if data is None:
+            print(f"No save for {player_id} in slot {slot}.")
+            return False
+        save_manager.restore_binary_data(player, data)
+        return True
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> SaveStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,5 +1,8 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, TypedDict
+from collections.abc import Mapping
+from typing import Iterable, Optional, TYPE_CHECKING, TypedDict
+from classes.Events.effects import BoundEffect, apply_effects, bind_effects
+from classes.Player.definition_cache import get_definition_cache
 if TYPE_CHECKING:
     from classes.Player.player import Player
 
@@ -8,63 +11,223 @@ class Spell(TypedDict):
     description: str
     mana_cost: int
     rank: int  # Used to track the spell's level or effectiveness
+    effects: list[dict]  # Optional, same format as choice outcome effects (e.g., [{"action": "modify_hp", "value": 30}])
+
+def thaw(value):
+    """Recursively copy read-only containers (mappingproxies, tuples) into plain dicts and lists."""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+class SpellCatalog:
+    def __init__(self, data: dict[str, dict]):
+        """
+        Every spell rank from the spell data, indexed by name and ref, with effects bound once.
+        :param data: Spells keyed by ref, each with a name, description and a list of ranks
+                     (e.g., {"1": {"name": "Fireball", "ranks": [{"rank": 1, "mana_cost": 15, "effects": [...]}]}}).
+        :raises ValueError: If a spell uses an unknown effect action.
+        """
+        self.ranks: dict[str, dict[int, Spell]] = {}  # name -> rank -> spell
+        self.names: dict[int, str] = {}  # ref -> name
+        self.bound_effects: dict[tuple[str, int], tuple[BoundEffect, ...]] = {}
+        for reference, entry in data.items():
+            self.names[int(reference)] = entry["name"]
+            ranks = self.ranks.setdefault(entry["name"], {})
+            for rank in entry["ranks"]:
+                spell: Spell = {
+                    "name": entry["name"],
+                    "description": rank.get("description", entry.get("description", "")),
+                    "mana_cost": rank["mana_cost"],
+                    "rank": rank["rank"],
+                    "effects": rank.get("effects", []),
+                }
+                ranks[spell["rank"]] = spell
+                self.bound_effects[(spell["name"], spell["rank"])] = bind_effects(spell["effects"])
+
+    def resolve_name(self, identifier: str | int) -> Optional[str]:
+        """The spell name for a name or ref."""
+        if isinstance(identifier, int):
+            return self.names.get(identifier)
+        return identifier if identifier in self.ranks else None
+
+    def get(self, identifier: str | int, rank: int = 1) -> Optional[Spell]:
+        """
+        A spell at a given rank.
+        :param identifier: The spell's name or ref.
+        """
+        name = self.resolve_name(identifier)
+        return self.ranks[name].get(rank) if name else None
+
+    def effects_for(self, spell: Spell) -> Optional[tuple[BoundEffect, ...]]:
+        """The pre-bound effects of a catalog spell, or None if the spell is not from this catalog."""
+        if self.ranks.get(spell["name"], {}).get(spell["rank"]) is spell:
+            return self.bound_effects[(spell["name"], spell["rank"])]
+        return None
+
+    def __contains__(self, identifier: str | int) -> bool:
+        return self.resolve_name(identifier) is not None
+
+    # The catalog is shared by every spellbook, never duplicated
+    def __copy__(self) -> SpellCatalog:
+        return self
+
+    def __deepcopy__(self, memo) -> SpellCatalog:
+        return self
+
+# spells file -> (the parsed data the catalog was built from, catalog)
+spell_catalogs: dict[str, tuple[dict, SpellCatalog]] = {}
+
+def get_spell_catalog(spells_file: str = "data/spells.json") -> SpellCatalog:
+    """The shared catalog for a spells file, rebuilt when the file changes on disk."""
+    entry = get_definition_cache().get_catalog(spells_file)
+    cached = spell_catalogs.get(entry.path)
+    if cached is None or cached[0] is not entry.data:
+        cached = spell_catalogs[entry.path] = (entry.data, SpellCatalog(entry.data))
+    return cached[1]
+
+######################################################################################
 
 class SpellManager:
-    def __init__(self, player:Player):
-        """Initialize the SpellManager with an empty spell list."""
-        self.spells: list[Spell] = []
+    def __init__(self, player:Player, spells_file: str = "data/spells.json"):
+        """
+        Initialize the SpellManager with an empty spellbook.
+        Known spells are kept in a dictionary by name, so lookups do not scan the spellbook.
+        :param spells_file: The spell catalog, loaded the first time a spell is learned by name or ref.
+        """
+        self.spellbook: dict[str, Spell] = {}
+        self.spell_effects: dict[str, tuple[BoundEffect, ...]] = {}  # name -> bound effects of the known rank
         self.player = player
+        self.spells_file = spells_file
+        self.version: int = 0  # Bumped on every change, so Player snapshots can tell whether to recapture the spellbook
+
+    @property
+    def catalog(self) -> SpellCatalog:
+        return get_spell_catalog(self.spells_file)
 
-    def add_spell(self, spell: Spell) -> None:
+    @property
+    def spells(self) -> list[Spell]:
+        """Known spells, in the order they were learned."""
+        return list(self.spellbook.values())
+
+    def add_spell(self, spell: Spell | str | int, rank: int = 1) -> None:
         """
         Add a spell to the player's collection. Replace with a higher rank if it already exists.
-        :param spell: The spell to add.
-        """
-        for i, existing_spell in enumerate(self.spells):
-            if existing_spell["name"] == spell["name"]:
-                if spell["rank"] > existing_spell["rank"]:
-                    self.spells[i] = spell
-                    print(f"Upgraded {spell['name']} to rank {spell['rank']}.")
-                else:
-                    print(f"{spell['name']} is already at an equal or higher rank.")
+        :param spell: The spell to add (any mapping), or the name or ref of a spell in the catalog.
+        :param rank: The catalog rank to learn, when spell is a name or ref.
+        """
+        if isinstance(spell, Mapping):
+            if not isinstance(spell, dict):  # Read-only, e.g., frozen by a compiled event
+                spell = thaw(spell)
+        else:
+            identifier = spell
+            spell = self.catalog.get(identifier, rank)
+            if spell is None:
+                print(f"Spell {identifier} (rank {rank}) not found in the catalog.")
                 return
-        self.spells.append(spell)
+
+        existing_spell = self.spellbook.get(spell["name"])
+        if existing_spell is not None:
+            if spell["rank"] > existing_spell["rank"]:
+                self.learn(spell)
+                print(f"Upgraded {spell['name']} to rank {spell['rank']}.")
+            else:
+                print(f"{spell['name']} is already at an equal or higher rank.")
+            return
+        self.learn(spell)
         print(f"Added new spell: {spell['name']}.")
 
+    def learn(self, spell: Spell) -> None:
+        effects = self.catalog.effects_for(spell) if spell.get("effects") else ()
+        if effects is None:
+            effects = bind_effects(spell["effects"])
+        self.spellbook[spell["name"]] = spell
+        self.spell_effects[spell["name"]] = effects
+        self.version += 1
+
+    # Snapshots (see Player.snapshot)
+    def snapshot_state(self) -> tuple:
+        """Known spells and their bound effects as an immutable value (spells are shared, not copied)."""
+        return tuple(self.spellbook.items()), tuple(self.spell_effects.items())
+
+    def restore_state(self, state: tuple) -> None:
+        spellbook, spell_effects = state
+        self.spellbook = dict(spellbook)
+        self.spell_effects = dict(spell_effects)
+        self.version += 1
+
+    # Bound effects hold handler functions, so they are rebound after unpickling instead of pickled
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["spell_effects"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.spell_effects = {name: bind_effects(spell.get("effects", ())) for name, spell in self.spellbook.items()}
+
+    def get_spell(self, spell_name: str | int) -> Optional[Spell]:
+        """A known spell by name or catalog ref."""
+        if isinstance(spell_name, int):
+            spell_name = self.catalog.resolve_name(spell_name)
+        return self.spellbook.get(spell_name)
+
     def has_spell(self, spell_name: str) -> bool:
         """
         Check if the player has a specific spell.
         :param spell_name: The name of the spell to check.
         :return: True if the spell exists, False otherwise.
         """
-        return any(spell["name"] == spell_name for spell in self.spells)
+        return spell_name in self.spellbook
 
     def use_spell(self, spell_name: str, player: "Player") -> None:
         """
-        Attempt to cast a spell, consuming mana if the player has enough.
+        Attempt to cast a spell, consuming mana if the player has enough, then applying its effects.
         :param spell_name: The name of the spell to cast.
         :param player: The player object to check and consume mana.
         """
-        for spell in self.spells:
-            if spell["name"] == spell_name:
-                if player.stats.resources["mp"] >= spell["mana_cost"]:
-                    # Consume mana and cast the spell
-                    player.stats.modify_mp(-spell["mana_cost"])
-                    print(f"Casted {spell_name}. (-{spell['mana_cost']} MP)")
-
-                    # Placeholder for visual/special effect
-                    # e.g., play_animation(spell["name"])
-                    return
-                else:
-                    print(f"Not enough mana to cast {spell_name}. Required: {spell['mana_cost']}, Available: {player.stats.resources['mp']}.")
-                    return
-        print(f"Spell {spell_name} not found.")
+        spell = self.spellbook.get(spell_name)
+        if spell is None:
+            print(f"Spell {spell_name} not found.")
+            return
+        if player.stats.resources["mp"] >= spell["mana_cost"]:
+            # Consume mana and cast the spell
+            player.stats.modify_mp(-spell["mana_cost"])
+            print(f"Casted {spell_name}. (-{spell['mana_cost']} MP)")
+            apply_effects(self.spell_effects[spell_name], player)
+        else:
+            print(f"Not enough mana to cast {spell_name}. Required: {spell['mana_cost']}, Available: {player.stats.resources['mp']}.")
+
+    def validate_casts(self, spell_names: Iterable[str], cumulative: bool = False) -> dict[str, Optional[str]]:
+        """
+        Check several casts at once without casting anything.
+        :param spell_names: The spells to check.
+        :param cumulative: Treat the spells as a sequence cast in order, each spending mana before the next.
+        :return: Spell name -> None if it can be cast, otherwise the reason it cannot.
+        """
+        mana = self.player.stats.resources["mp"]
+        results: dict[str, Optional[str]] = {}
+        for spell_name in spell_names:
+            spell = self.spellbook.get(spell_name)
+            if spell is None:
+                results[spell_name] = "not known"
+            elif spell["mana_cost"] > mana:
+                results[spell_name] = f"needs {spell['mana_cost']} MP, {mana} available"
+            else:
+                results[spell_name] = None
+                if cumulative:
+                    mana -= spell["mana_cost"]
+        return results
+
+    def castable_spells(self) -> list[str]:
+        """Names of the known spells the player has enough mana to cast."""
+        mana = self.player.stats.resources["mp"]
+        return [name for name, spell in self.spellbook.items() if spell["mana_cost"] <= mana]
 
     def list_spells(self) -> list[str]:
         """
         List all spells for display or choice options.
         :return: A list of spell names.
         """
-        return [f"{spell['name']} (Rank {spell['rank']}) - {spell['mana_cost']} MP" for spell in self.spells]
-
-    
\ No newline at end of file
+        return [f"{spell['name']} (Rank {spell['rank']}) - {spell['mana_cost']} MP" for spell in self.spellbook.values()]
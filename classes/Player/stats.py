@@ -1,5 +1,9 @@
 from __future__ import annotations
-from typing import TypedDict
+from contextlib import contextmanager
+from typing import Callable, TypedDict
+from classes.Player.derived_stats import DEPENDENTS, DERIVED_STATS, DerivedStatsView, TrackedStats
+from classes.Player.experience import LevelUpEvent, get_xp_curve
+from classes.Player.modifiers import ModifierLayer
 from classes.Player.status_effects import StatusManager
 
 class ExplicitStats(TypedDict):
@@ -28,13 +32,35 @@ class MetaInfo(TypedDict):
     event: int
 
 class Stats:
+    # resource -> the derived stat that caps it
+    RESOURCE_CAPS = {"hp": "max_hp", "mp": "max_mp"}
+    CAP_STATS = frozenset(RESOURCE_CAPS.values())
+
     def __init__(self, initial_explicit:dict[str,int]=None)->None:
         """
         Initialize stats using dictionaries for explicit and derived stats.
         :param initial_explicit: A dictionary of initial explicit stats.
         """
-        # Explicit stats
-        self.explicit_stats: ExplicitStats  = initial_explicit or {
+        # (section, key) pairs written since the last save journal commit
+        self.dirty: set[tuple[str, str]] = set()
+        # Bumped on every change, so Player snapshots can tell whether to recapture the stats
+        self.version: int = 0
+
+        # Derived stats are computed on read and cached until an explicit stat they depend on changes
+        self.derived_cache: dict[str, int] = {}
+        # The derived stat registry generation the cache was filled under (see register_derived_stat)
+        self.derived_generation: int = -1
+        self.derived_stats: DerivedStats = DerivedStatsView(self)
+
+        # Nesting depth of deferred_recalculation blocks
+        self._defer_depth: int = 0
+        self._recalculation_pending: bool = False
+
+        # Stat modifiers from status effects, kept apart from the base (explicit) stats
+        self.modifiers = ModifierLayer(on_change=self.explicit_stat_changed)
+
+        # Explicit stats (base values, before modifiers)
+        self.explicit_stats: ExplicitStats = TrackedStats(initial_explicit or {
             "strength": 10,
             "agility": 10,
             "stamina": 10,
@@ -42,99 +68,175 @@ class Stats:
             "charisma": 10,
             "level": 1,
             "exp": 0,
-        }
+        }, on_change=self.explicit_stat_changed)
 
-        # Derived stats (will be recalculated)
-        self.derived_stats: DerivedStats = {
-            "exp_to_next_level": 0,
-            "max_hp": self.calculate_hp(),
-            "max_mp": self.calculate_mana(),
-            "hit": 0,
-            "damage": 0,
-            "ac": 0,
-        }
+        # Explicit stats after modifiers, kept up to date on every change so reads are plain lookups
+        self.effective_stats: ExplicitStats = dict(self.explicit_stats)
 
         # Temporary stats
-        self.resources: Resources = {
+        self.resources: Resources = TrackedStats({
             "hp": self.derived_stats["max_hp"],
             "mp": self.derived_stats["max_mp"],
-        }
-
-        self.recalculate_derived_stats()
+        }, on_change=self.resource_changed)
 
         # Other
-        self.meta_info: MetaInfo = {
+        self.meta_info: MetaInfo = TrackedStats({
             "day": 1,
             "event": 1
-        }
+        }, on_change=self.meta_info_changed)
 
         self.status_manager = StatusManager()
 
+        # Called with a LevelUpEvent whenever gain_exp crosses one or more levels
+        self.level_up_listeners: list[Callable[[LevelUpEvent], None]] = []
+
+    def explicit_stat_changed(self, stat: str) -> None:
+        """
+        Refresh the stat's effective value, invalidate only the derived stats that read it,
+        and re-clamp resources if a cap moved.
+        """
+        self.version += 1
+        if stat in self.explicit_stats:
+            self.effective_stats[stat] = self.modifiers.effective(stat, self.explicit_stats[stat])
+            self.dirty.add(("explicit_stats", stat))
+        cache = self.derived_cache
+        caps_changed = False
+        for name in DEPENDENTS.get(stat, ()):
+            cache.pop(name, None)
+            if name in self.CAP_STATS:
+                caps_changed = True
+        if caps_changed:
+            self.recalculate_derived_stats()
+
+    def resource_changed(self, resource: str) -> None:
+        self.version += 1
+        self.dirty.add(("resources", resource))
+
+    def meta_info_changed(self, key: str) -> None:
+        self.version += 1
+        self.dirty.add(("meta_info", key))
+
+    # Snapshots (see Player.snapshot)
+    def snapshot_state(self) -> tuple:
+        """Base stats, resources, meta info and modifier totals as an immutable value."""
+        return (tuple(self.explicit_stats.items()), tuple(self.resources.items()),
+                tuple(self.meta_info.items()), self.modifiers.snapshot_state())
+
+    def restore_state(self, state: tuple) -> None:
+        """Put back stats from snapshot_state, refreshing effective stats and dropping cached derived stats once."""
+        explicit_stats, resources, meta_info, modifiers = state
+        self.modifiers.restore_state(modifiers)
+        for section, values in (("explicit_stats", explicit_stats), ("resources", resources), ("meta_info", meta_info)):
+            target = getattr(self, section)
+            # Written around the change callbacks, which would refresh stats one key at a time
+            dict.clear(target)
+            dict.update(target, values)
+            self.dirty.update((section, key) for key, _ in values)
+        self.effective_stats.clear()
+        self.effective_stats.update((stat, self.modifiers.effective(stat, value)) for stat, value in explicit_stats)
+        self.derived_cache.clear()
+        self.version += 1
+
+    @contextmanager
+    def deferred_recalculation(self):
+        """
+        Batch several stat changes into a single derived stat recalculation.
+        Recalculations requested inside the block run once when the outermost block exits
+        (or earlier, if a resource change needs up-to-date maximums).
+        """
+        self._defer_depth += 1
+        try:
+            yield self
+        finally:
+            self._defer_depth -= 1
+            if self._defer_depth == 0:
+                self.flush_recalculation()
+
+    def flush_recalculation(self) -> None:
+        """Run a recalculation that was deferred, if any."""
+        if self._recalculation_pending:
+            self._recalculation_pending = False
+            self.clamp_resources()
+
     def recalculate_derived_stats(self) -> None:
-        """Recalculate derived stats based on explicit stats."""
-        self.derived_stats["exp_to_next_level"] = self.calculate_exp_to_next_level()
-        self.derived_stats["max_hp"] = self.calculate_hp()
-        self.derived_stats["max_mp"] = self.calculate_mana()
-        self.derived_stats["hit"] = self.calculate_hit()
-        self.derived_stats["damage"] = self.calculate_damage()
-        self.derived_stats["ac"] = self.calculate_ac()
-
-        # Ensure temporary stats remain within bounds
-        self.resources["hp"] = min(self.resources["hp"], self.derived_stats["max_hp"])
-        self.resources["mp"]= min(self.resources["mp"], self.derived_stats["max_mp"])
+        """
+        Bring derived stats up to date with explicit stats.
+        Derived stats recompute themselves lazily, so this only has to keep resources within their caps.
+        """
+        if self._defer_depth:
+            self._recalculation_pending = True
+            return
+        self.clamp_resources()
+
+    def clamp_resources(self) -> None:
+        """Ensure temporary stats remain within bounds."""
+        for resource, cap in self.RESOURCE_CAPS.items():
+            self.resources[resource] = min(self.resources[resource], self.derived_stats[cap])
 
     # Calculation methods for derived stats
     def calculate_hp(self) -> int:
-        return (self.explicit_stats["stamina"] * 10) + (self.explicit_stats["level"] * 5)
+        return DERIVED_STATS["max_hp"].compute(self.effective_stats)
 
     def calculate_mana(self) -> int:
-        return (self.explicit_stats["willpower"] * 8) + (self.explicit_stats["level"] * 3)
+        return DERIVED_STATS["max_mp"].compute(self.effective_stats)
 
     def calculate_hit(self) -> int:
-        return (self.explicit_stats["agility"] * 2) + (self.explicit_stats["level"])
+        return DERIVED_STATS["hit"].compute(self.effective_stats)
 
     def calculate_damage(self) -> int:
-        return (self.explicit_stats["strength"] * 3) + (self.explicit_stats["level"] * 2)
+        return DERIVED_STATS["damage"].compute(self.effective_stats)
 
     def calculate_ac(self, armor_bonus: int = 0) -> int:
-        base_ac = 10
-        return base_ac + self.explicit_stats["agility"] + armor_bonus
+        return DERIVED_STATS["ac"].compute(self.effective_stats) + armor_bonus
 
     def calculate_exp_to_next_level(self) -> int:
-        multiplier = 50
-        return (self.explicit_stats["level"] ** 2) * multiplier
+        return DERIVED_STATS["exp_to_next_level"].compute(self.effective_stats)
 
     # Stat modification methods
     def get(self, stat: str) -> int:
-        """Get the value of a stat, derived stat, or resource."""
-        value = (
-            self.explicit_stats.get(stat) or
-            self.derived_stats.get(stat) or
-            self.resources.get(stat) or
-            self.meta_info.get(stat)
-        )
-        if value is None:
-            raise KeyError(f"Stat '{stat}' not found in any category.")
-        return value
+        """Get the value of a stat (after modifiers), derived stat, or resource."""
+        for category in (self.effective_stats, self.derived_stats, self.resources, self.meta_info):
+            if stat in category:
+                return category[stat]
+        raise KeyError(f"Stat '{stat}' not found in any category.")
 
     def modify_stats(self, stat_modifications: list[dict[str, int]]) -> None:
         """Modify explicit stats and recalculate derived stats."""
         print(stat_modifications)
-        for stat_pair in stat_modifications:
-            print("stat pair:", stat_pair)
-            for stat, value in stat_pair.items():
-                if stat in self.explicit_stats:
-                    self.explicit_stats[stat] += value
-                else:
-                    print(f"Warning: Stat '{stat}' not found in explicit stats.")
-        self.recalculate_derived_stats()
+        with self.deferred_recalculation():
+            for stat_pair in stat_modifications:
+                print("stat pair:", stat_pair)
+                for stat, value in stat_pair.items():
+                    if stat in self.explicit_stats:
+                        self.explicit_stats[stat] += value
+                    else:
+                        print(f"Warning: Stat '{stat}' not found in explicit stats.")
+
+    def gain_exp(self, amount: int) -> LevelUpEvent | None:
+        """
+        Adds EXP and handles leveling up. The number of levels gained is solved from the XP curve
+        directly, and derived stats are recalculated once however many levels are crossed.
+        :param amount: The EXP to add.
+        :return: A LevelUpEvent if any levels were gained, otherwise None.
+        """
+        old_level = self.explicit_stats["level"]
+        new_level, exp = get_xp_curve().resolve(old_level, self.explicit_stats["exp"] + amount)
+        with self.deferred_recalculation():
+            self.explicit_stats["exp"] = exp
+            if new_level == old_level:
+                return None
+            self.explicit_stats["level"] = new_level
 
-    def gain_exp(self, amount: int) -> None:
-        """Adds EXP and handles leveling up."""
-        self.explicit_stats["exp"] += amount
-        while self.explicit_stats["exp"] >= self.derived_stats["exp_to_next_level"]:
-            self.explicit_stats["exp"] -= self.derived_stats["exp_to_next_level"]
-            self.level_up()
+        event: LevelUpEvent = {
+            "old_level": old_level,
+            "new_level": new_level,
+            "levels": list(range(old_level + 1, new_level + 1)),
+            "exp": exp,
+        }
+        print(f"Level Up! New Level: {new_level}")
+        for listener in self.level_up_listeners:
+            listener(event)
+        return event
 
     def level_up(self) -> None:
         """Handles leveling up."""
@@ -150,9 +252,11 @@ class Stats:
 
     # Temporary stats
     def modify_hp(self, amount: int) -> None:
+        self.flush_recalculation()
         self.resources["hp"] = max(0, min(self.resources["hp"] + amount, self.derived_stats["max_hp"]))
 
     def modify_mp(self, amount: int) -> None:
+        self.flush_recalculation()
         self.resources["mp"]= max(0, min(self.resources["mp"] + amount, self.derived_stats["max_mp"]))
 
     # Utility methods
@@ -160,19 +264,20 @@ class Stats:
         """Return all stats as a dictionary."""
         return {
             "explicit_stats": self.explicit_stats,
-            "derived_stats": self.derived_stats,
+            "derived_stats": dict(self.derived_stats),
             "resources": self.resources,
             "meta_info": self.meta_info,
         }
 
     def load_from_dict(self, data: dict) -> None:
         """Load stats from a dictionary with validation."""
-        for key in ["explicit_stats", "resources", "meta_info"]:
-            if key in data and isinstance(data[key], dict):
-                getattr(self, key).update(data[key])
-            else:
-                print(f"Warning: Missing or invalid data for {key}.")
-        self.recalculate_derived_stats()
+        with self.deferred_recalculation():
+            for key in ["explicit_stats", "resources", "meta_info"]:
+                if key in data and isinstance(data[key], dict):
+                    getattr(self, key).update(data[key])
+                else:
+                    print(f"Warning: Missing or invalid data for {key}.")
+            self.recalculate_derived_stats()
 
     def show_stats(self):
         """Print all stats to the console."""
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import functools
+from typing import TYPE_CHECKING
+from classes.Player import derived_stats as derived_registry
+from classes.Player.derived_stats import DEPENDENTS, DERIVED_STATS
+from classes.Player.experience import QuadraticCurve, XPCurve, get_xp_curve
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for batch simulations
+    np = None
+if TYPE_CHECKING:
+    from classes.Player.stats import Stats
+
+EXPLICIT_STATS = ("strength", "agility", "stamina", "willpower", "charisma", "level", "exp")
+DEFAULT_EXPLICIT = {"strength": 10, "agility": 10, "stamina": 10, "willpower": 10, "charisma": 10, "level": 1, "exp": 0}
+RESOURCE_CAPS = {"hp": "max_hp", "mp": "max_mp"}
+
+def vectorized_functions() -> dict:
+    """Element-wise stand-ins for the functions derived stat formulas may call."""
+    return {
+        "__builtins__": {},
+        # Reduced pairwise, since a third argument to a ufunc would be taken as its output array
+        "min": lambda *columns: functools.reduce(np.minimum, columns),
+        "max": lambda *columns: functools.reduce(np.maximum, columns),
+        "abs": np.abs,
+        "round": lambda column, ndigits=None: np.rint(column) if ndigits is None else np.round(column, ndigits),
+        "int": lambda column: np.asarray(column).astype(np.int64),
+    }
+
+class StatsBatch:
+    def __init__(self, size: int, explicit: dict[str, object] = None, additive: dict[str, object] = None, multiplicative: dict[str, object] = None):
+        """
+        Explicit stats for N entities stored as NumPy columns, with every Stats operation vectorized.
+        Like Stats, modifier totals are kept apart from base stats and derived stats read the
+        effective values, so results match the scalar Stats class entity for entity.
+        :param size: Number of entities.
+        :param explicit: Optional initial values per explicit stat (a scalar or a length-N sequence).
+        :param additive: Optional flat modifier totals per stat (see ModifierLayer).
+        :param multiplicative: Optional multiplicative modifier totals per stat (summed fractions).
+        """
+        if np is None:
+            raise ImportError("StatsBatch requires numpy (pip install numpy).")
+        self.size = size
+        self.functions = vectorized_functions()
+        self.explicit_stats: dict[str, np.ndarray] = {}
+        for stat in EXPLICIT_STATS:
+            value = (explicit or {}).get(stat, DEFAULT_EXPLICIT[stat])
+            self.explicit_stats[stat] = np.broadcast_to(np.asarray(value, dtype=np.int64), (size,)).copy()
+        # Modifier totals, only for stats that have any
+        self.additive: dict[str, np.ndarray] = {
+            stat: np.broadcast_to(np.asarray(value, dtype=np.int64), (size,)).copy() for stat, value in (additive or {}).items()
+        }
+        self.multiplicative: dict[str, np.ndarray] = {
+            stat: np.broadcast_to(np.asarray(value, dtype=np.float64), (size,)).copy() for stat, value in (multiplicative or {}).items()
+        }
+        # Explicit stats after modifiers, refreshed whenever a base stat changes
+        self.effective_stats: dict[str, np.ndarray] = {stat: self.effective(stat) for stat in EXPLICIT_STATS}
+        self.derived_cache: dict[str, np.ndarray] = {}
+        self.derived_generation = derived_registry.generation
+        self.resources: dict[str, np.ndarray] = {
+            resource: self.derived(cap).copy() for resource, cap in RESOURCE_CAPS.items()
+        }
+        self.meta_info: dict[str, np.ndarray] = {
+            "day": np.ones(size, dtype=np.float64),
+            "event": np.ones(size, dtype=np.int64),
+        }
+
+    @staticmethod
+    def from_stats(stats_list: list[Stats]) -> StatsBatch:
+        """Build a batch from existing Stats (or CompactStats) objects, including their modifier totals."""
+        layers = [getattr(stats, "modifiers", None) for stats in stats_list]
+        # CompactStats has no modifier layer: its status effects change the base stats in place
+        modified = {stat for layer in layers if layer is not None for stat in layer.counts}
+        batch = StatsBatch(
+            len(stats_list),
+            {stat: [stats.explicit_stats[stat] for stats in stats_list] for stat in EXPLICIT_STATS},
+            {stat: [layer.additive.get(stat, 0) if layer else 0 for layer in layers] for stat in modified},
+            {stat: [layer.multiplicative.get(stat, 0.0) if layer else 0.0 for layer in layers] for stat in modified},
+        )
+        for resource in RESOURCE_CAPS:
+            batch.resources[resource] = np.array([stats.resources[resource] for stats in stats_list], dtype=np.int64)
+        for key in batch.meta_info:
+            batch.meta_info[key] = np.array([stats.meta_info[key] for stats in stats_list], dtype=batch.meta_info[key].dtype)
+        return batch
+
+    def effective(self, stat: str) -> np.ndarray:
+        """Vectorized ModifierLayer.effective: (base + additive) * (1 + multiplicative), rounded like round()."""
+        value = self.explicit_stats[stat]
+        if stat in self.additive:
+            value = value + self.additive[stat]
+        multiplier = self.multiplicative.get(stat)
+        if multiplier is None:
+            return value.copy()
+        # np.rint rounds halves to even, as round() does
+        return np.where(multiplier != 0, np.rint(value * (1 + multiplier)).astype(np.int64), value)
+
+    # Derived stats
+    def derived(self, name: str) -> np.ndarray:
+        """Get a derived stat column, computing it only if one of its dependencies (or its formula) changed."""
+        if self.derived_generation != derived_registry.generation:
+            self.derived_cache.clear()
+            self.derived_generation = derived_registry.generation
+        column = self.derived_cache.get(name)
+        if column is None:
+            column = self.derived_cache[name] = self.compute(name)
+        return column
+
+    def compute(self, name: str) -> np.ndarray:
+        derived_stat = DERIVED_STATS[name]
+        if derived_stat.code is not None:
+            result = eval(derived_stat.code, self.functions, self.effective_stats)
+        else:
+            try:
+                result = derived_stat.formula(self.effective_stats)
+            except (TypeError, ValueError):
+                # Formula functions that only understand scalars are applied entity by entity
+                rows = self.rows()
+                result = [derived_stat.formula(row) for row in rows]
+        return np.broadcast_to(np.asarray(result), (self.size,)).copy()
+
+    def derived_stats(self) -> dict[str, np.ndarray]:
+        """Compute every derived stat column."""
+        return {name: self.derived(name) for name in DERIVED_STATS}
+
+    def rows(self) -> list[dict[str, int]]:
+        columns = {stat: column.tolist() for stat, column in self.effective_stats.items()}
+        return [{stat: columns[stat][i] for stat in columns} for i in range(self.size)]
+
+    def invalidate(self, stat: str) -> None:
+        """Refresh the stat's effective column and drop cached derived stats that read it."""
+        self.effective_stats[stat] = self.effective(stat)
+        for name in DEPENDENTS.get(stat, ()):
+            self.derived_cache.pop(name, None)
+
+    def clamp_resources(self) -> None:
+        """Ensure temporary stats remain within bounds."""
+        for resource, cap in RESOURCE_CAPS.items():
+            np.minimum(self.resources[resource], self.derived(cap), out=self.resources[resource])
+
+    # Stat modification methods
+    def modify_stats(self, stat_modifications: list[dict[str, object]], mask: np.ndarray = None) -> None:
+        """
+        Modify explicit stats for every entity (or only those selected by mask) and re-clamp resources once.
+        :param stat_modifications: A list of {stat: amount} dictionaries; amounts may be scalars or length-N arrays.
+        :param mask: Optional boolean array selecting which entities are modified.
+        """
+        for stat_pair in stat_modifications:
+            for stat, value in stat_pair.items():
+                if stat not in self.explicit_stats:
+                    print(f"Warning: Stat '{stat}' not found in explicit stats.")
+                    continue
+                value = np.asarray(value, dtype=np.int64)
+                if mask is None:
+                    self.explicit_stats[stat] += value
+                else:
+                    self.explicit_stats[stat][mask] += value[mask] if value.ndim else value
+                self.invalidate(stat)
+        self.clamp_resources()
+
+    def gain_exp(self, amount) -> np.ndarray:
+        """
+        Add EXP to every entity and resolve all level-ups.
+        The default quadratic curve is solved in closed form for the whole column; other curves
+        look every entity up in the curve's cumulative EXP table at once.
+        Like Stats.gain_exp, levels come from base stats, not from modifiers.
+        :param amount: EXP to add (a scalar or a length-N array).
+        :return: The number of levels each entity gained.
+        """
+        exp, level = self.explicit_stats["exp"], self.explicit_stats["level"]
+        start_level = level.copy()
+        exp += np.asarray(amount, dtype=np.int64)
+        curve = get_xp_curve()
+        if isinstance(curve, QuadraticCurve) and curve.max_level is None:
+            self.resolve_quadratic(curve)
+        else:
+            self.resolve_table(curve)
+        self.invalidate("exp")
+        self.invalidate("level")
+        self.clamp_resources()
+        return level - start_level
+
+    def resolve_table(self, curve: XPCurve) -> None:
+        """Vectorized XPCurve.resolve: binary search every entity's total EXP in the cumulative table."""
+        exp, level = self.explicit_stats["exp"], self.explicit_stats["level"]
+        if not self.size:
+            return
+        # Grow the curve's table to cover every entity's level and total EXP
+        curve.cumulative_exp(int(level.max()))
+        cumulative = np.asarray(curve.cumulative, dtype=np.int64)
+        total = cumulative[level] + exp
+        curve.level_for_exp(int(total.max()))
+        cumulative = np.asarray(curve.cumulative, dtype=np.int64)
+        new_level = np.maximum(level, np.searchsorted(cumulative, total, side="right") - 1)
+        if curve.max_level is not None:
+            new_level = np.minimum(new_level, np.maximum(level, curve.max_level))
+        level[:] = new_level
+        exp[:] = total - cumulative[new_level]
+
+    def resolve_quadratic(self, curve: QuadraticCurve) -> None:
+        """Vectorized QuadraticCurve.resolve: solve the cubic for every entity at once."""
+        exp, level = self.explicit_stats["exp"], self.explicit_stats["level"]
+
+        def sum_of_squares(n):
+            return n * (n + 1) * (2 * n + 1) // 6
+
+        total = curve.multiplier * sum_of_squares(level - 1) + exp
+        quotient = total // curve.multiplier
+        n = np.rint(np.cbrt(3 * quotient.astype(np.float64))).astype(np.int64)
+        # The float estimate can be off by one either way; correct it exactly in integers
+        while True:
+            low = sum_of_squares(n + 1) <= quotient
+            if not low.any():
+                break
+            n[low] += 1
+        while True:
+            high = (n > 0) & (sum_of_squares(n) > quotient)
+            if not high.any():
+                break
+            n[high] -= 1
+        new_level = np.maximum(level, n + 1)
+        level[:] = new_level
+        exp[:] = total - curve.multiplier * sum_of_squares(new_level - 1)
+
+    def modify_hp(self, amount) -> None:
+        self.modify_resource("hp", amount)
+
+    def modify_mp(self, amount) -> None:
+        self.modify_resource("mp", amount)
+
+    def modify_resource(self, resource: str, amount) -> None:
+        column = self.resources[resource] + np.asarray(amount, dtype=np.int64)
+        self.resources[resource] = np.clip(column, 0, self.derived(RESOURCE_CAPS[resource]))
+
+    def modify_day(self, amount) -> None:
+        self.meta_info["day"] += amount
+
+    # Utility methods
+    def to_dicts(self) -> list[dict]:
+        """Return every entity's stats in the same shape as Stats.to_dict."""
+        sections = {
+            "explicit_stats": self.explicit_stats,
+            "derived_stats": self.derived_stats(),
+            "resources": self.resources,
+        }
+        lists = {key: {stat: column.tolist() for stat, column in section.items()} for key, section in sections.items()}
+        days = self.meta_info["day"].tolist()
+        events = self.meta_info["event"].tolist()
+        return [
+            {
+                **{key: {stat: values[i] for stat, values in section.items()} for key, section in lists.items()},
+                "meta_info": {"day": int(days[i]) if days[i].is_integer() else days[i], "event": events[i]},
+            }
+            for i in range(self.size)
+        ]
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import heapq
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -6,125 +7,252 @@ if TYPE_CHECKING:
     from classes.Player.player import Player
 
 
+STACKING_POLICIES = ("replace_stronger", "refresh", "stack")
+
 class StatusEffect:
-    def __init__(self, name, stat, value, duration):
+    def __init__(self, name, stat, value, duration, kind="add", stacking="replace_stronger", max_stacks=1):
         """
         A status effect that affects stats or deals damage over time.
         
         :param name: Name of the effect (e.g., "Poison", "Blessing").
         :param stat: The stat this effect modifies (e.g., "strength").
         :param value: The magnitude of the effect (positive for buffs, negative for debuffs).
-        :param duration: How many days the effect lasts.
-        :param damage_per_day: Optional, damage dealt daily (e.g., from poison).
+        :param duration: How many days the effect lasts once added (see StatusManager.remaining for the days left).
+                         Effects on "hp" deal their value as damage each day.
+        :param kind: "add" for a flat modifier, "mul" for a fractional one (e.g., 0.2 for +20%).
+        :param stacking: What happens when an effect with the same name is added again:
+                         "replace_stronger" keeps the stronger effect (refreshing the duration otherwise),
+                         "refresh" replaces the effect and resets its duration,
+                         "stack" adds a stack (up to max_stacks) and refreshes the duration.
+        :param max_stacks: The most stacks a "stack" effect can reach.
         """
+        if stacking not in STACKING_POLICIES:
+            raise ValueError(f"Invalid stacking policy: {stacking}")
         self.name: str = name
         self.stat: str = stat
         self.value: int = value
         self.duration: int = duration
+        self.kind: str = kind
+        self.stacking: str = stacking
+        self.max_stacks: int = max_stacks
+        self.stacks: int = 1
+        self.expires_on: int = None  # Set by the StatusManager that holds the effect
 
-    def is_expired(self):
-        """Check if the status effect has expired."""
-        return self.duration <= 0
+    def magnitude(self) -> int | float:
+        """The effect's value across all of its stacks."""
+        return self.value * self.stacks
 
     def apply_effect(self, stats: Stats) -> None:
-        """Apply the effect's stat modification."""
-        if self.stat in stats.explicit_stats:  # Check if the stat exists
-            stats.explicit_stats[self.stat] += self.value
-            stats.recalculate_derived_stats()  # Ensure derived stats are updated
-        else:
+        """Apply the effect's stat modification as a modifier; the base stat is left untouched."""
+        if self.stat not in stats.explicit_stats:  # Check if the stat exists
             print(f"Stat '{self.stat}' not found in explicit stats.")
+            return
+        modifiers = getattr(stats, "modifiers", None)
+        if modifiers is not None:
+            modifiers.add(self.stat, self.magnitude(), self.kind)
+        elif self.kind == "add":
+            # Stats without a modifier layer (e.g., CompactStats) are changed in place
+            stats.explicit_stats[self.stat] += self.magnitude()
+        else:
+            print(f"{self.name}: '{self.kind}' modifiers need a modifier layer.")
+        stats.recalculate_derived_stats()  # Ensure derived stats are updated
 
     def remove_effect(self, stats: Stats) -> None:
         """Remove the effect's stat modification."""
-        if self.stat in stats.explicit_stats:  # Check if the stat exists
-            stats.explicit_stats[self.stat] -= self.value
-            stats.recalculate_derived_stats()  # Ensure derived stats are updated
-        else:
+        if self.stat not in stats.explicit_stats:  # Check if the stat exists
             print(f"Stat '{self.stat}' not found in explicit stats.")
-
-
-    def tick(self)->None:
-        """Reduce duration by one day."""
-        self.duration -= 1
+            return
+        modifiers = getattr(stats, "modifiers", None)
+        if modifiers is not None:
+            modifiers.remove(self.stat, self.magnitude(), self.kind)
+        elif self.kind == "add":
+            stats.explicit_stats[self.stat] -= self.magnitude()
+        stats.recalculate_derived_stats()  # Ensure derived stats are updated
 
 ######################################################################################
 
 class StatusManager:
     def __init__(self):
-        """Manages all active status effects for an entity."""
-        self.effects: list[StatusEffect] = []
+        """
+        Manages all active status effects for an entity.
+        Effects are keyed by name and expire on an absolute day of this manager's clock, tracked in
+        a min-heap, so advancing time only touches the effects that actually expire.
+        """
+        self.effects: dict[str, StatusEffect] = {}
+        self.day: int = 0  # Days elapsed on this manager's clock
+        # (expires_on, sequence, name, effect); entries for replaced or removed effects are skipped when popped
+        self.expiry_heap: list[tuple[int, int, str, StatusEffect]] = []
+        self.sequence: int = 0
+        self.hp_per_day: int = 0  # Summed daily value of every active hp effect (all stacks)
+        self.version: int = 0  # Bumped on every change, so Player snapshots can tell whether to recapture the effects
+
+    def schedule(self, effect: StatusEffect, expires_on: int) -> None:
+        """Set an effect's expiry day and track it in the heap."""
+        effect.expires_on = expires_on
+        self.sequence += 1
+        self.version += 1
+        heapq.heappush(self.expiry_heap, (expires_on, self.sequence, effect.name, effect))
+        if len(self.expiry_heap) > 2 * len(self.effects) + 16:
+            # Drop stale entries so the heap stays proportional to the active effects
+            self.expiry_heap = [entry for entry in self.expiry_heap if self.is_current(entry)]
+            heapq.heapify(self.expiry_heap)
+
+    def is_current(self, entry: tuple[int, int, str, StatusEffect]) -> bool:
+        expires_on, _, name, effect = entry
+        return self.effects.get(name) is effect and effect.expires_on == expires_on
+
+    def attach(self, effect: StatusEffect, stats: Stats) -> None:
+        if effect.stat == 'hp':
+            self.hp_per_day += effect.magnitude()
+        else:
+            effect.apply_effect(stats)
+        self.effects[effect.name] = effect
+        self.schedule(effect, self.day + effect.duration)
+
+    def detach(self, effect: StatusEffect, stats: Stats) -> None:
+        self.version += 1
+        if effect.stat == 'hp':
+            self.hp_per_day -= effect.magnitude()
+        else:
+            effect.remove_effect(stats)
+        del self.effects[effect.name]
+
+    def add_stack(self, effect: StatusEffect, stats: Stats) -> None:
+        self.version += 1
+        if effect.stat == 'hp':
+            self.hp_per_day += effect.value
+            effect.stacks += 1
+        else:
+            # Swap the old total for the new one so the modifier layer holds a single entry per effect
+            effect.remove_effect(stats)
+            effect.stacks += 1
+            effect.apply_effect(stats)
 
     def add_effect(self, effect: StatusEffect, stats: Stats) -> None:
         """Add a new status effect and apply its initial impact."""
-        # Check if an effect with the same name already exists
-        existing_effect = next((e for e in self.effects if e.name == effect.name), None)
-
-        # Handle expired effects
-        if existing_effect and existing_effect.is_expired():
-            existing_effect.remove_effect(stats)
-            self.effects.remove(existing_effect)
-            existing_effect = None  # Clear reference to ensure a clean slate
-
-        if existing_effect:
-            # Compare the new effect's value/damage with the existing one
-            if abs(effect.value) > abs(existing_effect.value) or abs(effect.damage_per_day) > abs(existing_effect.damage_per_day):
-                # Remove the old effect's impact and replace it with the new one
-                existing_effect.remove_effect(stats)
-                effect.apply_effect(stats)
-                self.effects.remove(existing_effect)
-                self.effects.append(effect)
-                print(f"Overwrote {effect.name} with a stronger version ({effect.value}, {effect.damage_per_day}).")
-            else:
-                # Otherwise, refresh the existing effect's duration if longer
-                existing_effect.duration = max(existing_effect.duration, effect.duration)
-                print(f"Refreshed {effect.name} duration to {existing_effect.duration} day(s).")
-        else:
+        existing_effect = self.effects.get(effect.name)
+
+        if existing_effect is None:
             # Add the new effect if none exists
-            if effect.stat != 'hp':
-                effect.apply_effect(stats)
-                
-            self.effects.append(effect)
+            self.attach(effect, stats)
             print(f"Applied {effect.name} for {effect.duration} day(s).")
+        elif effect.stacking == "stack":
+            if existing_effect.stacks < existing_effect.max_stacks:
+                self.add_stack(existing_effect, stats)
+            self.extend(existing_effect, effect.duration)
+            print(f"{effect.name} now has {existing_effect.stacks} stack(s) for {self.remaining(existing_effect)} day(s).")
+        elif effect.stacking == "refresh":
+            self.detach(existing_effect, stats)
+            self.attach(effect, stats)
+            print(f"Refreshed {effect.name} ({effect.value}) for {effect.duration} day(s).")
+        elif abs(effect.magnitude()) > abs(existing_effect.magnitude()):
+            # Remove the old effect's impact and replace it with the stronger one
+            self.detach(existing_effect, stats)
+            self.attach(effect, stats)
+            print(f"Overwrote {effect.name} with a stronger version ({effect.value}).")
+        else:
+            # Otherwise, refresh the existing effect's duration if longer
+            self.extend(existing_effect, effect.duration)
+            print(f"Refreshed {effect.name} duration to {self.remaining(existing_effect)} day(s).")
 
         # Recalculate derived stats after adding the effect
         stats.recalculate_derived_stats()
-    
+
+    def extend(self, effect: StatusEffect, duration: int) -> None:
+        """Push an effect's expiry out to duration days from now, if that is later."""
+        self.version += 1
+        if self.day + duration > effect.expires_on:
+            self.schedule(effect, self.day + duration)
+
+    def remaining(self, effect: StatusEffect | str) -> int:
+        """
+        Days left before an effect expires, read off this manager's clock.
+        :param effect: The effect or its name.
+        :return: The days left, or 0 if the effect is not active.
+        """
+        effect = self.effects.get(effect if isinstance(effect, str) else effect.name)
+        return effect.expires_on - self.day if effect is not None else 0
+
     def remove_effect(self, status_name:str, player:Player):
         """Remove a specific status effect by name."""
-        for effect in self.effects:
-            if effect.name == status_name:
-                effect.remove_effect(player.stats)
-                self.effects.remove(effect)
-                print(f"{effect.name} has been removed.")
-                return
-        print(f"{status_name} not found.")
-        
+        effect = self.effects.get(status_name)
+        if effect is None:
+            print(f"{status_name} not found.")
+            return
+        self.detach(effect, player.stats)
+        print(f"{effect.name} has been removed.")
+
     def update_effects(self, stats: Stats)->None:
-        """Update all effects, removing expired ones and applying damage."""
-        expired_effects = []
+        """Advance one day: apply daily damage and remove expired effects."""
+        self.advance_days(stats, 1)
 
-        for effect in self.effects:
-            # Apply daily damage, if any
-            if effect.stat == 'hp' and abs(effect.value) > 0:
-                stats.modify_hp(effect.value)
-                print(f"{effect.name} dealt {effect.value} damage.")
+    def advance_days(self, stats: Stats, days: int) -> None:
+        """
+        Advance several days at once. Only effects expiring within the window are visited, and
+        daily hp damage is summed per interval between expiries instead of day by day.
+        :param stats: The stats the effects apply to.
+        :param days: Number of days to advance.
+        """
+        self.version += 1
+        end = self.day + days
+        cursor = self.day
+        total_hp = 0
+        expired_effects = []
 
-            # Reduce duration
-            effect.tick()
+        while self.expiry_heap and self.expiry_heap[0][0] <= end:
+            entry = heapq.heappop(self.expiry_heap)
+            if not self.is_current(entry):
+                continue
+            expires_on, _, _, effect = entry
+            total_hp += self.hp_per_day * (expires_on - cursor)
+            cursor = expires_on
+            if effect.stat == 'hp':
+                self.hp_per_day -= effect.magnitude()
+            expired_effects.append(effect)
+        total_hp += self.hp_per_day * (end - cursor)
+        self.day = end
 
-            # Check for expiration
-            if effect.is_expired():
-                expired_effects.append(effect)
+        # Apply daily damage, if any
+        if total_hp:
+            stats.modify_hp(total_hp)
+            print(f"Status effects dealt {-total_hp} damage over {days} day(s).")
 
         # Remove expired effects
         for effect in expired_effects:
-            effect.remove_effect(stats)
-            self.effects.remove(effect)
+            if effect.stat != 'hp':
+                effect.remove_effect(stats)
+            del self.effects[effect.name]
             print(f"{effect.name} has expired.")
-            
+
         # Recalculate derived stats after updating effects
         stats.recalculate_derived_stats()
 
     def has_effect(self, effect_name:str)->bool:
         """Check if a specific effect is currently active."""
-        return any(effect.name == effect_name for effect in self.effects)
+        return effect_name in self.effects
+
+    # Snapshots (see Player.snapshot)
+    def snapshot_state(self) -> tuple:
+        """The clock and every active effect as an immutable value."""
+        return self.day, self.sequence, self.hp_per_day, tuple(
+            (effect.name, effect.stat, effect.value, effect.duration, effect.kind, effect.stacking,
+             effect.max_stacks, effect.stacks, effect.expires_on)
+            for effect in self.effects.values()
+        )
+
+    def restore_state(self, state: tuple) -> None:
+        """
+        Put back effects from snapshot_state. Their stat modifiers are part of the stats'
+        own snapshot, so they are not applied again here.
+        """
+        self.day, self.sequence, self.hp_per_day, effects = state
+        self.effects = {}
+        self.expiry_heap = []
+        for name, stat, value, duration, kind, stacking, max_stacks, stacks, expires_on in effects:
+            effect = StatusEffect(name, stat, value, duration, kind, stacking, max_stacks)
+            effect.stacks = stacks
+            effect.expires_on = expires_on
+            self.effects[name] = effect
+            self.expiry_heap.append((expires_on, len(self.expiry_heap), name, effect))
+        heapq.heapify(self.expiry_heap)
+        self.version += 1
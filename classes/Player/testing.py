@@ -1,26 +1,41 @@
 from __future__ import annotations
+import asyncio
 import copy
+import itertools
 import json
 import os
+import random
 from typing import TYPE_CHECKING
+from classes.Player.compact_stats import CompactStats
+from classes.Player.definition_cache import DefinitionCache
+from classes.Player.derived_stats import register_derived_stat, unregister_derived_stat
+from classes.Player.experience import QuadraticCurve, TableCurve, set_xp_curve
+from classes.Player.item_registry import ItemRegistry
+from classes.Player.loadout_optimizer import stat_coefficients
+from classes.Player.player import Player
+from classes.Player.save_codec import decode_save
+from classes.Player.save_journal import SaveJournal
 from classes.Player.save_manager import SaveManager
+from classes.Player.save_store import SaveStore
+from classes.Player.save_service import AsyncSaveService, SaveMetrics
+from classes.Player.stats import Stats
+from classes.Player import stats_batch
 from classes.Player.status_effects import StatusEffect, StatusManager
-from classes.Player.items import Consumable, Equipment, Item
+from classes.Player.items import Consumable, Equipment, Item, PlotItem
 if TYPE_CHECKING:
     from classes.Player.equipment_manager import EquipmentManager
     from classes.Player.inventory import Inventory
-    from classes.Player.player import Player
-    from classes.Player.stats import Stats
 
 
 
 class TestManager:
     """A class that manages testing for the player."""
     def __init__(self, player:Player):
-        self.test_player = copy.deepcopy(player)
-        self.test_player2 = copy.deepcopy(player)
-        self.test_player3 = copy.deepcopy(player)
-        self.test_player35 = copy.deepcopy(player)
+        self.test_player = player.fork()
+        self.test_player2 = player.fork()
+        self.test_player3 = player.fork()
+        self.test_player35 = player.fork()
+        self.test_player4 = player.fork()
         
     def test(self):
         """Run tests for the Player class and its related systems."""
@@ -128,7 +143,8 @@ class TestManager:
         assert self.test_player2.stats.status_manager.has_effect("blessing"), "Failed to apply blessing status."
         self.test_player2.stats.status_manager.update_effects(self.test_player2.stats)
         assert self.test_player2.stats.resources["hp"] == max(0, self.test_player2.stats.derived_stats["max_hp"] - 5), "Poison damage failed."
-        assert self.test_player2.stats.explicit_stats['strength'] == 18, "blessing stat boost failed."
+        assert self.test_player2.stats.effective_stats['strength'] == 18, "blessing stat boost failed."
+        assert self.test_player2.stats.explicit_stats['strength'] == 15, "blessing should not change base strength."
         self.test_player2.stats.status_manager.update_effects(self.test_player2.stats)
         assert not self.test_player2.stats.status_manager.has_effect("blessing"), "blessing did not expire."
         print("Status effects passed.")
@@ -155,8 +171,104 @@ class TestManager:
         except Exception as e:
             print(f"Expected failure when equipping Heavy Armor: {e}")
         assert not self.test_player2.equipment_manager.is_equipped("Heavy Armor"), "Equipped Heavy Armor despite failing requirements."
+        equipment = self.test_player2.equipment_manager
+        stats = self.test_player2.stats
+        assert equipment.stat_bonuses == {"strength": 5}, f"Equipment bonuses out of sync. ({equipment.stat_bonuses})"
+        equipment.unequip("weapon")
+        assert stats.explicit_stats["strength"] == 15, f"Failed to remove sword stats. (current = {stats.explicit_stats['strength']})"
+        assert not equipment.stat_bonuses and self.test_player2.inventory.check_item("Steel Sword"), "Unequip failed."
+        # Heavy Armor's stamina requirement is met through the shield in the same loadout
+        stats.modify_stats([{"stamina": 3}])
+        equipped = equipment.equip_loadout([save_manager.create_item(9), heavy_armor])
+        assert set(equipped) == {"weapon", "armor"}, f"Loadout not equipped. ({equipped})"
+        assert stats.explicit_stats["stamina"] == 25 and equipment.stat_bonuses == {"stamina": 15}, "Loadout stats not applied correctly."
+        assert equipment.equip_loadout([save_manager.create_item(8)]) == {"armor": equipment.equipped_items["armor"]}
+        assert stats.explicit_stats["stamina"] == 20, "Loadout swap stats not applied correctly."
+        equipment.unequip("weapon")
+        assert not equipment.equip_loadout([save_manager.create_item(10)]), "Loadout item relied on its own bonus."
+        equipment.unequip("armor")
+        stats.modify_stats([{"stamina": -3}])
+        assert stats.explicit_stats["stamina"] == 7 and not equipment.stat_bonuses, "Unequipping the loadout failed."
         print("Equipment tests passed.")
 
+        print("\n--- Testing Best-in-slot ---")
+        # Neither the shield nor the iron armor is usable alone at 7 stamina, but each enables the other
+        plan = equipment.best_loadout({"max_hp": 1})
+        assert plan["equipped"]["weapon"].name == "Iron Shield" and plan["equipped"]["armor"].name == "Iron Armor", f"Wrong loadout. ({plan['equipped']})"
+        assert plan["score"] == 100 and plan["stats"]["stamina"] == 17, f"Wrong loadout score. ({plan['score']})"
+        assert equipment.best_loadout({"damage": 1})["equipped"]["weapon"].name == "Steel Sword", "Wrong weapon for damage."
+        rings = ItemRegistry({
+            "900": {"name": "Ruby Ring", "type": "Equipment", "slot": "ring", "stats": [{"stamina": 2}], "required_stats": []},
+            "901": {"name": "Jade Ring", "type": "Equipment", "slot": "ring", "stats": [{"stamina": 1}, {"strength": 1}], "required_stats": []},
+        })
+        self.test_player2.inventory.add_item(rings.create_item(900))
+        self.test_player2.inventory.add_item(rings.create_item(901))
+        plan = equipment.auto_equip({"max_hp": 1})
+        assert {plan["equipped"]["ring1"].name, plan["equipped"]["ring2"].name} == {"Ruby Ring", "Jade Ring"}, "Rings not chosen for both ring slots."
+        # With the rings' stamina, Heavy Armor becomes wearable and beats the Iron Armor
+        assert equipment.is_equipped("Heavy Armor", "armor") and equipment.is_equipped("Iron Shield", "weapon"), "Auto-equip failed."
+        assert stats.explicit_stats["stamina"] == 25 and plan["score"] == 180, f"Auto-equip stats wrong. ({stats.explicit_stats['stamina']})"
+        # Gear the objective does not care about stays on
+        iron_armor = self.test_player2.inventory.get_stacks("Iron Armor")[0]
+        self.test_player2.inventory.remove_item("Iron Armor")
+        # Without the shield's stamina Heavy Armor cannot be planned, but the sword is strictly better for damage
+        plan = equipment.auto_equip({"damage": 1})
+        assert plan["equipped"]["armor"] is None and equipment.is_equipped("Heavy Armor", "armor"), "Auto-equip dropped gear the plan did not replace."
+        assert equipment.is_equipped("Steel Sword", "weapon") and self.test_player2.inventory.count_item("Iron Shield") == 1, "Auto-equip did not swap in the sword."
+        assert equipment.stat_bonuses == {"stamina": 13, "strength": 6}, f"Auto-equip bonuses wrong. ({equipment.stat_bonuses})"
+        self.test_player2.inventory.add_item(iron_armor)
+        for slot in ("weapon", "armor", "ring1", "ring2"):
+            equipment.unequip(slot)
+        assert stats.explicit_stats["stamina"] == 7 and not equipment.stat_bonuses, "Unequipping the best loadout failed."
+        # Worn rings move between slots instead of being equipped twice
+        inventory = self.test_player2.inventory
+        ruby, jade = inventory.get_stacks("Ruby Ring")[0], inventory.get_stacks("Jade Ring")[0]
+        strength = stats.explicit_stats["strength"]
+        equipment.equip_loadout({"ring2": jade})
+        assert equipment.equip_loadout([jade]) == {"ring2": jade} and equipment.equipped_items["ring1"] is None, "A worn ring should stay in its slot."
+        equipment.equip_loadout({"ring1": jade})
+        assert equipment.equipped_items["ring1"] is jade and equipment.equipped_items["ring2"] is None, "A worn ring should move to the new slot."
+        assert stats.explicit_stats["strength"] == strength + 1 and equipment.stat_bonuses == {"stamina": 1, "strength": 1}, "Moving a ring changed its bonus."
+        equipment.equip_loadout({"ring2": ruby})
+        equipment.equip_loadout({"ring1": ruby, "ring2": jade})
+        assert equipment.equipped_items["ring1"] is ruby and equipment.equipped_items["ring2"] is jade, "Rings should swap slots."
+        assert not inventory.count_item("Ruby Ring") and not inventory.count_item("Jade Ring"), "Swapped rings should not go back to the inventory."
+        assert equipment.stat_bonuses == {"stamina": 3, "strength": 1} and stats.explicit_stats["strength"] == strength + 1, "Swapping rings changed their bonuses."
+        equipment.unequip("ring1")
+        equipment.unequip("ring2")
+        assert stats.explicit_stats["strength"] == strength and not equipment.stat_bonuses, "Unequipping the rings failed."
+
+        # The search agrees with trying every combination
+        rng = random.Random(7)
+        gear = ItemRegistry({
+            str(ref): {
+                "name": f"Gear {ref}", "type": "Equipment", "slot": rng.choice(["weapon", "armor", "ring"]),
+                "stats": [{stat: rng.randint(-2, 6)} for stat in rng.sample(["strength", "stamina", "agility"], 2)],
+                "required_stats": [{rng.choice(["strength", "stamina", "agility"]): rng.randint(5, 22)}],
+            }
+            for ref in range(1000, 1014)
+        })
+        pieces = gear.create_items(range(1000, 1014))
+        weights = {"damage": 1, "max_hp": 0.5, "ac": 2}
+        plan = equipment.best_loadout(weights, pieces)
+        base = dict(stats.effective_stats)
+        coefficients = stat_coefficients(weights, base)
+        def options(slot, size):
+            fitting = [piece for piece in pieces if piece.slot == slot]
+            return [list(combination) for n in range(size + 1) for combination in itertools.combinations(fitting, n)]
+        best = 0
+        for combination in itertools.product(options("weapon", 1), options("armor", 1), options("ring", 2)):
+            chosen = [piece for part in combination for piece in part]
+            totals = dict(base)
+            for piece in chosen:
+                for stat, value in piece.bonuses.items():
+                    totals[stat] += value
+            without = lambda piece: {stat: totals[stat] - piece.bonuses.get(stat, 0) for stat in totals}
+            if all(piece.unmet_requirement(without(piece)) is None for piece in chosen):
+                best = max(best, sum(coefficients.get(stat, 0) * value for piece in chosen for stat, value in piece.bonuses.items()))
+        assert abs(plan["score"] - best) < 1e-9, f"Optimizer missed the best loadout. ({plan['score']} vs {best})"
+        print("Best-in-slot tests passed.")
+
         print("\n--- Testing Inventory ---")
         stackable_item = save_manager.create_item(2)  # Mana Potion
         self.test_player2.inventory.add_item(stackable_item, count=98)  # Add near max
@@ -165,8 +277,47 @@ class TestManager:
         self.test_player2.inventory.remove_item("Mana Potion", count=50)  # Partial stack removal
         remaining_count = sum(item.count for item in self.test_player2.inventory.items if item.name == "Mana Potion")
         assert remaining_count == 53, f"Expected 53 Mana Potions, found {remaining_count}."
+        inventory = self.test_player2.inventory
+        assert inventory.count_item("Mana Potion") == inventory.count_item(2) == 53, "Inventory totals out of sync."
+        assert inventory.check_item("Mana Potion", 53) and not inventory.check_item("Mana Potion", 54), "Quantity check failed."
+        assert inventory.has_item_type(Consumable), "Type check failed."
+        mana_stacks = inventory.get_stacks("Mana Potion")
+        assert all(stack.definition is stackable_item.definition for stack in mana_stacks), "Stacks should share one item definition."
+        loot = save_manager.create_items([2, 5, 3])
+        assert [item.name for item in loot] == ["Mana Potion", "Ancient Amulet", "Steel Sword"], "Bulk item creation failed."
+        assert loot[0].definition is stackable_item.definition, "Registry should reuse item definitions."
+        assert isinstance(loot[1], PlotItem), "Plot items should be created from the plot item data."
+        inventory.swap_items(0, len(inventory.items) - 1)
+        assert inventory.count_item("Mana Potion") == 53, "Swapping slots changed item totals."
+        inventory.add_item(loot[0], 99)
+        others = [item for item in inventory.items if item.name != "Mana Potion"]
+        inventory.remove_item("Mana Potion", 152)  # Both stacks go in one pass over the slots
+        assert inventory.items == others and inventory.count_item(2) == 0, "Removing several stacks failed."
+        assert 2 not in inventory.ref_names and "Mana Potion" not in inventory.stacks, "Removed items should leave the indexes."
+        swords = inventory.count_item("Steel Sword")
+        inventory.add_item(loot[2], 3)  # One Steel Sword instance in three slots
+        inventory.remove_item("Steel Sword", 2)
+        assert inventory.count_item("Steel Sword") == swords + 1 and len(inventory.items) == len(others) + 1, "Removing copies of one item took every slot."
+        assert len(inventory.get_stacks("Steel Sword")) == swords + 1, "Slots and stack index disagree."
+        inventory.remove_item("Steel Sword")
+        assert len(inventory.items) == len(others) and inventory.count_item("Steel Sword") == swords, "Removing the last copy failed."
         print("Inventory tests passed.")
 
+        print("\n--- Testing Flags ---")
+        flags = self.test_player2.flags
+        flags.set_many(["met_king", "found_map", "opened_gate"])
+        flags.set_flag("gold", 7)
+        flags.set_flag("trusted_thief", False)
+        assert flags.check_flag("gold") == 7 and flags.check_flag("met_king") is True
+        assert flags.check_flag("trusted_thief") is False and flags.has_flag("trusted_thief")
+        assert flags.has_all(["met_king", "gold"]) and not flags.has_all(["met_king", "trusted_thief"])
+        assert flags.has_any(["never_set", "found_map"]) and not flags.has_any(["never_set"])
+        flags.clear_many(["found_map", "gold", "never_set"])
+        assert flags.list_flags() == {"met_king": True, "opened_gate": True, "trusted_thief": False}, f"Unexpected flags: {flags.list_flags()}"
+        assert flags.filter_flags(True) == {"met_king": True, "opened_gate": True} and len(flags) == 3
+        assert copy.deepcopy(flags).list_flags() == flags.list_flags()
+        print("Flag tests passed.")
+
         print("\n--- Testing SpellManager ---")
         self.test_player2.stats.resources["mp"] = 29 # Set mana to 29 for testing
         # Add a new spell
@@ -213,11 +364,243 @@ class TestManager:
         assert len(spell_list) == 2, "Spell list should contain exactly 2 spells."
         print("Spell list is accurate:", spell_list)
 
+        # Learn from the catalog, by name and by ref
+        spell_manager = self.test_player2.spell_manager
+        spell_manager.add_spell("Heal")
+        spell_manager.add_spell(3, rank=2)
+        assert spell_manager.get_spell(3)["mana_cost"] == 20, "Failed to upgrade Heal from the catalog."
+        spell_manager.add_spell("Unknown Spell")
+        assert not spell_manager.has_spell("Unknown Spell")
+
+        # Batch validation
+        self.test_player2.stats.resources["mp"] = 35
+        assert spell_manager.castable_spells() == ["Fireball", "Lightning Bolt", "Heal"]
+        checks = spell_manager.validate_casts(["Heal", "Fireball", "Meteor"], cumulative=True)
+        assert checks["Heal"] is None and checks["Fireball"] is not None and checks["Meteor"] == "not known", f"Unexpected validation: {checks}"
+
+        # Spell effects run through the effect handlers
+        self.test_player2.stats.resources["hp"] = 10
+        spell_manager.use_spell("Heal", self.test_player2)
+        assert self.test_player2.stats.resources["hp"] == 70, "Heal effect not applied."
+        assert self.test_player2.stats.resources["mp"] == 15, "Mana not reduced correctly after casting Heal."
+
         print("\nAll tests passed for SpellManager!")
 
+        print("\n--- Testing Snapshots ---")
+        player = self.test_player2
+        stats = player.stats
+        before = player.snapshot()
+        assert all(player.snapshot().parts[name] is part for name, part in before.parts.items()), "Unchanged state should be shared between snapshots."
+        stats.modify_hp(-5)
+        player.flags.set_flag("snapshot_test")
+        changed = player.snapshot()
+        assert changed.parts["inventory"] is before.parts["inventory"] and changed.parts["stats"] is not before.parts["stats"], "Only changed parts should be captured."
+
+        # Undo and redo through several changes
+        potions = player.inventory.count_item("Health Potion")
+        strength, agility = stats.explicit_stats["strength"], stats.effective_stats["agility"]
+        history = [player.snapshot()]
+        player.inventory.add_item(save_manager.create_item(1), count=2)
+        history.append(player.snapshot())
+        player.equipment_manager.equip(save_manager.create_item(3))
+        stats.status_manager.add_effect(StatusEffect(name="haste", stat="agility", value=4, duration=3), stats)
+        history.append(player.snapshot())
+        player.restore(history[1])
+        assert not player.equipment_manager.is_equipped("Steel Sword") and stats.explicit_stats["strength"] == strength, "Undo did not remove the sword."
+        assert not stats.status_manager.has_effect("haste") and stats.effective_stats["agility"] == agility, "Undo did not remove haste."
+        assert player.inventory.count_item("Health Potion") == potions + 2, "Undo went too far back."
+        player.restore(history[0])
+        assert player.inventory.count_item("Health Potion") == potions, "Undo did not remove the potions."
+        player.restore(history[2])
+        assert player.equipment_manager.is_equipped("Steel Sword") and stats.explicit_stats["strength"] == strength + 5, "Redo failed."
+        assert stats.effective_stats["agility"] == agility + 4 and stats.derived_stats["hit"] == stats.calculate_hit(), "Redo did not refresh effective stats."
+        stats.status_manager.update_effects(stats)
+        stats.status_manager.advance_days(stats, 2)
+        assert not stats.status_manager.has_effect("haste") and stats.effective_stats["agility"] == agility, "Restored effects should still expire."
+
+        # Forks are independent players
+        fork = player.fork()
+        fork.stats.modify_stats([{"strength": 3}])
+        fork.flags.set_flag("forked")
+        fork.inventory.remove_item("Health Potion", count=2)
+        fork.equipment_manager.unequip("weapon")
+        assert stats.explicit_stats["strength"] == strength + 5 and not player.flags.check_flag("forked"), "Fork changed the original player."
+        assert player.inventory.count_item("Health Potion") == potions + 2 and player.equipment_manager.is_equipped("Steel Sword"), "Fork shared the inventory."
+        assert fork.equipment_manager.player is fork and fork.stats.explicit_stats["strength"] == strength + 3, "Fork not wired to itself."
+        player.restore(before)
+        assert player.flags.check_flag("snapshot_test") is False and stats.explicit_stats["strength"] == strength, "Restore failed."
+        print("Snapshot tests passed.")
+
 
         print("\n--- All tests passed! ---")
 
+    def stats_test(self):
+        """Test lazy derived stat recalculation."""
+        print("\n--- Testing Derived Stats ---")
+        stats = Stats()
+        assert stats.derived_stats["max_hp"] == 105, "max_hp formula failed."
+        assert stats.derived_stats["damage"] == 32, "damage formula failed."
+
+        # Only stats that read the changed stat are invalidated
+        dict(stats.derived_stats)
+        stats.explicit_stats["strength"] += 2
+        assert "damage" not in stats.derived_cache and "max_hp" in stats.derived_cache, "Wrong derived stats invalidated."
+        assert stats.derived_stats["damage"] == 38, "damage not recomputed after a strength change."
+
+        # Lowering a cap clamps the matching resource
+        stats.modify_stats([{"stamina": -5}])
+        assert stats.resources["hp"] == 55, f"HP not clamped to the new max. (current = {stats.resources['hp']})"
+
+        register_derived_stat("crit", "agility // 4 + level")
+        try:
+            assert stats.get("crit") == 3, "Data-driven formula failed."
+            stats.explicit_stats["agility"] = 20
+            assert stats.derived_stats["crit"] == 6, "Data-driven formula not recomputed."
+            # Replacing a formula applies to cached values straight away
+            register_derived_stat("crit", "agility // 2")
+            assert stats.derived_stats["crit"] == 10, "Cached derived stats should follow a replaced formula."
+        finally:
+            unregister_derived_stat("crit")
+        for formula in ("().__class__.__bases__", "__import__('os')", "level.real", "[level][0]", "'a' * level", "max(level, key=abs)", "__builtins__",
+                        "9 ** 9 ** 9", "level ** level", "level ** 5", "level ** -1", "level ** 2.5"):
+            try:
+                register_derived_stat("crit", formula)
+                assert False, f"Formula should be rejected: {formula}"
+            except ValueError:
+                pass
+        assert "crit" not in stats.derived_stats, "Rejected formulas should not be registered."
+        register_derived_stat("crit", "level ** 4 + agility ** 0")
+        try:
+            assert stats.derived_stats["crit"] == 2, "Small constant powers should be allowed."
+        finally:
+            unregister_derived_stat("crit")
+        print("Derived stats passed.")
+
+        print("\n--- Testing Experience ---")
+        stats = Stats()
+        events = []
+        stats.level_up_listeners.append(events.append)
+        event = stats.gain_exp(50 + 200 + 450 + 10)  # Levels 1 -> 4 with 10 EXP to spare
+        assert event == {"old_level": 1, "new_level": 4, "levels": [2, 3, 4], "exp": 10}, f"Unexpected level-up event: {event}"
+        assert events == [event], "Level-up listeners should be notified once."
+        assert stats.derived_stats["exp_to_next_level"] == 800, "exp_to_next_level not updated after leveling."
+        assert stats.gain_exp(5) is None and stats.explicit_stats["exp"] == 15, "EXP without a level-up failed."
+        print("Experience passed.")
+
+        print("\n--- Testing Multi-Day Status Effects ---")
+        day_by_day, skipped = Stats(), Stats()
+        for stats in (day_by_day, skipped):
+            stats.status_manager.add_effect(StatusEffect(name="poison", stat="hp", value=-5, duration=3), stats)
+            stats.status_manager.add_effect(StatusEffect(name="bleed", stat="hp", value=-2, duration=6), stats)
+            stats.status_manager.add_effect(StatusEffect(name="blessing", stat="strength", value=3, duration=4), stats)
+        for _ in range(10):
+            day_by_day.status_manager.update_effects(day_by_day)
+        skipped.status_manager.advance_days(skipped, 10)
+        assert skipped.resources["hp"] == day_by_day.resources["hp"] == 105 - 15 - 12, f"Multi-day damage failed. (current = {skipped.resources['hp']})"
+        assert skipped.explicit_stats["strength"] == 10 and not skipped.status_manager.effects, "Effects did not expire."
+        stats = Stats()
+        bleed = StatusEffect(name="bleed", stat="hp", value=-2, duration=6)
+        stats.status_manager.add_effect(bleed, stats)
+        stats.status_manager.advance_days(stats, 2)
+        assert stats.status_manager.remaining("bleed") == 4 and bleed.duration == 6, "Days left should follow the clock."
+        stats.status_manager.add_effect(StatusEffect(name="bleed", stat="hp", value=-2, duration=3), stats)
+        assert stats.status_manager.remaining(bleed) == 4, "A shorter refresh should keep the later expiry."
+        stats.status_manager.add_effect(StatusEffect(name="bleed", stat="hp", value=-2, duration=6), stats)
+        stats.status_manager.advance_days(stats, 1)
+        assert stats.status_manager.remaining(bleed) == 5, "A longer refresh should push the expiry out."
+        stats.status_manager.advance_days(stats, 5)
+        assert stats.status_manager.remaining(bleed) == 0, "Expired effects have no days left."
+        print("Multi-day status effects passed.")
+
+        print("\n--- Testing Status Effect Stacking ---")
+        stats = Stats()
+        rage = lambda: StatusEffect(name="rage", stat="strength", value=2, duration=3, stacking="stack", max_stacks=3)
+        for _ in range(5):
+            stats.status_manager.add_effect(rage(), stats)
+        assert stats.effective_stats["strength"] == 16 and stats.explicit_stats["strength"] == 10, "Stacks should cap at 3."
+        stats.status_manager.add_effect(StatusEffect(name="might", stat="strength", value=0.5, duration=2, kind="mul"), stats)
+        assert stats.effective_stats["strength"] == 24, f"Multiplicative modifier failed. (current = {stats.effective_stats['strength']})"
+        assert stats.derived_stats["damage"] == 24 * 3 + 2, "Derived stats should read effective stats."
+        stats.status_manager.add_effect(StatusEffect(name="might", stat="strength", value=0.1, duration=5, kind="mul", stacking="refresh"), stats)
+        assert stats.effective_stats["strength"] == 18, "Refresh should replace the effect."
+        stats.explicit_stats["strength"] += 4  # Base changes keep modifiers applied on top
+        assert stats.effective_stats["strength"] == 22, "Base and modifiers should combine."
+        stats.status_manager.advance_days(stats, 5)
+        assert stats.effective_stats["strength"] == 14 and not stats.modifiers.counts, "Modifiers should clear when effects expire."
+        print("Status effect stacking passed.")
+
+        print("\n--- Testing Compact Stats ---")
+        stats, compact = Stats(), CompactStats()
+        for entity in (stats, compact):
+            entity.modify_stats([{"strength": 5}, {"stamina": -3}])
+            entity.gain_exp(400)
+            entity.modify_hp(-20)
+            entity.status_manager.add_effect(StatusEffect(name="blessing", stat="agility", value=3, duration=2), entity)
+        # CompactStats has no modifier layer, so compare effective values rather than base stats
+        assert dict(compact.effective_stats) == stats.effective_stats, f"CompactStats diverged from Stats: {compact.to_dict()}"
+        assert dict(compact.derived_stats) == dict(stats.derived_stats) and dict(compact.resources) == stats.resources, "CompactStats diverged from Stats."
+        assert compact.get("exp") == stats.get("exp") == 150, "get() failed for a stat."
+        stats, compact = Stats(), CompactStats()
+        stats.modify_stats([{"willpower": 4}])
+        stats.gain_exp(75)
+        compact.load_from_dict(stats.to_dict())
+        assert compact.to_dict() == stats.to_dict(), "CompactStats load_from_dict failed."
+        compact.meta_info["day"] = 9
+        compact.meta_info["event"] += 2
+        assert compact.get("day") == 9 and compact.meta_info == {"day": 9, "event": 3}, "meta_info writes should stick."
+        register_derived_stat("crit", "agility // 4 + level")
+        try:
+            assert compact.to_dict()["derived_stats"] == dict(stats.derived_stats) and compact.get("crit") == 4, "CompactStats should pick up new derived stats."
+            assert CompactStats().get("crit") == 3, "New CompactStats should use the current layout."
+            # Formulas that give a non-integer are kept as they are, like in Stats
+            register_derived_stat("crit", "agility / 4")
+            assert compact.to_dict()["derived_stats"]["crit"] == 2.5 == stats.derived_stats["crit"], "CompactStats should keep fractional derived stats."
+            compact.modify_stats([{"agility": 2}])
+            assert compact.get("crit") == 3 and isinstance(compact.get("crit"), float), "Fractional derived stats should be recomputed."
+            register_derived_stat("crit", "agility // 4")
+            assert compact.get("crit") == 3 and isinstance(compact.get("crit"), int), "Integer results should go back to the value array."
+            compact.modify_stats([{"agility": -2}])
+        finally:
+            unregister_derived_stat("crit")
+        assert "crit" not in compact.derived_stats and compact.to_dict()["explicit_stats"] == stats.to_dict()["explicit_stats"], "Removed derived stats should drop out."
+        print("Compact stats passed.")
+
+        print("\n--- Testing Stats Batch ---")
+        if stats_batch.np is None:
+            print("numpy is not installed; skipping StatsBatch tests.")
+        else:
+            for curve in (QuadraticCurve(), TableCurve([50, 150, 300, 600])):
+                set_xp_curve(curve)
+                population = [Stats() for _ in range(3)]
+                population[1].status_manager.add_effect(StatusEffect(name="fortitude", stat="stamina", value=6, duration=3), population[1])
+                population[2].status_manager.add_effect(StatusEffect(name="might", stat="strength", value=0.25, duration=3, kind="mul"), population[2])
+                batch = stats_batch.StatsBatch.from_stats(population)
+                assert batch.derived("max_hp").tolist() == [stats.derived_stats["max_hp"] for stats in population], "StatsBatch should read modifiers."
+                amounts = [0, 120, 4000]
+                for stats, amount in zip(population, amounts):
+                    stats.gain_exp(amount)
+                    stats.modify_stats([{"stamina": 2}, {"strength": -1}])
+                    stats.modify_hp(-30)
+                batch.gain_exp(amounts)
+                batch.modify_stats([{"stamina": 2}, {"strength": -1}])
+                batch.modify_hp(-30)
+                assert batch.to_dicts() == [stats.to_dict() for stats in population], f"StatsBatch diverged from Stats with {type(curve).__name__}: {batch.to_dicts()}"
+            set_xp_curve(QuadraticCurve())
+            # Formula functions with more than two arguments, or round's ndigits
+            register_derived_stat("peak", "max(strength, agility, stamina) - min(strength, agility, stamina, willpower)")
+            register_derived_stat("poise", "round(agility / 3 + 0.04, 1)")
+            try:
+                population = [Stats() for _ in range(3)]
+                for stats, gain in zip(population, (0, 3, 7)):
+                    stats.modify_stats([{"agility": gain}, {"stamina": -gain}])
+                batch = stats_batch.StatsBatch.from_stats(population)
+                for name in ("peak", "poise"):
+                    assert batch.derived(name).tolist() == [stats.derived_stats[name] for stats in population], f"StatsBatch {name} diverged from Stats."
+            finally:
+                unregister_derived_stat("peak")
+                unregister_derived_stat("poise")
+            print("Stats batch passed.")
+
     def save_test1(self):
         """Test the SaveManager functionality."""     
         # File paths
@@ -285,7 +668,8 @@ class TestManager:
         save_manager.load_game(player)
 
         # Verify loaded player state
-        assert player.stats.explicit_stats["strength"] == 15, f"Failed to load strength stat. (current = {player.stats.explicit_stats['strength']})"
+        # Saved stats already include the sword's bonus
+        assert player.stats.explicit_stats["strength"] == 10, f"Failed to load strength stat. (current = {player.stats.explicit_stats['strength']})"
         assert player.stats.meta_info["day"] == 5
         assert player.stats.resources["hp"] == 52
         assert player.flags.check_flag("defeated_dragon") is True
@@ -293,8 +677,142 @@ class TestManager:
         assert player.inventory.items[0].name == "Health Potion"
         assert player.inventory.items[0].count == 5
         assert player.equipment_manager.is_equipped("Steel Sword")
+        # Saving and loading again must not apply the sword's bonus a second time
+        save_manager.save_file = test_save_file
+        for _ in range(2):
+            save_manager.load_game(player)
+            assert player.stats.explicit_stats["strength"] == 20, f"JSON load changed strength. (current = {player.stats.explicit_stats['strength']})"
+            assert player.equipment_manager.stat_bonuses == {"strength": 5}
+            save_manager.save_game(player)
         print("Load test passed.")
 
+        # Test the binary format
+        print("\n--- Testing Binary Save ---")
+        binary_save_file = os.path.join(save_dir, "test_save.sav")
+        binary_manager = SaveManager(
+            player=self.test_player3,
+            save_file=binary_save_file,
+            consumables_file=consumables_file,
+            equipment_file=equipment_file,
+            plotitems_file=plotitems_file,
+            save_format="binary",
+        )
+        binary_manager.save_game(self.test_player3)
+        assert os.path.getsize(binary_save_file) < os.path.getsize(test_save_file), "Binary save should be smaller than JSON."
+        player = self.test_player4
+        binary_manager.load_game(player)
+        # Equipment is restored as saved, without applying the sword's bonus a second time
+        assert player.stats.explicit_stats["strength"] == 20, f"Binary load changed strength. (current = {player.stats.explicit_stats['strength']})"
+        assert player.equipment_manager.is_equipped("Steel Sword", "weapon")
+        assert player.inventory.count_item("Health Potion") == 3
+        assert dict(player.stats.derived_stats) == dict(self.test_player3.stats.derived_stats)
+        with open(binary_save_file, "rb") as f:
+            blob = bytearray(f.read())
+        blob[-1] ^= 0xFF
+        try:
+            decode_save(bytes(blob))
+            assert False, "Corrupted binary save should be rejected."
+        except ValueError:
+            pass
+        print("Binary save test passed.")
+
+        # Test journaled saves
+        print("\n--- Testing Journaled Save ---")
+        journal = SaveJournal(binary_manager, compact_every=3, fsync_every=2)
+        player = self.test_player4
+        journal.commit(player)  # First commit writes the snapshot
+        player.flags.set_flag("met_king")
+        player.stats.modify_hp(-10)
+        assert journal.commit(player), "Changes should produce a journal record."
+        assert not journal.commit(player), "Nothing changed, so nothing should be written."
+        player.inventory.add_item(binary_manager.create_item(2), count=4)
+        player.flags.clear_flag("defeated_dragon")
+        journal.commit(player)
+        player.stats.modify_stats([{"agility": 3}])
+        player.stats.modify_day(2)
+        journal.commit(player)  # Third record: compacts into a new snapshot
+        player.stats.modify_mp(-7)
+        journal.commit(player)
+        journal.close()
+        with open(journal.journal_file, "a") as f:
+            f.write('{"stats":{"resources":{"hp":1')  # Torn write from a crash
+
+        restored = Player()
+        assert journal.load(restored), "Journal failed to load."
+        assert restored.stats.to_dict() == player.stats.to_dict(), "Journaled stats do not match."
+        assert restored.flags.list_flags() == player.flags.list_flags(), "Journaled flags do not match."
+        assert restored.inventory.list_items() == player.inventory.list_items(), "Journaled inventory does not match."
+        assert restored.equipment_manager.is_equipped("Steel Sword", "weapon")
+        assert journal.sequence == 4
+        journal.close()
+        print("Journaled save test passed.")
+
+        # Test the async save service
+        print("\n--- Testing Async Save ---")
+        async def autosave_burst() -> SaveMetrics:
+            service = AsyncSaveService(binary_manager)
+            saves = []
+            for day in range(5):
+                player.stats.modify_day(1)
+                saves.append(service.request_save(player))
+            await asyncio.gather(*saves)
+            loaded = Player()
+            await service.load(loaded)
+            assert loaded.stats.meta_info["day"] == player.stats.meta_info["day"], "The newest snapshot should be the one on disk."
+            await service.close()
+            return service.metrics
+        metrics = asyncio.run(autosave_burst())
+        assert metrics["requested"] == 5 and metrics["failed"] == 0
+        assert metrics["written"] + metrics["coalesced"] == 5 and metrics["written"] <= 2, f"Saves were not coalesced: {metrics}"
+        print("Async save test passed.")
+
+        # Test the shared definition cache
+        print("\n--- Testing Definition Cache ---")
+        catalog_file = os.path.join(save_dir, "test_consumables.json")
+        with open(consumables_file, "r") as f:
+            catalog = json.load(f)
+        with open(catalog_file, "w") as f:
+            json.dump(catalog, f)
+        cache = DefinitionCache(check_interval=0)
+        sessions = [
+            SaveManager(player=None, consumables_file=catalog_file, equipment_file=equipment_file,
+                        plotitems_file=plotitems_file, definition_cache=cache)
+            for _ in range(3)
+        ]
+        assert len({id(session.item_registry) for session in sessions}) == 1, "Sessions should share one item registry."
+        assert sessions[0].create_item(1).definition is sessions[2].create_item(1).definition
+        catalog["1"]["name"] = "Greater Health Potion"
+        with open(catalog_file, "w") as f:
+            json.dump(catalog, f)
+        stat = os.stat(catalog_file)
+        os.utime(catalog_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert sessions[1].create_item(1).name == "Greater Health Potion", "Changed catalog was not reloaded."
+        print("Definition cache test passed.")
+
+        # Test the SQLite save store
+        print("\n--- Testing Save Store ---")
+        with SaveStore(":memory:") as store:
+            store.save_player(binary_manager, player, "alice", "slot1")
+            store.save_player(binary_manager, self.test_player3, "bob", "slot1")
+            store.save_many([("carol", slot, binary_manager.to_binary_data(binary_manager.build_save_data(self.test_player3)))
+                             for slot in ("slot1", "slot2")])
+            assert sorted(store.list_slots("carol")) == ["slot1", "slot2"]
+            assert store.players_with_flag("met_king") == [("alice", "slot1")], "Flag query failed."
+            assert store.players_with_item(1) == [("alice", "slot1"), ("bob", "slot1"), ("carol", "slot1"), ("carol", "slot2")]
+            assert store.players_on_event(1) == [("alice", "slot1"), ("bob", "slot1"), ("carol", "slot1"), ("carol", "slot2")]
+            restored = Player()
+            assert store.load_player(binary_manager, restored, "alice", "slot1")
+            assert restored.stats.to_dict() == player.stats.to_dict(), "Stored stats do not match."
+            assert restored.flags.list_flags() == player.flags.list_flags(), "Stored flags do not match."
+            assert restored.inventory.list_items() == player.inventory.list_items(), "Stored inventory does not match."
+            assert restored.equipment_manager.is_equipped("Steel Sword", "weapon")
+            assert store.delete("carol", "slot2") and store.load("carol", "slot2") is None
+        print("Save store test passed.")
+
         # Cleanup: Remove save files only
         os.remove(test_save_file)
-        os.remove(dummy_save_file)
\ No newline at end of file
+        os.remove(dummy_save_file)
+        os.remove(binary_save_file)
+        os.remove(catalog_file)
+        os.remove(journal.snapshot_file)
+        os.remove(journal.journal_file)
\ No newline at end of file
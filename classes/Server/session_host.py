@@ -0,0 +1,287 @@
+from __future__ import annotations
+import asyncio
+import contextlib
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, TypedDict
+from classes.Events.event_manager import get_event_graph
+from classes.Player.player import Player
+from classes.Player.save_manager import SaveManager
+from classes.Player.save_service import AsyncSaveService
+
+# Session IDs double as save file names
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+class HostMetrics(TypedDict):
+    sessions: int  # Sessions in memory
+    opened: int  # Sessions created or loaded
+    loaded: int  # Sessions loaded from disk
+    evicted: int  # Sessions saved to disk and dropped
+    commands: int
+    errors: int  # Commands rejected
+
+class Session:
+    __slots__ = ("session_id", "player", "saves", "rng", "last_active")
+
+    def __init__(self, session_id: str, player: Player, saves: AsyncSaveService, rng: random.Random):
+        """
+        One player's game on a SessionHost. Everything a session changes lives here;
+        the event graph and item definitions are shared with every other session.
+        :param saves: Writes the session to its own save file.
+        :param rng: Resolves the session's weighted outcomes.
+        """
+        self.session_id = session_id
+        self.player = player
+        self.saves = saves
+        self.rng = rng
+        self.last_active = time.monotonic()
+
+class SessionHost:
+    COMMANDS = ("open", "choices", "choose", "state", "close")
+
+    def __init__(
+        self,
+        events_file: str = "data/test_events.json",
+        save_dir: str = "saves/sessions",
+        idle_timeout: float = 300.0,
+        template: Player = None,
+        start_event: int = None,
+        seed: int = None,
+        quiet: bool = True,
+    ) -> None:
+        """
+        Hosts many players' games in one process, on one event loop.
+        The compiled event graph and the item catalogs are loaded once and shared read-only; each session
+        only holds its own player. Commands run on the loop without awaiting, so a session never sees
+        another command half-way through. Sessions idle for longer than idle_timeout are saved to
+        save_dir (in the binary format) and dropped, and are loaded again by their next command.
+        :param events_file: The story every session plays.
+        :param template: The player new sessions start as (forked, so it is never changed). Defaults to a new Player.
+        :param start_event: Where new sessions start. Defaults to the template's current event.
+        :param seed: Seeds each session's outcome rolls from its ID, for reproducible games. Random if None.
+        :param quiet: Silence what game code prints while running commands.
+        """
+        self.graph = get_event_graph(events_file)
+        # Events with no way out to another event (see EventManager.validate)
+        self.endings = frozenset(self.graph.report["dead_ends"])
+        self.save_dir = save_dir
+        self.idle_timeout = idle_timeout
+        self.template = template or Player()
+        if start_event is not None:
+            self.template = self.template.fork()
+            self.template.stats.advance_event(start_event)
+        self.seed = seed
+        self.quiet = quiet
+        self.devnull = open(os.devnull, "w") if quiet else None
+        self.sessions: dict[str, Session] = {}
+        # Sessions being loaded, and evicted sessions whose save is still being written
+        self.opening: dict[str, asyncio.Task] = {}
+        self.closing: dict[str, asyncio.Task] = {}
+        # Save files are read and written off the loop; the threads are shared by every session
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="session-save")
+        self.sweeper: Optional[asyncio.Task] = None
+        self.metrics: HostMetrics = {"sessions": 0, "opened": 0, "loaded": 0, "evicted": 0, "commands": 0, "errors": 0}
+        os.makedirs(save_dir, exist_ok=True)
+
+    def save_file(self, session_id: str) -> str:
+        return os.path.join(self.save_dir, f"{session_id}.sav")
+
+    def output(self):
+        """
+        Context for running game code: discards its prints when the host is quiet.
+        Redirecting stdout is process-wide, so never await inside it.
+        """
+        return contextlib.redirect_stdout(self.devnull) if self.quiet else contextlib.nullcontext()
+
+    ######################################################################################
+    # Session lifecycle
+
+    async def get_session(self, session_id: str) -> Session:
+        """The session for an ID, loading it from disk or starting a new game if it is not in memory."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            if not isinstance(session_id, str) or not SESSION_ID.fullmatch(session_id):
+                raise ValueError(f"Invalid session ID: {session_id!r}")
+            # Concurrent commands for a session that is not in memory share one load
+            pending = self.opening.get(session_id)
+            if pending is None:
+                pending = self.opening[session_id] = asyncio.get_running_loop().create_task(self.load_session(session_id))
+                pending.add_done_callback(lambda _: self.opening.pop(session_id, None))
+            session = await asyncio.shield(pending)
+        session.last_active = time.monotonic()
+        return session
+
+    async def load_session(self, session_id: str) -> Session:
+        closing = self.closing.get(session_id)
+        if closing is not None:
+            # Reading the save before the eviction has written it would go back in time
+            await asyncio.shield(closing)
+            if session_id in self.sessions:  # The eviction failed and kept the session
+                return self.sessions[session_id]
+
+        player = self.template.fork()
+        save_manager = SaveManager(player, save_file=self.save_file(session_id), save_format="binary")
+        saves = AsyncSaveService(save_manager, self.executor)
+        if os.path.exists(save_manager.save_file):
+            # Read off the loop, then restore without awaiting: a stdout redirect held across an
+            # await would interleave with other sessions' and could leave stdout redirected
+            data = await asyncio.get_running_loop().run_in_executor(self.executor, save_manager.read_save_data)
+            with self.output():
+                save_manager.restore_save_data(player, data)
+            self.metrics["loaded"] += 1
+        rng = random.Random(None if self.seed is None else f"{self.seed}:{session_id}")
+        session = self.sessions[session_id] = Session(session_id, player, saves, rng)
+        self.metrics["opened"] += 1
+        self.metrics["sessions"] = len(self.sessions)
+        return session
+
+    async def evict(self, session_id: str) -> bool:
+        """
+        Save a session and drop it from memory. The session is removed before its save is written;
+        a command arriving meanwhile waits for the write and then loads it back.
+        :return: Whether the session was saved (a session whose save fails is kept in memory).
+        """
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self.metrics["sessions"] = len(self.sessions)
+        task = self.closing[session_id] = asyncio.get_running_loop().create_task(self.persist(session))
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self.closing.get(session_id) is task:
+                del self.closing[session_id]
+
+    async def persist(self, session: Session) -> bool:
+        try:
+            await session.saves.save(session.player)
+        except Exception:
+            self.sessions.setdefault(session.session_id, session)
+            self.metrics["sessions"] = len(self.sessions)
+            return False
+        self.metrics["evicted"] += 1
+        return True
+
+    async def evict_idle(self, now: float = None) -> int:
+        """
+        Evict every session that has not run a command for idle_timeout seconds.
+        :param now: The current time.monotonic() (for tests).
+        :return: Sessions evicted.
+        """
+        cutoff = (time.monotonic() if now is None else now) - self.idle_timeout
+        idle = [session_id for session_id, session in self.sessions.items() if session.last_active <= cutoff]
+        return sum(await asyncio.gather(*(self.evict(session_id) for session_id in idle)))
+
+    async def sweep(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    def start(self, interval: float = None) -> None:
+        """Start evicting idle sessions in the background, every interval seconds (defaults to a tenth of idle_timeout)."""
+        if self.sweeper is None:
+            interval = interval if interval is not None else max(self.idle_timeout / 10, 0.01)
+            self.sweeper = asyncio.get_running_loop().create_task(self.sweep(interval))
+
+    async def close(self) -> None:
+        """Stop the sweeper, save every session and release the save threads."""
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.sweeper
+            self.sweeper = None
+        while self.opening or self.closing:
+            await asyncio.gather(*self.opening.values(), *self.closing.values(), return_exceptions=True)
+        await asyncio.gather(*(self.evict(session_id) for session_id in list(self.sessions)))
+        self.executor.shutdown(wait=True)
+        if self.devnull is not None:
+            self.devnull.close()
+
+    ######################################################################################
+    # Commands
+
+    async def execute(self, session_id: str, command: str, choice: int = None) -> dict[str, Any]:
+        """
+        Run a command for a session.
+        :param command: One of COMMANDS.
+        :param choice: For "choose", the index of the choice among the event's choices (as listed by "choices").
+        :return: The command's JSON-ready result.
+        """
+        self.metrics["commands"] += 1
+        if command not in self.COMMANDS:
+            self.metrics["errors"] += 1
+            raise ValueError(f"Unknown command: {command!r}")
+        try:
+            if command == "close":
+                if session_id in self.opening:
+                    await asyncio.shield(self.opening[session_id])
+                elif session_id in self.closing:  # Already being evicted
+                    return {"saved": await asyncio.shield(self.closing[session_id])}
+                return {"saved": await self.evict(session_id)}
+            session = await self.get_session(session_id)
+            if command == "state":
+                return self.state(session)
+            if command == "choose":
+                return self.choose(session, choice)
+            return self.choices(session)
+        except ValueError:
+            self.metrics["errors"] += 1
+            raise
+
+    def choices(self, session: Session) -> dict[str, Any]:
+        """The session's current event and the choices available to it."""
+        reference = session.player.stats.meta_info["event"]
+        if reference not in self.graph:
+            raise ValueError(f"Session {session.session_id} is at missing event {reference}.")
+        event = self.graph.get_event(reference)
+        with self.output():
+            available = [
+                {"index": index, "text": choice.text}
+                for index, choice in enumerate(event.choices) if choice.requirement_check(session.player)
+            ]
+        return {
+            "event": reference,
+            "name": event.name,
+            "text": event.event_text,
+            "choices": available,
+            "ending": reference in self.endings,
+        }
+
+    def choose(self, session: Session, index: int) -> dict[str, Any]:
+        """
+        Make a choice at the session's current event.
+        :return: The outcome's text ("applied" is False if the player met no outcome's threshold
+                 and nothing changed), followed by the event the session is now at.
+        """
+        reference = session.player.stats.meta_info["event"]
+        if reference not in self.graph:
+            raise ValueError(f"Session {session.session_id} is at missing event {reference}.")
+        event = self.graph.get_event(reference)
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(event.choices):
+            raise ValueError(f"Event {reference} has no choice {index!r}.")
+        choice = event.choices[index]
+        with self.output():
+            if not choice.requirement_check(session.player):
+                raise ValueError(f"Choice {index} is not available at event {reference}.")
+            outcome = choice.choose(session.player, session.rng)
+        return {
+            "applied": outcome is not None,
+            "outcome": outcome["text"] if outcome is not None else None,
+            **self.choices(session),
+        }
+
+    def state(self, session: Session) -> dict[str, Any]:
+        """A summary of the session's player."""
+        stats = session.player.stats
+        return {
+            "event": stats.meta_info["event"],
+            "day": stats.meta_info["day"],
+            "level": stats.explicit_stats["level"],
+            "exp": stats.explicit_stats["exp"],
+            "hp": stats.resources["hp"],
+            "max_hp": stats.derived_stats["max_hp"],
+            "flags": dict(session.player.flags.list_flags()),
+        }
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Any, Awaitable, Callable, TypedDict, TYPE_CHECKING
+if TYPE_CHECKING:
+    from classes.Server.session_host import SessionHost
+
+# Protocol: one JSON object per line each way.
+# Request:  {"id": any, "session": str, "command": str, "choice": int (for "choose")}
+# Response: {"id": the request's id, "ok": true, "result": {...}} or {"id": ..., "ok": false, "error": str}
+MAX_LINE = 64 * 1024
+
+class LoadReport(TypedDict):
+    clients: int
+    requests: int
+    errors: int
+    endings: int  # Clients that reached an ending
+    seconds: float
+    requests_per_second: float
+    latency_mean: float
+    latency_p99: float
+    latency_max: float
+
+class GameServer:
+    def __init__(self, host: SessionHost):
+        """
+        Serves a SessionHost over a local TCP or Unix socket. Each connection may send commands for
+        any sessions; its requests are answered in order.
+        """
+        self.host = host
+        self.servers: list[asyncio.AbstractServer] = []
+
+    async def respond(self, line: bytes) -> dict[str, Any]:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Requests must be JSON objects.")
+        except ValueError as e:
+            return {"id": None, "ok": False, "error": f"Bad request: {e}"}
+        try:
+            result = await self.host.execute(request.get("session"), request.get("command"), request.get("choice"))
+        except ValueError as e:
+            return {"id": request.get("id"), "ok": False, "error": str(e)}
+        except Exception as e:
+            print(f"Error running {request.get('command')!r} for session {request.get('session')!r}: {e}")
+            return {"id": request.get("id"), "ok": False, "error": "Internal error"}
+        return {"id": request.get("id"), "ok": True, "result": result}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):  # Client went away, or sent a line longer than MAX_LINE
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start_tcp(self, address: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        """Listen on a TCP port (0 picks a free one; see server.sockets[0].getsockname())."""
+        server = await asyncio.start_server(self.handle, address, port, limit=MAX_LINE, backlog=1024)
+        self.servers.append(server)
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """Listen on a Unix socket."""
+        server = await asyncio.start_unix_server(self.handle, path, limit=MAX_LINE, backlog=1024)
+        self.servers.append(server)
+        return server
+
+    async def close(self) -> None:
+        """Stop accepting connections. The host is left running (see SessionHost.close)."""
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers = []
+
+######################################################################################
+
+class GameClient:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """A connection to a GameServer. Requests are sent one at a time."""
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count()
+
+    @classmethod
+    async def connect_tcp(cls, address: str, port: int) -> GameClient:
+        return cls(*await asyncio.open_connection(address, port, limit=MAX_LINE))
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> GameClient:
+        return cls(*await asyncio.open_unix_connection(path, limit=MAX_LINE))
+
+    async def request(self, session: str, command: str, choice: int = None) -> dict[str, Any]:
+        """Send a command and wait for its response."""
+        request = {"id": next(self.ids), "session": session, "command": command}
+        if choice is not None:
+            request["choice"] = choice
+        self.writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection.")
+        return json.loads(line)
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def load_test(connect: Callable[[], Awaitable[GameClient]], clients: int, moves: int = 10, seed: int = 0, prefix: str = "load") -> LoadReport:
+    """
+    Play many sessions at once against a server, one connection per session, making random
+    available choices until each reaches an ending or has made its moves.
+    :param connect: Opens a connection (e.g., lambda: GameClient.connect_unix(path)).
+    :param clients: Concurrent sessions, named prefix-0, prefix-1, ...
+    :return: Throughput and per-request latency, in seconds.
+    """
+    latencies: list[float] = []
+    errors = endings = 0
+
+    async def play(number: int) -> None:
+        nonlocal errors, endings
+        rng = random.Random(seed + number)
+        session = f"{prefix}-{number}"
+        client = await connect()
+        try:
+            command, choice = "choices", None
+            for _ in range(moves + 1):
+                started = time.perf_counter()
+                response = await client.request(session, command, choice)
+                latencies.append(time.perf_counter() - started)
+                if not response["ok"]:
+                    errors += 1
+                    break
+                result = response["result"]
+                if result["ending"] or not result["choices"]:
+                    endings += result["ending"]
+                    break
+                command, choice = "choose", rng.choice(result["choices"])["index"]
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(play(number) for number in range(clients)))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "endings": endings,
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds if seconds else 0.0,
+        "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "latency_p99": latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+        "latency_max": latencies[-1] if latencies else 0.0,
+    }
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from typing import TYPE_CHECKING
+from classes.Events.event_manager import get_event_graph
+from classes.Server.session_host import SessionHost
+from classes.Server.socket_server import GameClient, GameServer, load_test
+if TYPE_CHECKING:
+    from classes.Player.player import Player
+
+
+class ServerTestManager:
+    """A class that manages testing for the session host and its socket front-end."""
+    def __init__(self, player: Player, events_file: str):
+        self.template = player.fork()
+        self.events_file = events_file
+        self.save_dir = os.path.join("saves", "server_test_sessions")
+        self.socket_path = os.path.join("saves", "server_test.sock")
+
+    def test_server(self):
+        """Run tests for hosting many sessions."""
+        print("Starting Server tests...")
+        shutil.rmtree(self.save_dir, ignore_errors=True)
+        try:
+            asyncio.run(self.run_tests())
+        finally:
+            shutil.rmtree(self.save_dir, ignore_errors=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        print("\n--- All server tests passed! ---")
+
+    async def run_tests(self):
+        host = SessionHost(self.events_file, self.save_dir, idle_timeout=60, template=self.template, start_event=1, seed=0)
+
+        print("\n--- Testing Session Commands ---")
+        assert host.graph is get_event_graph(self.events_file), "Sessions should share the process-wide event graph."
+        view = await host.execute("alice", "choices")
+        assert view["event"] == 1 and view["choices"] == [{"index": 0, "text": "Fight! (Strength)"}], f"Unexpected view: {view}"
+        result = await host.execute("alice", "choose", 0)
+        assert result["applied"] and result["outcome"] == "You defeat the goblin but sustain injuries.", f"Unexpected outcome: {result}"
+        assert result["event"] == 2 and not result["ending"], "The choice should move alice to event 2."
+        state = await host.execute("alice", "state")
+        assert state["exp"] == 20 and state["hp"] == state["max_hp"] - 5, f"Unexpected state: {state}"
+        assert (await host.execute("bob", "state"))["exp"] == 0, "Sessions should not share players."
+        assert self.template.stats.explicit_stats["exp"] == 0, "The template player should never change."
+        for session_id, command, choice in (("alice", "choose", 5), ("alice", "choose", "0"), ("alice", "dance", None), ("../alice", "state", None)):
+            try:
+                await host.execute(session_id, command, choice)
+                assert False, f"{command} {choice!r} for {session_id} should be rejected."
+            except ValueError:
+                pass
+        assert host.metrics["errors"] == 4, f"Expected 4 rejected commands, found {host.metrics['errors']}."
+        print("Session commands passed.")
+
+        print("\n--- Testing Eviction ---")
+        host.sessions["bob"].last_active -= 120
+        assert await host.evict_idle() == 1 and list(host.sessions) == ["alice"], "Only the idle session should be evicted."
+        assert os.path.exists(host.save_file("bob")), "Evicted sessions should be saved."
+        assert await host.evict_idle(time.monotonic() + 60) == 1 and not host.sessions, "Every session should be idle."
+        state = await host.execute("alice", "state")
+        assert host.metrics["loaded"] == 1, "Alice should be loaded from disk."
+        assert state["exp"] == 20 and state["event"] == 2 and state["hp"] == state["max_hp"] - 5, f"Alice's game was not restored: {state}"
+        await host.execute("alice", "choose", 0)
+        # A command arriving while the eviction is still writing must wait for the write
+        _, state = await asyncio.gather(host.evict("alice"), host.execute("alice", "state"))
+        assert state["level"] == 2 and state["event"] == 3, f"A command during eviction lost alice's progress: {state}"
+        assert (await host.execute("alice", "close"))["saved"] and "alice" not in host.sessions, "Close should save and drop the session."
+        # Loads running side by side must not leave game output silenced
+        stdout = sys.stdout
+        await asyncio.gather(*(host.execute(session_id, "state") for session_id in "abcd"))
+        assert await host.evict_idle(time.monotonic() + 60) == 4, "Expected four sessions to evict."
+        states = await asyncio.gather(*(host.execute(session_id, "state") for session_id in "abcd"))
+        assert host.metrics["loaded"] == 6 and all(state["event"] == 1 for state in states), "Sessions should load concurrently."
+        assert sys.stdout is stdout, "Concurrent loads left stdout redirected."
+        print("Eviction passed.")
+
+        print("\n--- Testing Socket Server ---")
+        server = GameServer(host)
+        await server.start_unix(self.socket_path)
+        tcp = await server.start_tcp()
+        report = await load_test(lambda: GameClient.connect_unix(self.socket_path), clients=500, moves=5)
+        assert report["errors"] == 0 and report["endings"] == 500, f"Unexpected load test: {report}"
+        assert report["requests"] == 1500 and len(host.sessions) == 504, f"Unexpected load test: {report}"
+        client = await GameClient.connect_tcp(*tcp.sockets[0].getsockname()[:2])
+        response = await client.request("load-0", "state")
+        assert response["ok"] and response["result"]["event"] == 3 and response["id"] == 0, f"Unexpected TCP response: {response}"
+        response = await client.request("load-0", "choose", 9)
+        assert not response["ok"] and "no choice" in response["error"], f"Errors should be reported to the client: {response}"
+        client.writer.write(b"not json\n")
+        response = json.loads(await client.reader.readline())
+        assert response["id"] is None and not response["ok"], f"Malformed requests should be rejected: {response}"
+        await client.close()
+        await server.close()
+        await host.close()
+        assert not host.sessions and len(os.listdir(self.save_dir)) == 506, "Closing the host should save every session."
+        print("Socket server passed.")
@@ -1,15 +1,19 @@
-# from classes.Events.testing import EventTestManager
+from classes.Events.testing import EventTestManager
 from classes.Player.player import Player
 from classes.Player.testing import TestManager
+from classes.Server.testing import ServerTestManager
 
 def main():
     player = Player()
     test_manager = TestManager(player)
     test_manager.test()
     test_manager.test2()
+    test_manager.stats_test()
     test_manager.save_test1()
-    # event_test_manager = EventTestManager(player, "data/test_events.json")
-    # event_test_manager.test_event_flow()
+    event_test_manager = EventTestManager(player, "data/test_events.json")
+    event_test_manager.test_event_flow()
+    server_test_manager = ServerTestManager(player, "data/test_events.json")
+    server_test_manager.test_server()
 
 if __name__ == "__main__":
     main()